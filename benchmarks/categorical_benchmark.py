@@ -0,0 +1,97 @@
+"""
+Compares the per-column value_counts + merge categorical comparison with
+the single-pass categorical_comparison engine of expected_profile.
+
+    python -m benchmarks.categorical_benchmark --rows 100000 --columns 200
+"""
+import argparse
+import json
+import time
+import numpy as np
+import pandas as pd
+from src.utils.expected_profile import categorical_comparison
+
+
+def make_frames(rows: int, columns: int, cardinality: int, seed: int = 0):
+    """
+    Builds two similar frames of string columns. Dev draws from a shifted
+    range so some values only exist on one side.
+    Args:
+        rows (int): rows per frame
+        columns (int): number of categorical columns
+        cardinality (int): distinct values per column
+        seed (int): random seed
+    Returns:
+        (tuple) : df_1 (pd.DataFrame), df_2 (pd.DataFrame)
+    """
+    rng = np.random.default_rng(seed)
+    values = np.array([f"value_{i}" for i in range(cardinality + cardinality // 10)])
+    shift = cardinality // 10
+    df_1 = pd.DataFrame(
+        {f"COL_{i}": values[rng.integers(0, cardinality, rows)] for i in range(columns)}
+    )
+    df_2 = pd.DataFrame(
+        {f"COL_{i}": values[rng.integers(shift, cardinality + shift, rows)] for i in range(columns)}
+    )
+    return df_1, df_2
+
+
+def per_column(df_1: pd.DataFrame, df_2: pd.DataFrame, columns: list):
+    """The previous approach: value_counts() per side and a merge per column."""
+    ratios, tables = {}, {}
+    for col in columns:
+        counts_1 = df_1[col].value_counts()
+        counts_2 = df_2[col].value_counts()
+        ratios[col] = (counts_1.sort_index() / counts_2.sort_index()).mean()
+        tables[col] = pd.DataFrame(counts_1).merge(
+            pd.DataFrame(counts_2), how="outer", left_index=True, right_index=True,
+            suffixes=("_df1", "_df2"),
+        ).fillna(0)
+    return ratios, tables
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return round(time.perf_counter() - start, 4)
+
+
+def run_case(rows: int, columns: int, cardinality: int):
+    """
+    Times both approaches on one synthetic shape.
+    Returns:
+        dict: timings and speedup
+    """
+    df_1, df_2 = make_frames(rows, columns, cardinality)
+    names = df_1.columns.tolist()
+    baseline = timed(per_column, df_1, df_2, names)
+    engine = timed(categorical_comparison, df_1, df_2, names)
+    return {
+        "rows": rows,
+        "columns": columns,
+        "cardinality": cardinality,
+        "per_column_seconds": baseline,
+        "single_pass_seconds": engine,
+        "speedup": round(baseline / engine, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--columns", type=int, default=200)
+    parser.add_argument("--cardinality", type=int, default=50)
+    parser.add_argument("--high-cardinality", type=int, default=50_000)
+    args = parser.parse_args()
+
+    results = [
+        # wide frame with few distinct values per column
+        run_case(args.rows, args.columns, args.cardinality),
+        # narrow frame with many distinct values per column
+        run_case(args.rows, 10, args.high_cardinality),
+    ]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import pyarrow as pa
+
+
+def snowflake_type(data_type: pa.DataType):
+    """
+    Snowflake type code and scale the driver would report for an Arrow type,
+    so results go through the same typed conversion as real ones.
+    Args:
+        data_type (pa.DataType): Arrow column type
+    Returns:
+        (tuple) : type code (int), scale (int)
+    """
+    if pa.types.is_integer(data_type):
+        return 0, 0  # FIXED
+    if pa.types.is_decimal(data_type):
+        return 0, data_type.scale  # FIXED
+    if pa.types.is_floating(data_type):
+        return 1, None  # REAL
+    if pa.types.is_timestamp(data_type):
+        return 8, 9  # TIMESTAMP_NTZ
+    if pa.types.is_boolean(data_type):
+        return 13, None  # BOOLEAN
+    return 2, None  # TEXT
+
+
+class FakeCursor:
+    """
+    DB-API cursor double that serves an Arrow table the way the Snowflake
+    driver does: fetchall decodes every row into a Python tuple, while
+    fetch_arrow_batches yields Arrow tables of batch_size rows.
+    Attributes:
+        table (pa.Table): result set served by the cursor
+        batch_size (int): rows per Arrow batch
+        description (list): DB-API column description tuples
+
+    Methods:
+        execute: No-op, the result set is fixed
+        fetchall: Returns every row as a tuple
+        fetch_arrow_batches: Yields the result set as Arrow tables
+        close: No-op
+    """
+
+    def __init__(self, table: pa.Table, batch_size: int = 100_000):
+        self.table = table
+        self.batch_size = batch_size
+        # (name, type_code, display_size, internal_size, precision, scale, null_ok)
+        self.description = []
+        for field in table.schema:
+            type_code, scale = snowflake_type(field.type)
+            self.description.append((field.name, type_code, None, None, None, scale, True))
+
+    def execute(self, query: str):
+        return self
+
+    def fetchall(self):
+        rows = []
+        for batch in self.table.to_batches(max_chunksize=self.batch_size):
+            rows.extend(zip(*[column.to_pylist() for column in batch.columns]))
+        return rows
+
+    def fetch_arrow_batches(self):
+        for batch in self.table.to_batches(max_chunksize=self.batch_size):
+            yield pa.Table.from_batches([batch])
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """DB-API connection double handing out FakeCursors over one table."""
+
+    def __init__(self, table: pa.Table, batch_size: int = 100_000):
+        self.table = table
+        self.batch_size = batch_size
+
+    def cursor(self):
+        return FakeCursor(self.table, self.batch_size)
+
+    def close(self):
+        pass
@@ -0,0 +1,117 @@
+"""
+Compares the tuple (fetchall) and Arrow fetch engines of
+SnowflakeConnector.query on a fake cursor.
+
+Each engine runs in its own subprocess so peak RSS is not shared.
+
+    python -m benchmarks.fetch_benchmark --rows 1000000
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import numpy as np
+import pyarrow as pa
+from benchmarks.fake_cursor import FakeConnection
+from src.utils.snowflake_connector import SnowflakeConnector
+
+ENGINES = ["tuples", "arrow"]
+
+
+def make_table(rows: int, seed: int = 0):
+    """
+    Builds a synthetic result set with numeric, text and timestamp columns.
+    Args:
+        rows (int): number of rows
+        seed (int): random seed
+    Returns:
+        pa.Table
+    """
+    rng = np.random.default_rng(seed)
+    return pa.table(
+        {
+            "ID": pa.array(np.arange(rows, dtype=np.int64)),
+            "AMOUNT": pa.array(rng.normal(100, 15, rows)),
+            "QUANTITY": pa.array(rng.integers(0, 50, rows)),
+            "STORE": pa.array(rng.choice([f"store_{i}" for i in range(200)], rows)),
+            "STATUS": pa.array(rng.choice(["open", "closed", "pending"], rows)),
+            "CREATED_AT": pa.array(
+                np.datetime64("2024-01-01") + rng.integers(0, 365, rows).astype("timedelta64[D]")
+            ),
+        }
+    )
+
+
+def peak_rss_mb():
+    """Returns the peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes on Linux
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+def run_engine(engine: str, rows: int, batch_size: int):
+    """
+    Fetches the synthetic table once with the given engine.
+    Args:
+        engine (str): 'tuples' or 'arrow'
+        rows (int): number of rows
+        batch_size (int): rows per Arrow batch
+    Returns:
+        dict: timing and memory measurements
+    """
+    table = make_table(rows)
+    connector = SnowflakeConnector.from_connection(
+        FakeConnection(table, batch_size), fetch_engine=engine
+    )
+    rss_before = peak_rss_mb()
+
+    start = time.perf_counter()
+    df = connector.query("select * from fake")
+    seconds = time.perf_counter() - start
+
+    assert len(df) == rows
+    return {
+        "engine": engine,
+        "rows": rows,
+        "seconds": round(seconds, 4),
+        "rows_per_second": round(rows / seconds),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "fetch_rss_mb": round(peak_rss_mb() - rss_before, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=100_000)
+    parser.add_argument("--engine", choices=ENGINES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.engine:
+        print(json.dumps(run_engine(args.engine, args.rows, args.batch_size)))
+        return
+
+    results = []
+    for engine in ENGINES:
+        output = subprocess.run(
+            [
+                sys.executable, "-m", "benchmarks.fetch_benchmark",
+                "--engine", engine,
+                "--rows", str(args.rows),
+                "--batch-size", str(args.batch_size),
+            ],
+            check=True,
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        )
+        results.append(json.loads(output.stdout))
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
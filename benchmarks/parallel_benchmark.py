@@ -0,0 +1,63 @@
+"""
+Measures how ExpectedProfiler.compare scales with the number of worker processes.
+
+    python -m benchmarks.parallel_benchmark --rows 200000 --columns 300 --jobs 1 2 4 8
+"""
+import argparse
+import json
+import time
+from benchmarks.suite import environment
+from benchmarks.synthetic import make_frames
+from src.utils.expected_profile import ExpectedProfiler
+from src.utils.parallel import default_jobs
+
+
+def timed_compare(df_1, df_2, jobs: int):
+    """Seconds taken by compare() on copies of the frames."""
+    profiler = ExpectedProfiler(df_1.copy(), df_2.copy(), jobs=jobs)
+    start = time.perf_counter()
+    profiler.compare()
+    return round(time.perf_counter() - start, 4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--columns", type=int, default=300, help="half numeric, half categorical")
+    parser.add_argument("--cardinality", type=int, default=100)
+    parser.add_argument("--jobs", type=int, nargs="+", default=None)
+    parser.add_argument("--output", type=str, help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    jobs = args.jobs
+    if jobs is None:
+        cores = default_jobs()
+        jobs = sorted({1, *[2**i for i in range(1, cores.bit_length()) if 2**i <= cores], cores})
+
+    df_1, df_2 = make_frames(
+        args.rows,
+        numeric_columns=args.columns // 2,
+        categorical_columns=args.columns - args.columns // 2,
+        cardinality=args.cardinality,
+    )
+    results = []
+    for count in jobs:
+        seconds = timed_compare(df_1, df_2, count)
+        results.append({"jobs": count, "seconds": seconds})
+    for result in results:
+        result["speedup"] = round(results[0]["seconds"] / result["seconds"], 2)
+
+    report = {
+        "environment": {**environment(), "cores": default_jobs()},
+        "rows": args.rows,
+        "columns": args.columns,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Measures the import time of the CLI entry point and of its flag parsing with python -X importtime.
+
+    python -m benchmarks.startup_benchmark
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# budget for importing src.__main__, checked by the test suite
+STARTUP_THRESHOLD_SECONDS = 0.15
+
+# modules that must only load once a comparison actually runs
+HEAVY_MODULES = ["pandas", "numpy", "pyarrow", "snowflake.connector"]
+
+# flags parse_arguments validates before the profile is read
+FLAG_CASES = [
+    [],
+    ["--sample", "1"],
+    ["--sample", "10000 rows", "--seed", "42"],
+    ["--memory-budget", "2GB"],
+    ["--budget", "1GB", "--time-budget", "60"],
+    ["--partitions", "8", "--stream"],
+]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_times(module: str = "src.__main__", code: str = None):
+    """
+    Imports a module in a fresh interpreter with -X importtime.
+    Args:
+        module (str): module to import
+        code (str): statements run instead of the import, e.g. parsing flags
+    Returns:
+        dict: imported module -> cumulative import time in seconds
+    """
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code or f"import {module}"],
+        check=True,
+        capture_output=True,
+        text=True,
+        cwd=ROOT,
+    )
+    times = {}
+    for line in output.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+
+def measure(module: str = "src.__main__"):
+    """
+    Summarizes the startup cost of a module.
+    Args:
+        module (str): module to import
+    Returns:
+        dict: import time of the module, slowest imports and heavy modules loaded
+    """
+    times = import_times(module)
+    slowest = sorted(times.items(), key=lambda item: item[1], reverse=True)[:10]
+    return {
+        "module": module,
+        "seconds": round(times.get(module, 0.0), 4),
+        "threshold_seconds": STARTUP_THRESHOLD_SECONDS,
+        "heavy_modules_loaded": [name for name in HEAVY_MODULES if name in times],
+        "slowest_imports": [[name, round(seconds, 4)] for name, seconds in slowest],
+    }
+
+
+def measure_flags(flags: list):
+    """
+    Heavy modules loaded while parse_arguments validates a set of flags.
+    Args:
+        flags (list): command line flags, passed after a table and a filter
+    Returns:
+        dict: flags and heavy modules loaded
+    """
+    argv = ["snow-diff", "-t", "date_dim", "-f", "1 = 1", *flags]
+    code = (
+        f"import sys; sys.argv = {argv!r}; "
+        "from src.__main__ import parse_arguments; parse_arguments()"
+    )
+    times = import_times(code=code)
+    return {
+        "flags": flags,
+        "heavy_modules_loaded": [name for name in HEAVY_MODULES if name in times],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--module", default="src.__main__")
+    args = parser.parse_args()
+    report = measure(args.module)
+    report["flags"] = [measure_flags(flags) for flags in FLAG_CASES]
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
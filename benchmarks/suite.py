@@ -0,0 +1,140 @@
+"""
+Benchmark suite for the profiler and connector hot paths on synthetic data.
+
+Every case runs in its own subprocess so peak RSS is not shared, and the
+results are printed (or written with --output) as JSON to compare versions.
+
+    python -m benchmarks.suite --rows 10000 100000 1000000 --output results.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from benchmarks.fetch_benchmark import peak_rss_mb
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CASES = ["compare", "query_tuples", "query_arrow"]
+
+
+def run_case(case: str, rows: int, columns: int, cardinality: int, null_rate: float):
+    """
+    Runs one benchmark case in this process.
+    Args:
+        case (str): 'compare', 'query_tuples' or 'query_arrow'
+        rows (int): rows per table
+        columns (int): numeric and categorical columns (half each)
+        cardinality (int): distinct values per categorical column
+        null_rate (float): share of nulls per column
+    Returns:
+        dict: timing and memory measurements
+    """
+    import pandas as pd
+    from benchmarks.fake_cursor import FakeConnection
+    from benchmarks.synthetic import make_frames, to_arrow
+    from src.utils.expected_profile import ExpectedProfiler
+    from src.utils.snowflake_connector import SnowflakeConnector
+
+    prod, dev = make_frames(
+        rows, columns - columns // 2, columns // 2, cardinality, null_rate
+    )
+
+    if case == "compare":
+        rss_before = peak_rss_mb()
+        start = time.perf_counter()
+        profiler = ExpectedProfiler(prod, dev)
+        profiler.compare()
+        seconds = time.perf_counter() - start
+        assert profiler.percent_differences is not None
+    else:
+        engine = case.split("_")[1]
+        connector = SnowflakeConnector.from_connection(
+            FakeConnection(to_arrow(prod)), fetch_engine=engine
+        )
+        del dev
+        rss_before = peak_rss_mb()
+        start = time.perf_counter()
+        df = connector.query("select * from prod")
+        seconds = time.perf_counter() - start
+        assert isinstance(df, pd.DataFrame) and len(df) == rows
+
+    return {
+        "case": case,
+        "rows": rows,
+        "columns": columns,
+        "cardinality": cardinality,
+        "null_rate": null_rate,
+        "seconds": round(seconds, 4),
+        "rows_per_second": round(rows / seconds),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "case_rss_mb": round(peak_rss_mb() - rss_before, 1),
+    }
+
+
+def environment():
+    """Versions recorded with the results."""
+    import numpy
+    import pandas
+    import pyarrow
+
+    return {
+        "python": platform.python_version(),
+        "pandas": pandas.__version__,
+        "numpy": numpy.__version__,
+        "pyarrow": pyarrow.__version__,
+        "platform": platform.platform(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--columns", type=int, nargs="+", default=[20])
+    parser.add_argument("--cardinality", type=int, nargs="+", default=[100])
+    parser.add_argument("--null-rate", type=float, nargs="+", default=[0.0])
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=CASES)
+    parser.add_argument("--output", type=str, help="write the JSON results to this file")
+    parser.add_argument("--case", choices=CASES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(
+            args.case, args.rows[0], args.columns[0], args.cardinality[0], args.null_rate[0]
+        )))
+        return
+
+    results = []
+    for rows in args.rows:
+        for columns in args.columns:
+            for cardinality in args.cardinality:
+                for null_rate in args.null_rate:
+                    for case in args.cases:
+                        output = subprocess.run(
+                            [
+                                sys.executable, "-m", "benchmarks.suite",
+                                "--case", case,
+                                "--rows", str(rows),
+                                "--columns", str(columns),
+                                "--cardinality", str(cardinality),
+                                "--null-rate", str(null_rate),
+                            ],
+                            check=True,
+                            capture_output=True,
+                            text=True,
+                            cwd=ROOT,
+                        )
+                        result = json.loads(output.stdout)
+                        results.append(result)
+                        print(json.dumps(result), file=sys.stderr)
+
+    report = {"environment": environment(), "results": results}
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Synthetic prod/dev tables for the benchmarks.
+"""
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+
+def make_frames(
+    rows: int,
+    numeric_columns: int = 10,
+    categorical_columns: int = 10,
+    cardinality: int = 100,
+    null_rate: float = 0.0,
+    drift: float = 0.01,
+    seed: int = 0,
+):
+    """
+    Builds a prod frame and a slightly drifted dev frame with the same columns.
+
+    Numeric columns are normal with per-column means; categorical columns
+    draw from `cardinality` values, and dev shifts part of its draws to
+    values prod does not have. Each frame also has an ID and a timestamp.
+    Args:
+        rows (int): rows per frame
+        numeric_columns (int): number of float columns
+        categorical_columns (int): number of string columns
+        cardinality (int): distinct values per categorical column
+        null_rate (float): share of nulls in every numeric and categorical column
+        drift (float): relative shift of dev means and share of new dev values
+        seed (int): random seed
+    Returns:
+        (tuple) : prod (pd.DataFrame), dev (pd.DataFrame)
+    """
+    rng = np.random.default_rng(seed)
+    values = np.array([f"value_{i}" for i in range(cardinality + max(cardinality // 10, 1))])
+
+    def frame(shift: float, new_values: float):
+        data = {
+            "ID": np.arange(rows, dtype=np.int64),
+            "CREATED_AT": np.datetime64("2024-01-01")
+            + rng.integers(0, 365 * 24, rows).astype("timedelta64[h]"),
+        }
+        for i in range(numeric_columns):
+            column = rng.normal(100 * (i + 1) * (1 + shift), 10 * (i + 1), rows)
+            if null_rate:
+                column[rng.random(rows) < null_rate] = np.nan
+            data[f"NUM_{i}"] = column
+        for i in range(categorical_columns):
+            codes = rng.integers(0, cardinality, rows)
+            if new_values:
+                moved = rng.random(rows) < new_values
+                codes[moved] = rng.integers(cardinality, len(values), moved.sum())
+            column = values[codes].astype(object)
+            if null_rate:
+                column[rng.random(rows) < null_rate] = None
+            data[f"CAT_{i}"] = column
+        return pd.DataFrame(data)
+
+    return frame(0.0, 0.0), frame(drift, drift)
+
+
+def to_arrow(df: pd.DataFrame):
+    """Converts a synthetic frame to the Arrow table a fake cursor serves."""
+    return pa.Table.from_pandas(df, preserve_index=False)
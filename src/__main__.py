@@ -1,7 +1,10 @@
 import os
 import yaml
 import argparse
-from src.utils import expected_profile, snowflake_connector
+
+# pandas, numpy and snowflake.connector take most of the startup time, so
+# src.utils modules are imported inside the functions that need them:
+# --help and argument or profile errors return before they are loaded.
 
 
 def parse_arguments():
@@ -30,9 +33,173 @@ def parse_arguments():
         type=str,
         help="Name of the custom Snowflake schema to compare.",
     )
+    parser.add_argument(
+        "-p",
+        "--pushdown",
+        action="store_true",
+        help="Compute the statistics inside Snowflake instead of pulling every row.",
+    )
+    parser.add_argument(
+        "-s",
+        "--stream",
+        action="store_true",
+        help="Profile the results batch by batch so memory is bounded by the batch size.",
+    )
+    parser.add_argument(
+        "-k",
+        "--key",
+        type=str,
+        help="Primary key column(s), comma separated, for a row-level diff.",
+    )
+    parser.add_argument(
+        "--columns",
+        type=str,
+        help="Comma separated columns to compare (default: every numeric, text and boolean column present in both tables).",
+    )
+    parser.add_argument(
+        "--exclude-columns",
+        type=str,
+        help="Comma separated columns to leave out of the comparison.",
+    )
+    parser.add_argument(
+        "--no-preflight",
+        action="store_true",
+        help="Skip the INFORMATION_SCHEMA check and select every column.",
+    )
+    parser.add_argument(
+        "--segment-by",
+        type=str,
+        help="Compare per value of this column with one GROUP BY query per table and rank the segments by divergence.",
+    )
+    parser.add_argument(
+        "--drill-down",
+        type=int,
+        default=0,
+        help="With --segment-by: fetch and profile the N most divergent segments whose checksums differ (default 0).",
+    )
+    parser.add_argument(
+        "--envs",
+        type=str,
+        help="Comma separated profiles.yml targets to compare (e.g. prod,uat,dev); each is queried once and all at the same time.",
+    )
+    parser.add_argument(
+        "--baseline",
+        type=str,
+        help="With --envs: target the other targets are compared with (default: the first).",
+    )
+    parser.add_argument(
+        "--pairwise",
+        action="store_true",
+        help="With --envs: compare every pair of targets instead of the baseline with the others.",
+    )
+    parser.add_argument(
+        "--incremental",
+        type=str,
+        metavar="PARTITION_COLUMN",
+        help="Store per-partition checksums and statistics locally and only re-fetch the partitions of this column that changed since the last run.",
+    )
+    parser.add_argument(
+        "--sample",
+        type=str,
+        help="Compare a sample instead of the full tables: a percentage (e.g. 1) or a row count (e.g. '10000 rows'). Makes --filter optional.",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        help="Seed for --sample so prod and dev are sampled the same way on every run.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not read or write the local result cache or reuse Snowflake's persisted results of earlier runs.",
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Re-run the queries and overwrite their cached results.",
+    )
+    parser.add_argument(
+        "--connections",
+        type=int,
+        default=1,
+        help="Size of the Snowflake connection pool for parallel queries (default 1).",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Worker processes the column comparisons are spread across (default 1, 0 = every core).",
+    )
+    parser.add_argument(
+        "--partitions",
+        type=int,
+        help="Fetch each table in this many hash partitions at once, over parallel cursors, and profile every slice as it arrives.",
+    )
+    parser.add_argument(
+        "--memory-budget",
+        type=str,
+        help="Spill both results to local Parquet files and compare them in chunks that fit this much memory (e.g. 2GB); with --key, rows are diffed bucket by bucket of the key hash.",
+    )
+    parser.add_argument(
+        "--budget",
+        type=str,
+        help="Estimate the size of both tables first and pick a full fetch, --pushdown or --sample so at most this much data is fetched (e.g. 2GB).",
+    )
+    parser.add_argument(
+        "--time-budget",
+        type=float,
+        metavar="SECONDS",
+        help="Like --budget, for the estimated run time of the comparison.",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="-",
+        metavar="TRACE_FILE",
+        help="Time every phase (connect, execute, fetch, convert, describe, ...) per table; prints a table, or writes a JSON trace when a file is given.",
+    )
+    parser.add_argument(
+        "--tables",
+        type=str,
+        help="Batch mode: comma separated tables to compare in one run.",
+    )
+    parser.add_argument(
+        "--manifest",
+        type=str,
+        help="Batch mode: compare every model of a dbt target/manifest.json.",
+    )
+    parser.add_argument(
+        "--run-results",
+        type=str,
+        help="Batch mode: compare the models that ran successfully in a dbt target/run_results.json.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Batch mode: number of models compared at the same time (default 4).",
+    )
 
     args = parser.parse_args()
 
+    if is_batch(args):
+        # models come from the batch sources, the filter applies to all of them
+        if not args.filter:
+            args.filter = "1 = 1"
+        return args
+
+    # validate before any prompt or connection; arguments does not load pandas
+    from src.utils import arguments
+
+    if getattr(args, "sample", None):
+        arguments.parse_sample(args.sample)
+        if args.table and not args.filter:
+            args.filter = "1 = 1"
+
+    for size in ("memory_budget", "budget"):
+        if getattr(args, size, None):
+            arguments.parse_memory_budget(getattr(args, size))
+
     if not args.table and not args.filter:  # If table and filter are not provided
         print("Schema, table, and filter are required. Please provide values.")
         custom_schema, table, filter_condition = get_user_input()
@@ -50,7 +217,36 @@ def parse_arguments():
 
     return args
 
-    return args
+
+def is_batch(args):
+    """Whether the arguments ask for a batch comparison of several models."""
+    return any(
+        getattr(args, flag, None) for flag in ("tables", "manifest", "run_results")
+    )
+
+
+def batch_models(args):
+    """
+    Collects the models of a batch run from --tables, --manifest and --run-results.
+    Args:
+        args: parsed arguments
+    Returns:
+        list: (model name, custom schema or None) tuples without duplicates
+    """
+    from src.utils import batch
+
+    models = []
+    if getattr(args, "tables", None):
+        models += [
+            (table.strip(), args.custom_schema)
+            for table in args.tables.split(",")
+            if table.strip()
+        ]
+    if getattr(args, "manifest", None):
+        models += batch.models_from_manifest(args.manifest)
+    if getattr(args, "run_results", None):
+        models += batch.models_from_run_results(args.run_results)
+    return list(dict.fromkeys(models))
 
 
 def get_user_input():
@@ -71,7 +267,7 @@ def get_user_input():
     return custom_schema, table, filter_condition
 
 
-def load_profile_data(username):
+def read_profiles(username):
     """
     Load and parse the profiles.yml file for a specific user.
 
@@ -79,8 +275,7 @@ def load_profile_data(username):
         username (str): The username used to construct the file path.
 
     Returns:
-        tuple: A tuple containing the user, account, warehouse, 
-        password, schema_prod, schema_dev.
+        dict: parsed profiles.yml
     """
     # Construct the file path using the username
     try:
@@ -92,7 +287,21 @@ def load_profile_data(username):
 
     # Load and parse the YAML file
     with open(profiles_path, "r") as file:
-        profiles_data = yaml.safe_load(file)
+        return yaml.safe_load(file)
+
+
+def load_profile_data(username):
+    """
+    Load and parse the profiles.yml file for a specific user.
+
+    Args:
+        username (str): The username used to construct the file path.
+
+    Returns:
+        tuple: A tuple containing the user, account, warehouse, 
+        password, schema_prod, schema_dev.
+    """
+    profiles_data = read_profiles(username)
 
     # Extract relevant information from the parsed YAML data
     try:
@@ -111,10 +320,290 @@ def load_profile_data(username):
     return user, account, warehouse, password, schema_prod, schema_dev
 
 
+def load_targets(username, targets):
+    """
+    Reads several targets of the profiles.yml file, e.g. dev, uat and prod.
+    Args:
+        username (str): The username used to construct the file path.
+        targets (list): target names under default.outputs
+    Returns:
+        dict: target name -> its settings, in the order given
+    """
+    outputs = read_profiles(username)["default"]["outputs"]
+    missing = [target for target in targets if target not in outputs]
+    if missing:
+        raise KeyError(
+            f"Targets {', '.join(missing)} are not in profiles.yml (found: {', '.join(outputs)})."
+        )
+    return {target: outputs[target] for target in targets}
+
+
+def get_relations(table, custom_schema, default_prod, default_dev):
+    """
+    Builds the fully qualified prod and dev names of a table.
+    Custom schemas follow the dbt naming: DBT_<schema> and DBT_DEV_<schema>.
+    Args:
+        table (str): table name
+        custom_schema (str): dbt custom schema, None for the default schemas
+        default_prod (str): prod database.schema
+        default_dev (str): dev database.schema
+    Returns:
+        (tuple) : relation_prod (str), relation_dev (str)
+    """
+    if custom_schema is None:
+        return f"{default_prod}.{table}", f"{default_dev}.{table}"
+
+    database_prod = default_prod.split(".")[0]
+    database_dev = default_dev.split(".")[0]
+    return (
+        f"{database_prod}.DBT_{custom_schema}.{table}",
+        f"{database_dev}.DBT_DEV_{custom_schema}.{table}",
+    )
+
+
+def print_preflight(preflight, relation_1, relation_2):
+    """
+    Prints the schema differences found before fetching any row.
+    Args:
+        preflight (SchemaPreflight): preflight after run()
+        relation_1 (str): fully qualified name of the first table
+        relation_2 (str): fully qualified name of the second table
+    Returns:
+        None
+    """
+    print("---" * 25)
+    print(f"Schema Preflight ({relation_1.upper()} vs {relation_2.upper()}):\n")
+    if len(preflight.differences):
+        print(preflight.differences.to_string(index=False))
+    else:
+        print("Same columns and types.")
+    print(f"\nComparing {len(preflight.projected)} columns", end="")
+    if preflight.skipped:
+        print(f", skipping {', '.join(preflight.skipped)}")
+    else:
+        print()
+
+
+def print_plan(plan):
+    """
+    Prints the strategy chosen by the query planner and its estimates.
+    Args:
+        plan (Plan): result of QueryPlanner.plan()
+    Returns:
+        None
+    """
+    from src.utils.planner import format_bytes
+
+    print("---" * 25)
+    print("Query Plan:\n")
+    stats = plan.stats.assign(scanned_bytes=plan.stats["scanned_bytes"].map(format_bytes))
+    print(stats.to_string(index=False))
+    estimates = plan.estimates.assign(
+        bytes_fetched=plan.estimates["bytes_fetched"].map(format_bytes),
+        seconds=plan.estimates["seconds"].round(1),
+    )
+    print()
+    print(estimates.to_string(index=False))
+    budgets = []
+    if plan.byte_budget is not None:
+        budgets.append(format_bytes(plan.byte_budget))
+    if plan.time_budget is not None:
+        budgets.append(f"{plan.time_budget:g} s")
+    fits = "within" if plan.estimate["fits"] else "over"
+    print(f"\nChosen: {plan.strategy.name} ({fits} the budget of {', '.join(budgets)})")
+
+
+def print_results(ep, relation_1, relation_2):
+    """
+    Prints the comparison attributes of a profiler.
+    Args:
+        ep (ExpectedProfiler | PushdownProfiler): profiler after compare() ran
+        relation_1 (str): fully qualified name of the first table
+        relation_2 (str): fully qualified name of the second table
+    Returns:
+        None
+    """
+    print("---" * 25)
+    print("DataFrame Key:\n")
+    print(f"df_1 = {relation_1.upper()}")
+    print(f"df_2 = {relation_2.upper()}")
+    #print("---" * 15)
+    print("\nTable Shape Differences:\n")
+    print(ep.shapes)
+    if getattr(ep, "recomputed", None):
+        for relation, recomputed in ep.recomputed.items():
+            print(f"\n{relation.upper()}: {recomputed} of {ep.partitions[relation]} partitions recomputed")
+
+    # if ep.compare() ran succesfully (tables without numeric columns only have frequency ratios):
+    if ep.percent_differences is not None or ep.avg_frequency_ratio is not None:
+        if ep.percent_differences is not None:
+            print("---" * 15)
+            print("\nMean Percent Differences Between Numeric Columns:\n")
+            print(ep.percent_differences.loc["mean"])
+        if getattr(ep, "distribution_differences", None) is not None:
+            print("---" * 15)
+            print("\nDistribution Differences Between Numeric Columns (KS distance, PSI):\n")
+            print(ep.distribution_differences)
+        print("---" * 25)
+        print("\nMean Frequency Ratio of Categorical Columns\n")
+        for col, ratio in ep.avg_frequency_ratio.items():
+            print(f"{col}: {ratio}")
+        if getattr(ep, "sketch_summaries", None):
+            print("---" * 25)
+            print("\nHigh-Cardinality Columns (estimated from sketches):\n")
+            for col, summary in ep.sketch_summaries.items():
+                print(
+                    f"{col}: distinct_df1={summary['distinct_df1']}, "
+                    f"distinct_df2={summary['distinct_df2']}, "
+                    f"jaccard={summary['jaccard']:.3f}"
+                )
+        if getattr(ep, "confidence_intervals", None) is not None:
+            print("---" * 25)
+            print(f"\nSampling Confidence Intervals ({ep.confidence:.0%}):\n")
+            print("Mean Percent Differences:")
+            print(ep.confidence_intervals["mean_percent_differences"])
+            print("\nAverage Frequency Ratios:")
+            print(ep.confidence_intervals["avg_frequency_ratio"])
+    else:
+        pass
+    print("---" * 25)
+
+
+def print_batch_results(comparison):
+    """
+    Prints the summary row of each model as soon as its comparison finishes.
+    Args:
+        comparison (BatchComparison): batch to run
+    Returns:
+        None
+    """
+    from src.utils import batch
+
+    print("---" * 25)
+    print(batch.header())
+    for row in comparison.run():
+        print(batch.format_row(row), flush=True)
+    print("---" * 25)
+
+
+def report_trace(tracer, sc, destination):
+    """
+    Prints or writes the phases recorded by --profile, adding the bytes
+    scanned of each Snowflake query from QUERY_HISTORY when available.
+    Args:
+        tracer (Tracer): tracer of the run
+        sc (SnowflakeConnector): connector of the run, still open
+        destination (str): '-' to print a table, otherwise a JSON file path
+    Returns:
+        None
+    """
+    query_ids = tracer.query_ids()
+    if query_ids:
+        try:
+            tracer.add_query_history(sc.query_history(query_ids))
+        except Exception as e:
+            print(f"QUERY_HISTORY is not available: {str(e).splitlines()[0]}")
+
+    if destination == "-":
+        print("---" * 25)
+        print("Profile:\n")
+        print(tracer.format_table())
+        print("---" * 25)
+    else:
+        tracer.to_json(destination)
+        print(f"Profile trace written to {destination}")
+
+
+def print_key_differences(diff, relation_1, relation_2):
+    """
+    Prints the rows found by a KeyDiff.
+    Args:
+        diff (KeyDiff): key diff after compare() ran
+        relation_1 (str): fully qualified name of the first table
+        relation_2 (str): fully qualified name of the second table
+    Returns:
+        None
+    """
+    print("---" * 25)
+    print("DataFrame Key:\n")
+    print(f"df_1 = {relation_1.upper()}")
+    print(f"df_2 = {relation_2.upper()}")
+    if getattr(diff, "buckets", None):
+        print(f"\nRows spilled: {diff.rows_fetched}, hash buckets: {diff.buckets}")
+    else:
+        print(f"\nChecksum rounds: {diff.queries}, rows fetched: {diff.rows_fetched}")
+    print("---" * 25)
+    print(f"\nKeys only in df_1 (deleted): {len(diff.deleted)}\n")
+    if len(diff.deleted):
+        print(diff.deleted.to_string(index=False))
+    print(f"\nKeys only in df_2 (inserted): {len(diff.inserted)}\n")
+    if len(diff.inserted):
+        print(diff.inserted.to_string(index=False))
+    print(f"\nKeys with changed values (updated): {len(diff.updated)}\n")
+    if len(diff.updated):
+        print(diff.updated.to_string(index=False))
+    print("---" * 25)
+
+
+def print_environments(comparison):
+    """
+    Prints the summary of an EnvironmentComparison, then the results of
+    each compared pair of environments.
+    Args:
+        comparison (EnvironmentComparison): comparison after compare() ran
+    Returns:
+        None
+    """
+    from src.utils import batch
+
+    print("---" * 25)
+    print("Environments:\n")
+    for env, relation in comparison.relations.items():
+        print(f"{env} = {relation.upper()}")
+    print()
+    print(batch.header())
+    for row in comparison.summary.to_dict("records"):
+        print(batch.format_row(row))
+    for (env_1, env_2), profiler in comparison.comparisons.items():
+        print_results(profiler, comparison.relations[env_1], comparison.relations[env_2])
+
+
+def print_segments(comparison, relation_1, relation_2, limit=20):
+    """
+    Prints the most divergent segments of a SegmentedComparison and the
+    profiles of the segments that were drilled down.
+    Args:
+        comparison (SegmentedComparison): comparison after compare() ran
+        relation_1 (str): fully qualified name of the first table
+        relation_2 (str): fully qualified name of the second table
+        limit (int): number of segments printed
+    Returns:
+        None
+    """
+    segments = comparison.segments
+    print("---" * 25)
+    print("DataFrame Key:\n")
+    print(f"df_1 = {relation_1.upper()}")
+    print(f"df_2 = {relation_2.upper()}")
+    differing = int((~segments["checksum_match"]).sum())
+    print(f"\nSegments by {comparison.segment_by}: {len(segments)}, differing: {differing}\n")
+    print(segments.head(limit).to_string())
+    for value, profiler in comparison.profiles.items():
+        print_results(
+            profiler,
+            f"{relation_1} where {comparison.segment_by} = {value}",
+            f"{relation_2} where {comparison.segment_by} = {value}",
+        )
+    print("---" * 25)
+
+
 def main():
     """
     Runs main function to print snowflake data diffs.
     """
+    # get args first so --help and argument errors do not need the profile
+    args = parse_arguments()
+
     # get username env variable
     try:
         username = os.getenv("USER")
@@ -130,68 +619,315 @@ def main():
         load_profile_data(username)
     )
 
-    # get args
-    args = parse_arguments()
+    models = batch_models(args) if is_batch(args) else None
+    if models == []:
+        raise SystemExit("No models found for the batch comparison.")
+    if models is None and not args.table:
+        raise SystemExit("A table is required.")
+
+    # only now load pandas and the Snowflake driver; the modules of each
+    # mode are imported in its branch
+    from src.utils import arguments, snowflake_connector
+
+    tracer = None
+    if getattr(args, "profile", None):
+        from src.utils import instrumentation
+
+        tracer = instrumentation.Tracer()
 
     DATABASE_PROD = "PRD_EDW_DBT"
     DATABASE_DEV = "SANDBOX_EDW"
 
-    CUSTOM_SCHEMA = args.custom_schema
-
-    if CUSTOM_SCHEMA is None:
-        SCHEMA_PROD = SCHEMA_PROD_DEFAULT
-        SCHEMA_DEV = SCHEMA_DEV_DEFAULT
-    else:
-        SCHEMA_PROD = f"DBT_{CUSTOM_SCHEMA}"
-        SCHEMA_DEV = f"DBT_DEV_{CUSTOM_SCHEMA}"
+    def relations(table, custom_schema):
+        return get_relations(
+            table,
+            custom_schema,
+            f"{DATABASE_PROD}.{SCHEMA_PROD_DEFAULT}",
+            f"{DATABASE_DEV}.{SCHEMA_DEV_DEFAULT}",
+        )
 
     TABLE = args.table
     FILTER = args.filter
 
+    cache = None
+    queries = None
+    if not getattr(args, "no_cache", False):
+        from src.utils import query_ledger, result_cache
+
+        cache = result_cache.ResultCache()
+        # results evicted from the cache can still be read back from Snowflake
+        queries = query_ledger.QueryLedger()
+
     sc = snowflake_connector.SnowflakeConnector(
-        user=USER, account=ACCOUNT, warehouse=WAREHOUSE, password=PASSWORD
+        user=USER,
+        account=ACCOUNT,
+        warehouse=WAREHOUSE,
+        password=PASSWORD,
+        cache=cache,
+        refresh_cache=getattr(args, "refresh", False),
+        pool_size=getattr(args, "connections", 1),
+        tracer=tracer,
+        query_ledger=queries,
     )
+    print(sc.connection_report())
+
+    RELATION_PROD, RELATION_DEV = relations(TABLE, args.custom_schema)
 
     try:
+        if is_batch(args):
+            from src.utils import batch
+
+            comparison = batch.BatchComparison(
+                sc,
+                [(table, *relations(table, schema)) for table, schema in models],
+                FILTER,
+                workers=getattr(args, "workers", 4),
+            )
+            print_batch_results(comparison)
+            return
+
+        if getattr(args, "envs", None):
+            from src.utils import environments
+
+            targets = load_targets(
+                username, [env.strip() for env in args.envs.split(",") if env.strip()]
+            )
+            databases = {"prod": DATABASE_PROD, "dev": DATABASE_DEV}
+            comparison = environments.EnvironmentComparison(
+                sc,
+                {
+                    target: environments.target_relation(
+                        target, output, TABLE, args.custom_schema, databases.get(target)
+                    )
+                    for target, output in targets.items()
+                },
+                FILTER,
+                baseline=getattr(args, "baseline", None),
+                pairwise=getattr(args, "pairwise", False),
+            )
+            comparison.compare()
+            print_environments(comparison)
+            return
+
         query_prod = f"""
         select * 
-        from {DATABASE_PROD}.{SCHEMA_PROD}.{TABLE} 
+        from {RELATION_PROD} 
         where {FILTER} 
         """
         query_dev = f"""
         select * 
-        from {DATABASE_DEV}.{SCHEMA_DEV}.{TABLE} 
+        from {RELATION_DEV} 
         where {FILTER} 
         """
 
-        df_prod = sc.query(query_prod)
-        df_dev = sc.query(query_dev)
+        memory_budget = None
+        if getattr(args, "memory_budget", None):
+            memory_budget = arguments.parse_memory_budget(args.memory_budget)
+
+        if getattr(args, "key", None):
+            key = [col.strip() for col in args.key.split(",")]
+            if memory_budget:
+                from src.utils import spill
+
+                # fetch both tables and join them by key hash bucket on disk
+                diff = spill.OutOfCoreKeyDiff(
+                    sc, RELATION_PROD, RELATION_DEV, key, FILTER, memory_budget
+                )
+            else:
+                from src.utils import key_diff
+
+                diff = key_diff.KeyDiff(sc, RELATION_PROD, RELATION_DEV, key, FILTER)
+            diff.compare()
+            print_key_differences(diff, RELATION_PROD, RELATION_DEV)
+            return
+
+        if getattr(args, "segment_by", None):
+            from src.utils import segments
+
+            comparison = segments.SegmentedComparison(
+                sc,
+                RELATION_PROD,
+                RELATION_DEV,
+                args.segment_by,
+                FILTER,
+                drill_down=getattr(args, "drill_down", 0),
+            )
+            comparison.compare()
+            print_segments(comparison, RELATION_PROD, RELATION_DEV)
+            return
+
+        jobs = getattr(args, "jobs", 1)
+        if jobs == 0:
+            from src.utils import parallel
+
+            jobs = parallel.default_jobs()
+
+        plan = None
+        explicit_mode = any(
+            getattr(args, flag, None)
+            for flag in (
+                "incremental",
+                "pushdown",
+                "memory_budget",
+                "partitions",
+                "stream",
+                "sample",
+            )
+        )
+        if not explicit_mode and (
+            getattr(args, "budget", None) or getattr(args, "time_budget", None)
+        ):
+            from src.utils import planner
+
+            # estimate the cost before anything is fetched and pick the mode
+            plan = planner.QueryPlanner(
+                sc,
+                RELATION_PROD,
+                RELATION_DEV,
+                FILTER,
+                byte_budget=(
+                    arguments.parse_memory_budget(args.budget)
+                    if getattr(args, "budget", None)
+                    else None
+                ),
+                time_budget=getattr(args, "time_budget", None),
+            ).plan()
+            print_plan(plan)
+
+        from src.utils import schema
+
+        columns = schema.parse_columns(getattr(args, "columns", None))
+        exclude_columns = schema.parse_columns(getattr(args, "exclude_columns", None))
+        preflight = None
+        fetches_rows = not (
+            getattr(args, "incremental", None) or getattr(args, "pushdown", False)
+        ) and (plan is None or plan.strategy.fetches_rows)
+        if fetches_rows and (
+            not getattr(args, "no_preflight", False) or columns or exclude_columns
+        ):
+            # report schema differences and project the select before fetching rows
+            preflight = schema.SchemaPreflight(
+                sc, RELATION_PROD, RELATION_DEV, columns, exclude_columns
+            )
+            preflight.run()
+            print_preflight(preflight, RELATION_PROD, RELATION_DEV)
+            query_prod = preflight.query(RELATION_PROD, FILTER)
+            query_dev = preflight.query(RELATION_DEV, FILTER)
+
+        if plan is not None:
+            ep = plan.strategy.profiler(
+                sc,
+                RELATION_PROD,
+                RELATION_DEV,
+                FILTER,
+                plan,
+                preflight=preflight,
+                jobs=jobs,
+                tracer=tracer,
+            )
+        elif getattr(args, "incremental", None):
+            from src.utils import ledger
+
+            ep = ledger.IncrementalProfiler(
+                sc,
+                RELATION_PROD,
+                RELATION_DEV,
+                args.incremental,
+                FILTER,
+                refresh=getattr(args, "refresh", False),
+            )
+        elif getattr(args, "pushdown", False):
+            from src.utils import pushdown
+
+            ep = pushdown.PushdownProfiler(sc, RELATION_PROD, RELATION_DEV, FILTER)
+        elif memory_budget:
+            from src.utils import spill
+
+            ep = spill.OutOfCoreProfiler(
+                sc.query_batches(query_prod), sc.query_batches(query_dev), memory_budget
+            )
+        elif getattr(args, "partitions", None):
+            from src.utils import partitions
+
+            ep = partitions.PartitionedProfiler(
+                sc,
+                RELATION_PROD,
+                RELATION_DEV,
+                FILTER,
+                args.partitions,
+                preflight=preflight,
+                # the projected columns exist in both tables
+                hash_columns=(
+                    [schema.quote_identifier(col) for col in preflight.projected]
+                    if preflight is not None
+                    else None
+                ),
+            )
+        elif getattr(args, "stream", False):
+            from src.utils import streaming_profile
+
+            ep = streaming_profile.StreamingProfiler(
+                sc.query_batches(query_prod), sc.query_batches(query_dev)
+            )
+        elif getattr(args, "sample", None):
+            from src.utils import expected_profile, sampling
+
+            seed = getattr(args, "seed", None)
+            clause = sampling.sample_clause(args.sample, seed)
+            # only a seeded percentage sample is repeatable, so only it is cached
+            repeatable = seed is not None and not sampling.parse_sample(args.sample)[1]
+            if preflight is not None:
+                sample_prod = preflight.query(RELATION_PROD, FILTER, clause)
+                sample_dev = preflight.query(RELATION_DEV, FILTER, clause)
+            else:
+                sample_prod = f"select * from {RELATION_PROD} {clause} where {FILTER}"
+                sample_dev = f"select * from {RELATION_DEV} {clause} where {FILTER}"
+            df_prod, df_dev = sc.query_concurrently(
+                sample_prod,
+                sample_dev,
+                relations=[RELATION_PROD, RELATION_DEV] if repeatable else None,
+            )
+
+            size, is_rows = sampling.parse_sample(args.sample)
+            if is_rows:
+                # a fixed-size sample stands for the whole filtered table
+                count_prod, count_dev = sc.query_concurrently(
+                    f"select count(*) from {RELATION_PROD} where {FILTER}",
+                    f"select count(*) from {RELATION_DEV} where {FILTER}",
+                )
+                scale_prod = int(count_prod.iloc[0, 0]) / max(len(df_prod), 1)
+                scale_dev = int(count_dev.iloc[0, 0]) / max(len(df_dev), 1)
+            else:
+                scale_prod = scale_dev = 100 / size
+
+            ep = expected_profile.ExpectedProfiler(
+                df_prod,
+                df_dev,
+                scale_prod,
+                scale_dev,
+                confidence=0.95,
+                tracer=tracer,
+                jobs=jobs,
+            )
+        else:
+            from src.utils import expected_profile
+
+            df_prod, df_dev = sc.query_concurrently(
+                query_prod, query_dev, relations=[RELATION_PROD, RELATION_DEV]
+            )
 
-        ep = expected_profile.ExpectedProfiler(df_prod, df_dev)
+            ep = expected_profile.ExpectedProfiler(
+                df_prod, df_dev, tracer=tracer, jobs=jobs
+            )
 
         ep.compare()
-        print("---" * 25)
-        print("DataFrame Key:\n")
-        print(f"df_1 = {DATABASE_PROD}.{SCHEMA_PROD.upper()}.{TABLE.upper()}")
-        print(f"df_2 = {DATABASE_DEV}.{SCHEMA_DEV.upper()}.{TABLE.upper()}")
-        #print("---" * 15)
-        print("\nTable Shape Differences:\n")
-        print(ep.shapes)
-
-        # if ep.compare() ran succesfully:
-        if ep.percent_differences != None:
-            print("---" * 15)
-            print("\nMean Percent Differences Between Numeric Columns:\n")
-            print(ep.percent_differences.loc["mean"])
-            print("---" * 25)
-            print("\nMean Frequency Ratio of Categorical Columns\n")
-            for col, ratio in ep.avg_frequency_ratio.items():
-                print(f"{col}: {ratio}")
-        else:
-            pass
-        print("---" * 25)
+        print_results(ep, RELATION_PROD, RELATION_DEV)
     except Exception as e:
         print(f"An error occurred with the query:\n {str(e)}")
+    finally:
+        if tracer is not None:
+            report_trace(tracer, sc, args.profile)
+        sc.close_connection()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,44 @@
+import re
+
+# kept free of pandas, numpy and pyarrow: parse_arguments validates the
+# flags with these functions before any heavy module is loaded
+
+MEMORY_UNITS = {"": 0, "K": 1, "M": 2, "G": 3, "T": 4}
+
+
+def parse_sample(sample: str):
+    """
+    Parses a --sample value.
+    Args:
+        sample (str): percentage of rows ('1', '0.5%') or a fixed row count ('10000 rows')
+    Returns:
+        (tuple) : size (float), is_rows (bool)
+    """
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*(%|rows)?\s*", sample.lower())
+    if match is None:
+        raise ValueError(
+            f"Invalid sample '{sample}'. Use a percentage (e.g. 1) or a row count (e.g. '10000 rows')."
+        )
+    size = float(match.group(1))
+    is_rows = match.group(2) == "rows"
+    if is_rows and not size.is_integer():
+        raise ValueError("A row count sample must be a whole number.")
+    if not is_rows and not 0 < size <= 100:
+        raise ValueError("A percentage sample must be between 0 and 100.")
+    return size, is_rows
+
+
+def parse_memory_budget(budget):
+    """
+    Parses a --memory-budget or --budget value.
+    Args:
+        budget (str): size with an optional unit, e.g. '512MB', '2GB', '1.5g' or bytes
+    Returns:
+        int: budget in bytes
+    """
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMGT]?)I?B?\s*", str(budget).upper())
+    if not match or float(match.group(1)) <= 0:
+        raise ValueError(
+            f"Invalid size '{budget}': use a size such as 512MB or 2GB."
+        )
+    return int(float(match.group(1)) * 1024 ** MEMORY_UNITS[match.group(2)])
@@ -0,0 +1,193 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+from src.utils import expected_profile
+
+SUMMARY_COLUMNS = [
+    "model",
+    "rows_df1",
+    "rows_df2",
+    "rows_pct_diff",
+    "max_abs_mean_pct_diff",
+    "min_avg_frequency_ratio",
+    "seconds",
+    "status",
+]
+
+
+def models_from_manifest(path: str):
+    """
+    Reads the models of a dbt target/manifest.json.
+    Args:
+        path (str): path to manifest.json
+    Returns:
+        list: (model name, custom schema or None) tuples
+    """
+    with open(path, "r") as file:
+        manifest = json.load(file)
+
+    models = []
+    for node in manifest.get("nodes", {}).values():
+        if node.get("resource_type") != "model":
+            continue
+        config = node.get("config", {})
+        if config.get("materialized") == "ephemeral" or not config.get("enabled", True):
+            continue
+        models.append((node.get("alias") or node["name"], config.get("schema")))
+    return sorted(models)
+
+
+def models_from_run_results(path: str):
+    """
+    Reads the models that ran successfully from a dbt target/run_results.json.
+    Custom schemas are taken from the manifest.json next to it when present.
+    Args:
+        path (str): path to run_results.json
+    Returns:
+        list: (model name, custom schema or None) tuples
+    """
+    with open(path, "r") as file:
+        run_results = json.load(file)
+
+    manifest_path = os.path.join(os.path.dirname(path), "manifest.json")
+    schemas = {}
+    if os.path.exists(manifest_path):
+        schemas = dict(models_from_manifest(manifest_path))
+
+    models = []
+    for result in run_results.get("results", []):
+        unique_id = result.get("unique_id", "")
+        if not unique_id.startswith("model.") or result.get("status") != "success":
+            continue
+        name = unique_id.split(".")[-1]
+        models.append((name, schemas.get(name)))
+    return sorted(models)
+
+
+def summarize(model: str, ep, seconds: float):
+    """
+    Condenses a finished comparison into one summary row.
+    Args:
+        model (str): model name
+        ep (ExpectedProfiler): profiler after compare() ran
+        seconds (float): wall time of the comparison
+    Returns:
+        dict: row with SUMMARY_COLUMNS
+    """
+    rows_1, rows_2 = ep.shapes.loc["rows", "df_1"], ep.shapes.loc["rows", "df_2"]
+    row = {
+        "model": model,
+        "rows_df1": int(rows_1),
+        "rows_df2": int(rows_2),
+        "rows_pct_diff": round(float(ep.shapes.loc["rows", "percent_difference"]), 2),
+        "max_abs_mean_pct_diff": np.nan,
+        "min_avg_frequency_ratio": np.nan,
+        "seconds": round(seconds, 2),
+        "status": "ok",
+    }
+    if ep.percent_differences is None and ep.avg_frequency_ratio is None:
+        row["status"] = "shape only"
+        return row
+    if ep.percent_differences is not None and len(ep.percent_differences.columns):
+        row["max_abs_mean_pct_diff"] = round(
+            float(ep.percent_differences.loc["mean"].abs().max()), 2
+        )
+    if ep.avg_frequency_ratio:
+        row["min_avg_frequency_ratio"] = round(
+            float(np.nanmin(list(ep.avg_frequency_ratio.values()))), 4
+        )
+    return row
+
+
+def format_row(row: dict):
+    """Formats a summary row as one fixed width line."""
+    return (
+        f"{str(row['model'])[:40]:<40} {row['rows_df1']!s:>12} {row['rows_df2']!s:>12} "
+        f"{row['rows_pct_diff']!s:>13} {row['max_abs_mean_pct_diff']!s:>21} "
+        f"{row['min_avg_frequency_ratio']!s:>23} {row['seconds']!s:>7}  {row['status']}"
+    )
+
+
+def header():
+    """Header line matching format_row."""
+    return format_row({col: col for col in SUMMARY_COLUMNS})
+
+
+class BatchComparison:
+    """
+    Compares many models on one shared SnowflakeConnector.
+
+    A bounded pool of workers runs the comparisons, each one submitting its
+    prod and dev queries concurrently on the shared connector, so the total
+    time is bounded by warehouse concurrency rather than by connection setup
+    per model.
+    Attributes:
+        connector (SnowflakeConnector): shared connector
+        models (list): (model name, prod relation, dev relation) tuples
+        filter_condition (str): where clause applied to every model
+        workers (int): models compared at the same time
+        results (list): summary rows, in completion order
+
+    Methods:
+        run: Yields a summary row as each model finishes
+        _compare: Compares a single model
+    """
+
+    def __init__(self, connector, models: list, filter_condition: str = "1 = 1", workers: int = 4):
+        self.connector = connector
+        self.models = models
+        self.filter_condition = filter_condition
+        self.workers = workers
+        self.results = []
+
+    def _compare(self, model: str, relation_1: str, relation_2: str):
+        """
+        Compares one model between its two relations.
+        Args:
+            model (str): model name
+            relation_1 (str): fully qualified prod table
+            relation_2 (str): fully qualified dev table
+        Returns:
+            dict: summary row
+        """
+        start = time.perf_counter()
+        df_1, df_2 = self.connector.query_concurrently(
+            f"select * from {relation_1} where {self.filter_condition}",
+            f"select * from {relation_2} where {self.filter_condition}",
+            relations=[relation_1, relation_2],
+        )
+        ep = expected_profile.ExpectedProfiler(df_1, df_2)
+        ep.compare()
+        return summarize(model, ep, time.perf_counter() - start)
+
+    def run(self):
+        """
+        Runs the comparisons and yields a summary row as each model finishes.
+        A failing model yields a row with its error instead of stopping the batch.
+        Args:
+            None
+        Yields:
+            dict: summary row with SUMMARY_COLUMNS
+        """
+        with ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="snow-diff-model"
+        ) as executor:
+            futures = {
+                executor.submit(self._compare, model, relation_1, relation_2): model
+                for model, relation_1, relation_2 in self.models
+            }
+            try:
+                for future in as_completed(futures):
+                    try:
+                        row = future.result()
+                    except Exception as e:
+                        row = {col: "" for col in SUMMARY_COLUMNS}
+                        row["model"] = futures[future]
+                        row["status"] = f"error: {str(e).splitlines()[0] if str(e) else type(e).__name__}"
+                    self.results.append(row)
+                    yield row
+            finally:
+                for future in futures:
+                    future.cancel()
@@ -0,0 +1,136 @@
+import time
+from concurrent.futures import as_completed
+from itertools import combinations
+import pandas as pd
+from src.utils import batch
+from src.utils.streaming_profile import StreamingProfiler, TableAccumulator
+
+
+def target_relation(target: str, output: dict, table: str, custom_schema: str = None, database: str = None):
+    """
+    Fully qualified name of a table in the schema of a profiles.yml target.
+    Custom schemas follow the dbt naming: <target schema>_<custom schema>.
+    Args:
+        target (str): target name, e.g. 'uat'
+        output (dict): the target in profiles.yml (outputs.<target>)
+        table (str): table name
+        custom_schema (str): dbt custom schema, None for the target schema
+        database (str): database used when the target does not set one
+    Returns:
+        str: database.schema.table
+    """
+    database = output.get("database") or database
+    if not database or not output.get("schema"):
+        raise KeyError(f"Target '{target}' in profiles.yml needs a database and a schema.")
+    schema = output["schema"] if custom_schema is None else f"{output['schema']}_{custom_schema}"
+    return f"{database}.{schema}.{table}"
+
+
+class EnvironmentComparison:
+    """
+    Class to compare one table across several environments (e.g. dev, UAT, prod).
+
+    Every environment is queried exactly once and all queries run at the
+    same time. Each result is profiled into a TableAccumulator as soon as
+    it arrives and then released, so only the profiles are kept. The
+    comparisons are computed from the profiles alone, for the baseline
+    against every other environment or for every pair, without fetching
+    any environment twice.
+
+    Attributes:
+        connector (SnowflakeConnector): connector used to run the queries
+        relations (dict): environment -> fully qualified table name, in order
+        filter_condition (str): where clause applied to every environment
+        baseline (str): environment the others are compared with (default: the first)
+        pairwise (bool): compare every pair of environments instead
+        profiles (dict): environment -> TableAccumulator of its rows
+        seconds (dict): environment -> seconds until its rows were profiled
+        comparisons (dict): (environment, environment) -> StreamingProfiler after summarize()
+        summary (DataFrame): one batch summary row (batch.SUMMARY_COLUMNS) per comparison
+
+    Methods:
+        compare: Profiles every environment and compares the pairs
+        pairs: Environments compared with each other
+        _profile: Queries every environment once and profiles the results
+    """
+
+    def __init__(
+        self,
+        connector,
+        relations: dict,
+        filter_condition: str = "1 = 1",
+        baseline: str = None,
+        pairwise: bool = False,
+    ):
+        if len(relations) < 2:
+            raise ValueError("At least two environments are needed for a comparison.")
+        baseline = baseline or next(iter(relations))
+        if baseline not in relations:
+            raise ValueError(
+                f"Baseline '{baseline}' is not one of the environments: {', '.join(relations)}"
+            )
+        self.connector = connector
+        self.relations = dict(relations)
+        self.filter_condition = filter_condition
+        self.baseline = baseline
+        self.pairwise = pairwise
+        self.profiles = {}
+        self.seconds = {}
+        self.comparisons = {}
+        self.summary = None
+
+    def pairs(self):
+        """
+        Environments compared with each other, first the reference side (df_1).
+        Args:
+            None
+        Returns:
+            list: (environment, environment) tuples
+        """
+        if self.pairwise:
+            return list(combinations(self.relations, 2))
+        return [(self.baseline, env) for env in self.relations if env != self.baseline]
+
+    def _profile(self):
+        """Queries every environment once, concurrently, and profiles each result."""
+        start = time.perf_counter()
+        handles = {}
+        try:
+            for env, relation in self.relations.items():
+                handle = self.connector.submit(
+                    f"select * from {relation} where {self.filter_condition}", relation
+                )
+                handles[handle.future] = (env, handle)
+            for future in as_completed(handles):
+                env = handles[future][0]
+                profile = TableAccumulator()
+                profile.update(future.result())
+                self.profiles[env] = profile
+                self.seconds[env] = time.perf_counter() - start
+        except BaseException:
+            for _, handle in handles.values():
+                handle.cancel()
+            raise
+
+    def compare(self):
+        """
+        Profiles every environment and compares the pairs from the profiles.
+        Args:
+            None
+        Returns:
+            None
+        """
+        self._profile()
+        rows = []
+        for env_1, env_2 in self.pairs():
+            profiler = StreamingProfiler.from_tables(self.profiles[env_1], self.profiles[env_2])
+            profiler.summarize()
+            self.comparisons[(env_1, env_2)] = profiler
+            rows.append(
+                batch.summarize(
+                    f"{env_1} vs {env_2}",
+                    profiler,
+                    max(self.seconds[env_1], self.seconds[env_2]),
+                )
+            )
+        self.summary = pd.DataFrame(rows, columns=batch.SUMMARY_COLUMNS)
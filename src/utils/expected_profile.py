@@ -1,5 +1,277 @@
+from contextlib import nullcontext
 import pandas as pd
 import numpy as np
+from src.utils import sampling, sketches
+
+
+def is_timestamp(column: pd.Series):
+    """
+    Whether a column holds timestamps or dates, NumPy or Arrow backed.
+    Args:
+        column (pd.Series): column
+    Returns:
+        bool: True for timestamp-like columns
+    """
+    return pd.api.types.is_datetime64_any_dtype(column) or (
+        isinstance(column.dtype, pd.ArrowDtype) and column.dtype.kind == "M"
+    )
+
+
+def percent_difference(describe_1: pd.DataFrame, describe_2: pd.DataFrame):
+    """
+    Calculates the percent difference between two describe() outputs.
+    Args:
+        describe_1 (pd.DataFrame): Descriptive statistics of the first table.
+        describe_2 (pd.DataFrame): Descriptive statistics of the second table.
+    Returns:
+        pd.DataFrame: Percent differences relative to describe_1
+    """
+    return ((describe_1 - describe_2) / describe_1) * 100
+
+
+def frequency_table(values, counts_1, counts_2):
+    """
+    Builds the frequency differences of one categorical column.
+    Args:
+        values (pd.Index): distinct values of the column in either table
+        counts_1 (np.ndarray): count of each value in the first table (0 if absent)
+        counts_2 (np.ndarray): count of each value in the second table (0 if absent)
+    Returns:
+        (tuple) : average frequency ratio (float), frequency differences (pd.DataFrame)
+    """
+    counts_1 = np.asarray(counts_1)
+    counts_2 = np.asarray(counts_2)
+
+    # the ratio is only defined for values present in both tables
+    shared = (counts_1 > 0) & (counts_2 > 0)
+    frequency_ratio = (
+        (counts_1[shared] / counts_2[shared]).mean() if shared.any() else np.nan
+    )
+
+    absolute_difference = np.abs(counts_1 - counts_2)
+    frequency_diff = pd.DataFrame(
+        {
+            "count_df1": counts_1,
+            "count_df2": counts_2,
+            "absolute_difference": absolute_difference,
+            "percent_difference": absolute_difference / (counts_1 + counts_2) * 100,
+            "percent_total_df1": counts_1 / counts_1.sum() * 100,
+            "percent_total_df2": counts_2 / counts_2.sum() * 100,
+        },
+        index=values,
+    )
+
+    return frequency_ratio, frequency_diff
+
+
+def frequency_comparison(counts_1: pd.Series, counts_2: pd.Series):
+    """
+    Compares the value counts of a single categorical column. Values present
+    in only one table are kept with a count of 0 on the other side.
+    Args:
+        counts_1 (pd.Series): Value counts of the column in the first table.
+        counts_2 (pd.Series): Value counts of the column in the second table.
+    Returns:
+        (tuple) : average frequency ratio (float), frequency differences (pd.DataFrame)
+    """
+    counts_1, counts_2 = counts_1.align(counts_2, join="outer", fill_value=0)
+    return frequency_table(counts_1.index, counts_1.to_numpy(), counts_2.to_numpy())
+
+
+def _exceeds_categories(columns, max_categories: int, chunk_rows: int):
+    """
+    Whether the columns hold more than max_categories distinct values
+    together. Chunks are read until the limit is crossed, so at most
+    max_categories values and one chunk are held at a time.
+    Args:
+        columns (list): pd.Series of the same column in both tables
+        max_categories (int): distinct values allowed
+        chunk_rows (int): rows read at a time
+    Returns:
+        bool: True once more than max_categories distinct values were seen
+    """
+    if sum(len(column) for column in columns) <= max_categories:
+        return False
+    seen = set()
+    for column in columns:
+        for start in range(0, len(column), chunk_rows):
+            seen.update(column.iloc[start:start + chunk_rows].dropna().unique())
+            if len(seen) > max_categories:
+                return True
+    return False
+
+
+def _sketch_column(column: pd.Series, chunk_rows: int):
+    """
+    CategoricalSketch of a column, fed one chunk at a time.
+    Args:
+        column (pd.Series): categorical column
+        chunk_rows (int): rows added at a time
+    Returns:
+        CategoricalSketch
+    """
+    sketch = sketches.CategoricalSketch()
+    for start in range(0, len(column), chunk_rows):
+        sketch.update(column.iloc[start:start + chunk_rows])
+    return sketch
+
+
+def categorical_comparison(
+    df_1,
+    df_2,
+    columns,
+    scale_1=1.0,
+    scale_2=1.0,
+    max_categories=None,
+    chunk_rows=sketches.SKETCH_CHUNK_ROWS,
+):
+    """
+    Compares the value counts of several categorical columns in one pass.
+
+    Each column is factorized once over the values of both tables, so both
+    sides share one code space, and the codes of every column are offset
+    into a single range so that one np.bincount per table counts all
+    columns at once. Nulls are skipped like in value_counts().
+
+    Columns with more than max_categories distinct values are summarized
+    with fixed-size sketches instead (see sketch_comparison), so their
+    frequency differences only list the heaviest values. These columns are
+    never factorized as a whole: they are read chunk_rows at a time, both
+    to find their cardinality and to feed the sketches.
+    Args:
+        df_1 (pd.DataFrame): first table
+        df_2 (pd.DataFrame): second table
+        columns (list): categorical columns present in both tables
+        scale_1 (float): factor applied to the counts of df_1
+        scale_2 (float): factor applied to the counts of df_2
+        max_categories (int): distinct values above which sketches are used (None = never)
+        chunk_rows (int): rows of a sketched column read at a time
+    Returns:
+        (tuple) : average frequency ratio per column (dict),
+                  frequency differences per column (dict),
+                  sketch summaries of the sketched columns (dict)
+    """
+    rows_1 = len(df_1)
+    exact_columns, codes_1, codes_2, uniques = [], [], [], []
+    avg_frequency_ratio = {}
+    frequency_differences = {}
+    sketch_summaries = {}
+    offset = 0
+    for col in columns:
+        if max_categories is not None and _exceeds_categories(
+            [df_1[col], df_2[col]], max_categories, chunk_rows
+        ):
+            (
+                avg_frequency_ratio[col],
+                frequency_differences[col],
+                sketch_summaries[col],
+            ) = sketch_comparison(
+                _sketch_column(df_1[col], chunk_rows),
+                _sketch_column(df_2[col], chunk_rows),
+                scale_1,
+                scale_2,
+            )
+            continue
+
+        codes, values = pd.factorize(
+            pd.concat([df_1[col], df_2[col]], ignore_index=True), use_na_sentinel=True
+        )
+        codes = np.where(codes >= 0, codes + offset, -1)
+        exact_columns.append(col)
+        codes_1.append(codes[:rows_1])
+        codes_2.append(codes[rows_1:])
+        uniques.append(values)
+        offset += len(values)
+
+    def count(codes):
+        codes = np.concatenate(codes) if codes else np.empty(0, dtype=np.intp)
+        return np.bincount(codes[codes >= 0], minlength=offset)
+
+    counts_1 = count(codes_1) * scale_1
+    counts_2 = count(codes_2) * scale_2
+
+    start = 0
+    for col, values in zip(exact_columns, uniques):
+        stop = start + len(values)
+        avg_frequency_ratio[col], frequency_differences[col] = frequency_table(
+            pd.Index(values), counts_1[start:stop], counts_2[start:stop]
+        )
+        start = stop
+
+    # keep the column order of the input
+    avg_frequency_ratio = {col: avg_frequency_ratio[col] for col in columns}
+    frequency_differences = {col: frequency_differences[col] for col in columns}
+    return avg_frequency_ratio, frequency_differences, sketch_summaries
+
+
+def sketch_comparison(sketch_1, sketch_2, scale_1=1.0, scale_2=1.0):
+    """
+    Compares two CategoricalSketch summaries of a high-cardinality column.
+
+    The frequency differences cover the heavy hitters of both sides, with
+    estimated counts; percent totals are relative to all rows, not only
+    to the listed values.
+    Args:
+        sketch_1 (CategoricalSketch): sketch of the first table
+        sketch_2 (CategoricalSketch): sketch of the second table
+        scale_1 (float): factor applied to the counts of the first table
+        scale_2 (float): factor applied to the counts of the second table
+    Returns:
+        (tuple) : average frequency ratio of the heavy hitters (float),
+                  frequency differences of the heavy hitters (pd.DataFrame),
+                  summary (pd.Series) with distinct_df1, distinct_df2 and jaccard
+    """
+    values = sketch_1.heavy_hitters.counts.index.union(sketch_2.heavy_hitters.counts.index)
+    counts_1 = sketch_1.estimate(values) * scale_1
+    counts_2 = sketch_2.estimate(values) * scale_2
+    frequency_ratio, frequency_diff = frequency_table(values, counts_1, counts_2)
+    frequency_diff["percent_total_df1"] = counts_1 / max(sketch_1.rows * scale_1, 1) * 100
+    frequency_diff["percent_total_df2"] = counts_2 / max(sketch_2.rows * scale_2, 1) * 100
+    frequency_diff = frequency_diff.sort_values("absolute_difference", ascending=False)
+
+    summary = pd.Series(
+        {
+            "distinct_df1": round(sketch_1.distinct.estimate()),
+            "distinct_df2": round(sketch_2.distinct.estimate()),
+            "jaccard": sketch_1.values.jaccard(sketch_2.values),
+        }
+    )
+    return frequency_ratio, frequency_diff, summary
+
+
+def distribution_comparison(sketches_1: dict, sketches_2: dict, quantiles=sketches.QUANTILES):
+    """
+    Compares the distributions of numeric columns from their quantile sketches.
+    Args:
+        sketches_1 (dict): column -> QuantileSketch of the first table
+        sketches_2 (dict): column -> QuantileSketch of the second table
+        quantiles (list): quantiles compared value by value
+    Returns:
+        (tuple) : KS distance and PSI per column (pd.DataFrame),
+                  percent differences of the quantiles per column (pd.DataFrame)
+    """
+    columns = [col for col in sketches_1 if col in sketches_2]
+    distribution_differences = pd.DataFrame(
+        {
+            "ks_distance": [
+                sketches.ks_distance(sketches_1[col], sketches_2[col]) for col in columns
+            ],
+            "psi": [
+                sketches.population_stability_index(sketches_1[col], sketches_2[col])
+                for col in columns
+            ],
+        },
+        index=pd.Index(columns, dtype=object),
+    )
+    index = pd.Index([f"{q:.0%}" for q in quantiles])
+    quantiles_1 = pd.DataFrame(
+        {col: sketches_1[col].quantiles(quantiles) for col in columns}, index=index
+    )
+    quantiles_2 = pd.DataFrame(
+        {col: sketches_2[col].quantiles(quantiles) for col in columns}, index=index
+    )
+    return distribution_differences, percent_difference(quantiles_1, quantiles_2)
+
 
 class ExpectedProfiler:
     """
@@ -8,8 +280,8 @@ class ExpectedProfiler:
     Attributes:
         df_1 (DataFrame): The first dataframe for comparison.
         df_2 (DataFrame): The second dataframe for comparison.
-        df_1_describe (DataFrame): Descriptive statistics of df_1.
-        df_2_describe (DataFrame): Descriptive statistics of df_2.
+        df_1_describe (DataFrame): Descriptive statistics of the numeric columns of df_1, set after conversion.
+        df_2_describe (DataFrame): Descriptive statistics of the numeric columns of df_2, set after conversion.
         numeric_cols (list): List of numeric column names in the dataframes.
         categorical_cols (list): List of categorical column names in the dataframes.
         shapes (DataFrame): Counts of rows/columns between dataframes and their percent/absolute differences.
@@ -17,37 +289,84 @@ class ExpectedProfiler:
         absolute_differences (DataFrame): Absolute differences between numeric values in the dataframes.
         avg_frequency_ratio (dict): Average frequency ratio of categorical values between the dataframes.
         frequency_differences (dict): Frequency differences of categorical values between the dataframes.
+        scale_1 (float): Factor scaling counts of df_1 back up when it is a sample (1 = full table).
+        scale_2 (float): Factor scaling counts of df_2 back up when it is a sample (1 = full table).
+        confidence (float): Confidence level of the intervals, None to skip them.
+        confidence_intervals (dict): Intervals of the mean percent differences and average frequency ratios.
+        tracer (Tracer): Records the convert/describe/categorical phases of compare (None = off).
+        max_categories (int): Distinct values above which a categorical column is summarized by sketches.
+        jobs (int): Worker processes the column comparisons are sharded across.
+        distribution_differences (DataFrame): KS distance and PSI of each numeric column.
+        quantile_differences (DataFrame): Percent differences of the 1%..99% quantiles of numeric columns.
+        sketch_summaries (dict): Estimated distinct counts and Jaccard similarity of the sketched columns.
 
     Methods:
         compare: Runs computations for comparison
+        compare_columns: Runs the column comparisons without the shape checks
         __numeric_comparions: Initializes class attributes related to numeric comparisons
+        __distribution_comparisons: Initializes distribution_differences and quantile_differences
         __categorical_comparisons: Initializes class attributes related to categorical comparisons
         __get_dataframe_shapes: Initializes shapes class attributes
        __try_numeric_conversion: Attempts to convert pd.Series to numeric columns if appropriate
        __convert_to_numeric: Loops through all columns and runs __try_numeric_conversion
+       __confidence_intervals: Initializes confidence_intervals for sampled dataframes
+       __phase: Records a phase of compare on the tracer
+       __parallel_comparisons: Runs compare_columns on shards of columns in worker processes
     """
 
-    def __init__(self, df_1, df_2):
+    def __init__(
+        self,
+        df_1,
+        df_2,
+        scale_1=1.0,
+        scale_2=1.0,
+        confidence=None,
+        tracer=None,
+        max_categories=sketches.SKETCH_THRESHOLD,
+        jobs=1,
+    ):
         """
         Initializes the ExpectedProfiler class with two dataframes.
 
         Args:
             df_1 (DataFrame): The first dataframe for comparison.
             df_2 (DataFrame): The second dataframe for comparison.
+            scale_1 (float): Rows in the first table per sampled row (1 if not sampled).
+            scale_2 (float): Rows in the second table per sampled row (1 if not sampled).
+            confidence (float): Confidence level (e.g. 0.95) of the sampling intervals.
+            tracer (Tracer): Optional phase tracer.
+            max_categories (int): Distinct values above which sketches are used (None = never).
+            jobs (int): Worker processes the columns are sharded across (1 = serial).
         Returns:
             None
         """
         self.df_1 = df_1
         self.df_2 = df_2
-        self.df_1_describe = df_1.describe()
-        self.df_2_describe = df_2.describe()
-        self.numeric_cols = df_1.select_dtypes(include="number").columns.tolist()
-        self.categorical_cols = df_1.select_dtypes(exclude="number").columns.tolist()
+        self.scale_1 = scale_1
+        self.scale_2 = scale_2
+        self.confidence = confidence
+        self.tracer = tracer
+        self.max_categories = max_categories
+        self.jobs = jobs
+        self.df_1_describe = None
+        self.df_2_describe = None
+        self.numeric_cols = None
+        self.categorical_cols = None
         self.shapes = self.__get_dataframe_shapes()
         self.percent_differences = None
         self.absolute_differences = None
         self.avg_frequency_ratio = None
         self.frequency_differences = None
+        self.confidence_intervals = None
+        self.sketch_summaries = None
+        self.distribution_differences = None
+        self.quantile_differences = None
+
+    def __phase(self, name: str):
+        """Records a phase of compare on the tracer, if any."""
+        if self.tracer is None:
+            return nullcontext({})
+        return self.tracer.phase(name, "df_1 + df_2")
 
     def __drop_timestamps(self, df: pd.DataFrame):
         """
@@ -57,27 +376,30 @@ class ExpectedProfiler:
         Returns:
             df_no_time (pd.DataFrame) : Dataframe without timestampped columns
         """
-        timestamp_cols = df.select_dtypes(include=['datetime64']).columns
+        timestamp_cols = [col for col in df.columns if is_timestamp(df[col])]
         df_no_time = df.drop(columns=timestamp_cols)
         
         return df_no_time
+
     def __try_numeric_conversion(self, column : pd.Series):
         """
-        Attempt to convert a pandas Series to a numeric data type.
+        Attempt to convert an untyped (object) pandas Series to a numeric data type.
+        Columns fetched by SnowflakeConnector are already typed from the cursor
+        metadata and are returned unchanged.
         Args:
         column (pandas.Series): The column to be converted.
         Returns:
         pandas.Series: The converted column if conversion is successful, otherwise the original column.
         """
+        if column.dtype != object:
+            return column
         try:
             # attempt to convert to numeric
-            converted_column = pd.to_numeric(column)
-            return converted_column
-        except:
-            # return string if not a number
-            column_string = column.astype('str')
-            return column_string
-        
+            return pd.to_numeric(column)
+        except (ValueError, TypeError):
+            # keep text columns as they are
+            return column
+
     def __convert_to_numeric(self):
         """
         Runs check to convert numeric columns 
@@ -90,6 +412,10 @@ class ExpectedProfiler:
         for col in self.df_1.columns:
             self.df_1[col] = self.__try_numeric_conversion(self.df_1[col])
             self.df_2[col] = self.__try_numeric_conversion(self.df_2[col])
+        self.numeric_cols = self.df_1.select_dtypes(include="number").columns.tolist()
+        self.categorical_cols = self.__drop_timestamps(self.df_1).select_dtypes(
+            exclude="number"
+        ).columns.tolist()
 
     def __numeric_comparisons(self):
         """
@@ -102,66 +428,106 @@ class ExpectedProfiler:
         Returns:
             None
         """
-        self.percent_differences = (
-            (self.df_1_describe - self.df_2_describe) / self.df_1_describe
-        ) * 100
-        self.absolute_differences = (
-            self.df_1.select_dtypes(include="number").describe()
-            - self.df_2.select_dtypes(include="number").describe()
-        ).abs()
+        # describe only the converted numeric columns (timestamps excluded)
+        self.df_1_describe = self.df_1.select_dtypes(include="number").describe()
+        self.df_2_describe = self.df_2.select_dtypes(include="number").describe()
+
+        describe_1 = self.df_1_describe
+        describe_2 = self.df_2_describe
+        if (self.scale_1, self.scale_2) != (1, 1):
+            # scale sampled counts back up to the table size
+            describe_1 = describe_1.mul(
+                pd.Series(self.scale_1, index=["count"]).reindex(describe_1.index, fill_value=1),
+                axis=0,
+            )
+            describe_2 = describe_2.mul(
+                pd.Series(self.scale_2, index=["count"]).reindex(describe_2.index, fill_value=1),
+                axis=0,
+            )
+
+        self.percent_differences = percent_difference(describe_1, describe_2)
+        self.absolute_differences = (self.df_1_describe - self.df_2_describe).abs()
+
+    def __distribution_comparisons(self):
+        """
+        Compares the distributions of the numeric columns.
+
+        Builds a mergeable quantile sketch per numeric column, the same
+        sketches the streaming mode builds batch by batch, and computes the
+        KS distance, PSI and quantile percent differences from them.
+        Args:
+            None
+        Returns:
+            None
+        """
+        quantile_sketches = []
+        for df in (self.df_1, self.df_2):
+            side = {}
+            for col in df.select_dtypes(include="number").columns:
+                side[col] = sketches.QuantileSketch()
+                side[col].update(df[col].to_numpy(dtype="float64", na_value=np.nan))
+            quantile_sketches.append(side)
+        self.distribution_differences, self.quantile_differences = distribution_comparison(
+            *quantile_sketches
+        )
 
     def __categorical_comparisons(self):
         """
         Performs categorical comparisons between the two dataframes.
 
         Calculates the average frequency ratio and frequency differences of categorical values
-        between the dataframes.
+        between the dataframes. Values found in only one dataframe are kept with a count of 0.
+        Columns with more than max_categories distinct values are compared with sketches.
 
         Args:
             None
         Returns:
             None
         """
-        avg_frequency_ratio = {}
-        frequency_differences = {}
-
-        for col in self.df_1.select_dtypes(exclude=["number"]):
-            # Calculate frequency ratios
-            frequency_ratio = (
-                self.df_1[col].value_counts().sort_index()
-                / self.df_2[col].value_counts().sort_index()
-            ).mean()
-            avg_frequency_ratio[col] = frequency_ratio
+        columns = self.__drop_timestamps(self.df_1).select_dtypes(exclude=["number"])
+        (
+            self.avg_frequency_ratio,
+            self.frequency_differences,
+            self.sketch_summaries,
+        ) = categorical_comparison(
+            self.df_1,
+            self.df_2,
+            columns.columns.tolist(),
+            self.scale_1,
+            self.scale_2,
+            self.max_categories,
+        )
 
-            # Calculate frequency differences
-            frequency_diff = pd.DataFrame(self.df_1[col].value_counts()).merge(
-                pd.DataFrame(self.df_2[col].value_counts()),
-                left_index=True,
-                right_index=True,
-                suffixes=("_df1", "_df2"),
+    def __confidence_intervals(self):
+        """
+        Computes sampling confidence intervals of the mean percent differences
+        and of the average frequency ratios.
+        Args:
+            None
+        Returns:
+            None
+        """
+        frequency_ratios = {}
+        for col, frequency_diff in self.frequency_differences.items():
+            # unscaled sample counts of the values present in both tables
+            frequency_ratios[col] = sampling.frequency_ratio_interval(
+                frequency_diff["count_df1"] / self.scale_1,
+                frequency_diff["count_df2"] / self.scale_2,
+                self.confidence,
+                scale=self.scale_1 / self.scale_2,
             )
-            frequency_diff["absolute_difference"] = abs(
-                frequency_diff["count_df1"] - frequency_diff["count_df2"]
+        if self.df_1_describe is not None:
+            mean_intervals = sampling.mean_difference_intervals(
+                self.df_1_describe, self.df_2_describe, self.confidence
             )
-            frequency_diff["percent_difference"] = (
-                frequency_diff["absolute_difference"]
-                / (frequency_diff["count_df1"] + frequency_diff["count_df2"])
-            ) * 100
-
-            # Calculate percent of total
-            total_count_df1 = frequency_diff["count_df1"].sum()
-            total_count_df2 = frequency_diff["count_df2"].sum()
-            frequency_diff["percent_total_df1"] = (
-                frequency_diff["count_df1"] / total_count_df1
-            ) * 100
-            frequency_diff["percent_total_df2"] = (
-                frequency_diff["count_df2"] / total_count_df2
-            ) * 100
-
-            frequency_differences[col] = frequency_diff
-
-        self.avg_frequency_ratio = avg_frequency_ratio
-        self.frequency_differences = frequency_differences
+        else:
+            mean_intervals = pd.DataFrame(columns=["estimate", "lower", "upper"])
+        self.confidence_intervals = {
+            "mean_percent_differences": mean_intervals,
+            "avg_frequency_ratio": pd.DataFrame(
+                frequency_ratios, index=["estimate", "lower", "upper"]
+            ).T,
+        }
 
     def __get_dataframe_shapes(self):
         """
@@ -173,8 +539,8 @@ class ExpectedProfiler:
         """
         df = pd.DataFrame(
             {
-                "df_1": [self.df_1.shape[0], self.df_1.shape[1]],
-                "df_2": [self.df_2.shape[0], self.df_2.shape[1]],
+                "df_1": [round(self.df_1.shape[0] * self.scale_1), self.df_1.shape[1]],
+                "df_2": [round(self.df_2.shape[0] * self.scale_2), self.df_2.shape[1]],
             },
             index=["rows", "columns"],
         )
@@ -187,6 +553,75 @@ class ExpectedProfiler:
         )
         return df
 
+    def compare_columns(self):
+        """
+        Converts and compares the columns, without the shape checks of
+        compare. Each worker of the parallel mode runs it on its shard.
+        Args:
+            None
+        Returns:
+            None
+        """
+        self.__convert_to_numeric()
+        if self.numeric_cols:
+            self.__numeric_comparisons()
+            self.__distribution_comparisons()
+        self.__categorical_comparisons()
+
+    def __parallel_comparisons(self):
+        """
+        Shards the columns across jobs worker processes and merges their
+        results into the comparison attributes, in column order.
+        Args:
+            None
+        Returns:
+            bool: False if the frames could not be shared (nothing was computed)
+        """
+        from src.utils import parallel
+
+        df_1 = self.__drop_timestamps(self.df_1)
+        shards = parallel.profile_columns(
+            df_1,
+            self.df_2[df_1.columns],
+            self.jobs,
+            self.scale_1,
+            self.scale_2,
+            self.max_categories,
+        )
+        if shards is None:
+            return False
+
+        order = {col: i for i, col in enumerate(df_1.columns)}
+        self.numeric_cols = sorted(
+            (col for shard in shards for col in shard["numeric_cols"]), key=order.get
+        )
+        self.categorical_cols = sorted(
+            (col for shard in shards for col in shard["categorical_cols"]), key=order.get
+        )
+        if self.numeric_cols:
+            for attribute in (
+                "df_1_describe",
+                "df_2_describe",
+                "percent_differences",
+                "absolute_differences",
+                "quantile_differences",
+            ):
+                frames = [shard[attribute] for shard in shards if shard[attribute] is not None]
+                setattr(self, attribute, pd.concat(frames, axis=1)[self.numeric_cols])
+            self.distribution_differences = pd.concat(
+                [shard["distribution_differences"] for shard in shards if shard["numeric_cols"]]
+            ).loc[self.numeric_cols]
+        for attribute in ("avg_frequency_ratio", "frequency_differences", "sketch_summaries"):
+            merged = {}
+            for shard in shards:
+                merged.update(shard[attribute])
+            setattr(
+                self,
+                attribute,
+                {col: merged[col] for col in self.categorical_cols if col in merged},
+            )
+        return True
+
     def compare(self):
         """
         Compares the two dataframes.
@@ -207,12 +642,31 @@ class ExpectedProfiler:
             assert len(df_2) > 0, "DataFrame 2 has zero length."
 
             if set(df_1.columns) == set(df_2.columns):
-                self.__convert_to_numeric()
-                if len(df_1.select_dtypes(include=np.number).columns) == len(df_2.select_dtypes(include=np.number).columns):
-                    self.__numeric_comparisons()
-                    self.__categorical_comparisons()
-                else:
-                    pass                                                    
+                with self.__phase("convert"):
+                    self.__convert_to_numeric()
+                # counted after the conversion, which turns numeric text into numbers
+                comparable = len(
+                    self.__drop_timestamps(self.df_1).select_dtypes(include=np.number).columns
+                ) == len(self.__drop_timestamps(self.df_2).select_dtypes(include=np.number).columns)
+                parallel = False
+                if self.jobs > 1 and comparable:
+                    with self.__phase("parallel") as record:
+                        parallel = self.__parallel_comparisons()
+                        record["rows"] = len(self.df_1) + len(self.df_2)
+                if comparable and not parallel:
+                    if self.numeric_cols:
+                        with self.__phase("describe") as record:
+                            self.__numeric_comparisons()
+                            record["rows"] = len(self.df_1) + len(self.df_2)
+                        with self.__phase("distribution") as record:
+                            self.__distribution_comparisons()
+                            record["rows"] = len(self.df_1) + len(self.df_2)
+                    with self.__phase("categorical") as record:
+                        self.__categorical_comparisons()
+                        record["rows"] = len(self.df_1) + len(self.df_2)
+                if comparable and self.confidence is not None:
+                    with self.__phase("confidence"):
+                        self.__confidence_intervals()
             else:
                 pass
         except AssertionError as e:
@@ -0,0 +1,161 @@
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+TRACE_COLUMNS = [
+    "phase",
+    "side",
+    "seconds",
+    "rows",
+    "bytes",
+    "peak_rss_mb",
+    "rss_growth_mb",
+    "query_id",
+    "bytes_scanned",
+]
+
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process in MB, None where unavailable.
+    This is the high-water mark since the process started, not of a phase.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes on Linux
+    return round(peak / 1024**2 if sys.platform == "darwin" else peak / 1024, 1)
+
+
+class Tracer:
+    """
+    Records the wall time and resources of each phase of a comparison.
+
+    Components that accept a tracer (SnowflakeConnector, ExpectedProfiler)
+    wrap their phases in tracer.phase(name, side) and fill in rows, bytes
+    and query IDs on the yielded record. Hooks are called with every
+    finished record, so callers can stream or forward them.
+
+    peak_rss_mb is the peak of the whole process when the phase ends and
+    rss_growth_mb how much the phase raised it, 0 when the phase stayed
+    below an earlier peak. Concurrent phases share the process peak.
+    Attributes:
+        records (list): finished phase records (dicts with TRACE_COLUMNS)
+        hooks (list): callables receiving each finished record
+
+    Methods:
+        phase: Context manager timing one phase
+        add_hook: Registers a callable for finished records
+        query_ids: Snowflake query IDs seen so far
+        add_query_history: Adds bytes_scanned from QUERY_HISTORY rows
+        format_table: Human-readable table of the records
+        to_json: Writes the records as a JSON trace file
+    """
+
+    def __init__(self):
+        self.records = []
+        self.hooks = []
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook):
+        """
+        Registers a callable that receives every finished record.
+        Args:
+            hook (callable): function taking a record dict
+        Returns:
+            None
+        """
+        self.hooks.append(hook)
+
+    @contextmanager
+    def phase(self, name: str, side: str = None):
+        """
+        Times one phase. The yielded record can be updated with rows, bytes
+        and query_id before the phase ends.
+        Args:
+            name (str): phase name, e.g. 'execute', 'fetch', 'describe'
+            side (str): table the phase works on, e.g. 'prod' or 'dev'
+        Yields:
+            dict: record of the phase
+        """
+        record = {col: None for col in TRACE_COLUMNS}
+        record.update(phase=name, side=side)
+        rss_before = peak_rss_mb()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = round(time.perf_counter() - start, 4)
+            record["peak_rss_mb"] = peak_rss_mb()
+            if rss_before is not None:
+                record["rss_growth_mb"] = round(record["peak_rss_mb"] - rss_before, 1)
+            with self._lock:
+                self.records.append(record)
+            for hook in self.hooks:
+                hook(record)
+
+    def query_ids(self):
+        """Snowflake query IDs recorded so far."""
+        return [record["query_id"] for record in self.records if record["query_id"]]
+
+    def add_query_history(self, history):
+        """
+        Adds bytes_scanned to the records of the queries in history.
+        Args:
+            history (pd.DataFrame): QUERY_HISTORY rows with QUERY_ID and BYTES_SCANNED
+        Returns:
+            None
+        """
+        columns = {col.lower(): col for col in history.columns}
+        scanned = dict(
+            zip(history[columns["query_id"]], history[columns["bytes_scanned"]])
+        )
+        for record in self.records:
+            if record["query_id"] in scanned:
+                record["bytes_scanned"] = int(scanned[record["query_id"]])
+
+    def format_table(self):
+        """
+        Formats the records as a fixed width table, with the total time of
+        each phase at the end.
+        Args:
+            None
+        Returns:
+            str: table
+        """
+        widths = [16, 24, 9, 11, 13, 12, 14, 38, 14]
+        lines = [" ".join(f"{col:<{width}}" for col, width in zip(TRACE_COLUMNS, widths))]
+        for record in self.records:
+            lines.append(
+                " ".join(
+                    f"{'' if record[col] is None else record[col]!s:<{width}}"
+                    for col, width in zip(TRACE_COLUMNS, widths)
+                )
+            )
+
+        totals = {}
+        for record in self.records:
+            totals[record["phase"]] = totals.get(record["phase"], 0) + record["seconds"]
+        lines.append("")
+        lines.append("Total seconds per phase (concurrent phases overlap):")
+        for phase, seconds in totals.items():
+            lines.append(f"  {phase:<16} {seconds:.4f}")
+        return "\n".join(lines)
+
+    def to_json(self, path: str):
+        """
+        Writes the records as a JSON trace file.
+        Args:
+            path (str): output file
+        Returns:
+            None
+        """
+        with open(path, "w") as file:
+            json.dump({"records": self.records}, file, indent=2, default=str)
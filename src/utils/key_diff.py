@@ -0,0 +1,309 @@
+import pandas as pd
+from src.utils.pushdown import quote_identifier
+
+# HASH() returns a signed 64-bit integer
+HASH_RANGE = (-(2**63), 2**63 - 1)
+
+
+def segment_case(expression: str, low: int, high: int, width: int):
+    """
+    SQL expression numbering the segments of [low, high] an expression falls in.
+
+    The boundaries are computed exactly on Python integers and compared
+    against the expression, so no division or subtraction runs in SQL:
+    over the HASH range these would not fit a signed 64-bit integer or a
+    float and rows near a boundary would land in the wrong segment.
+    Args:
+        expression (str): SQL expression
+        low (int): first value of the range
+        high (int): last value of the range
+        width (int): number of values per segment
+    Returns:
+        str: SQL case expression, 0 for the first segment
+    """
+    boundaries = range(low + width, high + 1, width)
+    if not boundaries:
+        return "0"
+    cases = " ".join(
+        f"when {expression} < {boundary} then {segment}"
+        for segment, boundary in enumerate(boundaries)
+    )
+    return f"case {cases} else {len(boundaries)} end"
+
+
+def _comparable(column: pd.Series):
+    """
+    Values of a column that can be compared with the other table: categoricals
+    of each table have their own categories, so they are compared by value.
+    """
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return column.astype(column.cat.categories.dtype)
+    return column
+
+
+def diff_by_key(rows_1: pd.DataFrame, rows_2: pd.DataFrame, key: list, columns: list):
+    """
+    Compares the rows of two tables by key.
+    Args:
+        rows_1 (pd.DataFrame): rows of the first table
+        rows_2 (pd.DataFrame): rows of the second table
+        key (list): primary key column(s)
+        columns (list): columns compared, including the key
+    Returns:
+        (tuple) : deleted (keys only in rows_1), inserted (keys only in rows_2),
+        updated (keys in both with their changed_columns)
+    """
+    merged = rows_1.merge(
+        rows_2, on=key, how="outer", suffixes=("_df1", "_df2"), indicator=True
+    )
+    deleted = merged.loc[merged["_merge"] == "left_only", key].reset_index(drop=True)
+    inserted = merged.loc[merged["_merge"] == "right_only", key].reset_index(drop=True)
+
+    both = merged[merged["_merge"] == "both"]
+    changed = pd.DataFrame(index=both.index)
+    for col in columns:
+        if col in key:
+            continue
+        left, right = _comparable(both[f"{col}_df1"]), _comparable(both[f"{col}_df2"])
+        changed[col] = ~((left == right).fillna(False) | (left.isna() & right.isna()))
+
+    is_updated = changed.any(axis=1)
+    updated = both.loc[is_updated, key]
+    updated = updated.assign(
+        changed_columns=[changed.columns[changed.loc[i]].tolist() for i in updated.index]
+    ).reset_index(drop=True)
+    return deleted, inserted, updated
+
+
+class KeyDiff:
+    """
+    Class to find the rows that differ between two tables sharing a primary key.
+
+    Both tables are split into key-range segments and a HASH_AGG checksum is
+    computed per segment inside Snowflake. Only segments whose row count or
+    checksum differ are bisected further, and only the rows of the smallest
+    differing segments are fetched, so the data transferred scales with the
+    number of differences instead of the table size.
+
+    Integer keys are segmented on their values; any other key (or a
+    composite key) is segmented on HASH(key), whose range is fixed. Rows
+    with a null key are ignored and keys are assumed to be unique.
+
+    Attributes:
+        connector (SnowflakeConnector): connector used to run the queries
+        relation_1 (str): fully qualified name of the first table
+        relation_2 (str): fully qualified name of the second table
+        key (list): primary key column(s)
+        filter_condition (str): where clause applied to both tables
+        segments (int): number of segments a differing range is split into
+        max_segment_rows (int): segments with at most this many rows are fetched
+        columns (list): columns compared (shared by both tables)
+        inserted (DataFrame): keys only present in relation_2
+        deleted (DataFrame): keys only present in relation_1
+        updated (DataFrame): keys present in both with the columns that changed
+        queries (int): number of checksum queries issued per table
+        rows_fetched (int): number of rows pulled from both tables
+
+    Methods:
+        compare: Bisects the differing segments and diffs their rows
+        _segment_expression: Picks the expression segments are computed on
+        _checksums: Runs the checksum query for a range on both tables
+        _bisect: Finds the smallest segments whose checksums differ
+        _diff_rows: Fetches the differing segments and compares them by key
+    """
+
+    def __init__(
+        self,
+        connector,
+        relation_1: str,
+        relation_2: str,
+        key,
+        filter_condition: str = "1 = 1",
+        segments: int = 16,
+        max_segment_rows: int = 1000,
+    ):
+        self.connector = connector
+        self.relation_1 = relation_1
+        self.relation_2 = relation_2
+        self.key = [key] if isinstance(key, str) else list(key)
+        self.filter_condition = filter_condition
+        self.segments = segments
+        self.max_segment_rows = max_segment_rows
+        self.columns = None
+        self.inserted = None
+        self.deleted = None
+        self.updated = None
+        self.queries = 0
+        self.rows_fetched = 0
+
+    def _shared_columns(self):
+        """Columns present in both tables, in the order of relation_1."""
+        empty_1, empty_2 = self.connector.query_concurrently(
+            f"select * from {self.relation_1} where 1 = 0",
+            f"select * from {self.relation_2} where 1 = 0",
+        )
+        return [col for col in empty_1.columns if col in set(empty_2.columns)]
+
+    def _bounds(self, expression: str):
+        """
+        Smallest and largest value of an expression over both tables.
+        Args:
+            expression (str): SQL expression
+        Returns:
+            (tuple) : minimum, maximum (None if both tables are empty),
+                      whether the expression is integer typed (bool)
+        """
+        bounds = self.connector.query_concurrently(
+            *[
+                f"""
+                select min({expression}), max({expression})
+                from {relation}
+                where {self.filter_condition}
+                """
+                for relation in (self.relation_1, self.relation_2)
+            ]
+        )
+        # the type of the result, not the bounds: 0.0 and 5009.0 may bound 1234.5
+        typed = [df[col] for df in bounds for col in df.columns if df[col].notna().any()]
+        integer = all(pd.api.types.is_integer_dtype(column) for column in typed)
+        values = [v for column in typed for v in column.dropna().tolist()]
+        if not values:
+            return None, None, integer
+        return min(values), max(values), integer
+
+    def _segment_expression(self):
+        """
+        Picks the expression segments are computed on and its bounds.
+        Integer typed keys are segmented on their values, any other key on
+        its hash.
+        Args:
+            None
+        Returns:
+            (tuple) : expression (str), minimum (int), maximum (int)
+        """
+        if len(self.key) == 1:
+            expression = quote_identifier(self.key[0])
+            low, high, integer = self._bounds(expression)
+            if low is None or integer:
+                return expression, low, high
+
+        expression = "hash({})".format(", ".join(quote_identifier(k) for k in self.key))
+        return (expression,) + HASH_RANGE
+
+    def _checksums(self, expression: str, low: int, high: int, width: int):
+        """
+        Row counts and HASH_AGG checksums per segment of [low, high] on both tables.
+        Args:
+            expression (str): segment expression
+            low (int): first value of the range
+            high (int): last value of the range
+            width (int): number of values per segment
+        Returns:
+            pd.DataFrame: one row per segment number with rows/checksum per table
+        """
+        columns = ", ".join(quote_identifier(col) for col in self.columns)
+        queries = [
+            f"""
+            select {segment_case(expression, low, high, width)} as segment,
+                count(*) as row_count,
+                hash_agg({columns}) as checksum
+            from {relation}
+            where {self.filter_condition}
+                and {expression} between {low} and {high}
+            group by 1
+            """
+            for relation in (self.relation_1, self.relation_2)
+        ]
+        self.queries += 1
+        checksums_1, checksums_2 = self.connector.query_concurrently(*queries)
+        for checksums in (checksums_1, checksums_2):
+            checksums.columns = ["segment", "rows", "checksum"]
+            checksums["segment"] = checksums["segment"].astype("int64")
+        return checksums_1.merge(
+            checksums_2, on="segment", how="outer", suffixes=("_1", "_2")
+        )
+
+    def _bisect(self, expression: str, low: int, high: int):
+        """
+        Finds the smallest segments of [low, high] whose checksums differ.
+        Args:
+            expression (str): segment expression
+            low (int): first value of the range
+            high (int): last value of the range
+        Returns:
+            list: (low, high) ranges to fetch
+        """
+        # integer ceiling division, the hash range does not fit a float exactly
+        width = max(1, -(-(high - low + 1) // self.segments))
+        checksums = self._checksums(expression, low, high, width)
+
+        differing = []
+        for row in checksums.itertuples():
+            if row.rows_1 == row.rows_2 and row.checksum_1 == row.checksum_2:
+                continue
+            segment_low = low + int(row.segment) * width
+            segment_high = min(high, segment_low + width - 1)
+            largest = max(
+                0 if pd.isna(row.rows_1) else row.rows_1,
+                0 if pd.isna(row.rows_2) else row.rows_2,
+            )
+            if largest <= self.max_segment_rows or segment_low == segment_high:
+                differing.append((segment_low, segment_high))
+            else:
+                differing.extend(self._bisect(expression, segment_low, segment_high))
+        return differing
+
+    def _diff_rows(self, expression: str, ranges: list):
+        """
+        Fetches the rows of the differing ranges and compares them by key.
+        Args:
+            expression (str): segment expression
+            ranges (list): (low, high) ranges to fetch
+        Returns:
+            None
+        """
+        columns = ", ".join(quote_identifier(col) for col in self.columns)
+        ranges_condition = " or ".join(
+            f"{expression} between {low} and {high}" for low, high in ranges
+        )
+        rows_1, rows_2 = self.connector.query_concurrently(
+            *[
+                f"""
+                select {columns}
+                from {relation}
+                where {self.filter_condition}
+                    and ({ranges_condition})
+                """
+                for relation in (self.relation_1, self.relation_2)
+            ]
+        )
+        self.rows_fetched = len(rows_1) + len(rows_2)
+        self.deleted, self.inserted, self.updated = diff_by_key(
+            rows_1, rows_2, self.key, self.columns
+        )
+
+    def compare(self):
+        """
+        Bisects the differing segments and diffs their rows by key.
+        Args:
+            None
+        Returns:
+            None
+        """
+        self.columns = self._shared_columns()
+        # match the key case-insensitively, Snowflake returns upper case names
+        lookup = {col.upper(): col for col in self.columns}
+        self.key = [lookup.get(k.upper(), k) for k in self.key]
+        missing = [k for k in self.key if k not in self.columns]
+        if missing:
+            raise KeyError(f"Key column(s) {missing} are not present in both tables.")
+
+        expression, low, high = self._segment_expression()
+        ranges = [] if low is None else self._bisect(expression, int(low), int(high))
+
+        if ranges:
+            self._diff_rows(expression, ranges)
+        else:
+            empty = pd.DataFrame(columns=self.key)
+            self.inserted, self.deleted = empty, empty.copy()
+            self.updated = empty.assign(changed_columns=[])
@@ -0,0 +1,342 @@
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import pandas as pd
+from src.utils.pushdown import quote_identifier
+from src.utils.result_cache import normalize_query
+from src.utils.streaming_profile import StreamingProfiler, TableAccumulator
+
+DEFAULT_LEDGER_PATH = os.path.join(os.path.expanduser("~"), ".snowdiff", "ledger.sqlite")
+
+# stands for the partition of rows whose partition column is null
+NULL_PARTITION = "\x00null"
+PARTITION_COLUMN = "__SNOWDIFF_PARTITION"
+
+
+class ChecksumLedger:
+    """
+    Local SQLite store of per-partition checksums and statistics.
+
+    Every entry belongs to a scope (a table, partition column, filter and
+    column layout, see scope) and a partition value, and holds the row
+    count and HASH_AGG checksum of the partition with its pickled
+    TableAccumulator.
+    Attributes:
+        path (str): SQLite database file
+
+    Methods:
+        scope: Key of one table/partition column/filter/column layout
+        load: Entries of a scope
+        save: Inserts or replaces entries of a scope
+        remove: Deletes partitions of a scope
+        clear: Deletes every entry
+    """
+
+    def __init__(self, path: str = DEFAULT_LEDGER_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        """Opens the database, creating it on first use."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.execute(
+            """
+            create table if not exists partitions (
+                scope text not null,
+                partition text not null,
+                row_count integer not null,
+                checksum text,
+                stats blob not null,
+                updated_at real not null,
+                primary key (scope, partition)
+            )
+            """
+        )
+        return conn
+
+    @staticmethod
+    def scope(relation: str, partition_by: str, filter_condition: str, layout):
+        """
+        Key of the entries of one table, partition column, filter and
+        column layout; a change to any of them starts a new ledger.
+        Args:
+            relation (str): fully qualified table name
+            partition_by (str): partition column
+            filter_condition (str): where clause of the comparison
+            layout: JSON serializable column classification
+        Returns:
+            str: hex digest
+        """
+        text = json.dumps(
+            [relation.upper(), partition_by, normalize_query(filter_condition), layout]
+        )
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def load(self, scope: str):
+        """
+        Entries of a scope.
+        Args:
+            scope (str): key returned by scope()
+        Returns:
+            dict: partition -> (row_count, checksum, TableAccumulator)
+        """
+        with self._lock:
+            conn = self._connect()
+            try:
+                rows = conn.execute(
+                    "select partition, row_count, checksum, stats from partitions where scope = ?",
+                    (scope,),
+                ).fetchall()
+            finally:
+                conn.close()
+        return {
+            partition: (row_count, checksum, pickle.loads(stats))
+            for partition, row_count, checksum, stats in rows
+        }
+
+    def save(self, scope: str, entries: dict):
+        """
+        Inserts or replaces entries of a scope.
+        Args:
+            scope (str): key returned by scope()
+            entries (dict): partition -> (row_count, checksum, TableAccumulator)
+        Returns:
+            None
+        """
+        now = time.time()
+        rows = [
+            (scope, partition, int(row_count), checksum, pickle.dumps(stats), now)
+            for partition, (row_count, checksum, stats) in entries.items()
+        ]
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.executemany(
+                        "insert or replace into partitions values (?, ?, ?, ?, ?, ?)", rows
+                    )
+            finally:
+                conn.close()
+
+    def remove(self, scope: str, partitions):
+        """Deletes partitions of a scope."""
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.executemany(
+                        "delete from partitions where scope = ? and partition = ?",
+                        [(scope, partition) for partition in partitions],
+                    )
+            finally:
+                conn.close()
+
+    def clear(self):
+        """Deletes every entry."""
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute("delete from partitions")
+            finally:
+                conn.close()
+
+
+class IncrementalProfiler(StreamingProfiler):
+    """
+    Class to perform the StreamingProfiler comparisons incrementally.
+
+    Each table is split into the partitions of one column. One GROUP BY
+    query per table returns the row count and HASH_AGG checksum of every
+    partition; only partitions whose checksum changed since the last run
+    are fetched, their accumulators are rebuilt, and they are merged with
+    the accumulators of the unchanged partitions stored in the ledger.
+
+    Columns are classified once per table on a small sample, so every
+    partition has the same accumulators and a changed classification
+    starts a new ledger scope.
+    Attributes:
+        connector (SnowflakeConnector): connector used to run the queries
+        relation_1 (str): fully qualified name of the first table
+        relation_2 (str): fully qualified name of the second table
+        partition_by (str): partition column
+        filter_condition (str): where clause applied to both tables
+        ledger (ChecksumLedger): store of the partition checksums and statistics
+        refresh (bool): recompute every partition
+        sample_rows (int): rows fetched to classify the columns
+        partitions (dict): relation -> number of partitions
+        recomputed (dict): relation -> number of partitions fetched in this run
+
+    Methods:
+        compare: Updates the ledger and computes the comparisons
+        _classify: Column accumulators of both tables from a sample
+        _checksums: Row counts and checksums per partition of both tables
+        _refresh: Rebuilds the accumulators of the changed partitions of one table
+    """
+
+    def __init__(
+        self,
+        connector,
+        relation_1: str,
+        relation_2: str,
+        partition_by: str,
+        filter_condition: str = "1 = 1",
+        ledger: ChecksumLedger = None,
+        refresh: bool = False,
+        sample_rows: int = 1000,
+    ):
+        super().__init__(None, None)
+        self.connector = connector
+        self.relation_1 = relation_1
+        self.relation_2 = relation_2
+        self.partition_by = partition_by
+        self.filter_condition = filter_condition
+        self.ledger = ledger if ledger is not None else ChecksumLedger()
+        self.refresh = refresh
+        self.sample_rows = sample_rows
+        self.partitions = {}
+        self.recomputed = {}
+
+    def _classify(self):
+        """
+        Empty TableAccumulators of both tables, classified on a sample.
+        Resolves partition_by case-insensitively.
+        Args:
+            None
+        Returns:
+            (tuple) : TableAccumulator of relation_1, TableAccumulator of relation_2
+        """
+        samples = self.connector.query_concurrently(
+            *[
+                f"select * from {relation} where {self.filter_condition} limit {self.sample_rows}"
+                for relation in (self.relation_1, self.relation_2)
+            ]
+        )
+        matches = [
+            col for col in samples[0].columns if col.upper() == self.partition_by.upper()
+        ]
+        if not matches or matches[0] not in samples[1].columns:
+            raise ValueError(f"Partition column {self.partition_by} is not in both tables.")
+        self.partition_by = matches[0]
+
+        templates = []
+        for sample in samples:
+            template = TableAccumulator()
+            template._classify(sample)
+            templates.append(template)
+        return tuple(templates)
+
+    def _checksums(self, columns_1: list, columns_2: list):
+        """
+        Row count and checksum of every partition of both tables.
+        Args:
+            columns_1 (list): columns of relation_1
+            columns_2 (list): columns of relation_2
+        Returns:
+            (tuple) : dict partition -> (row_count, checksum) per table
+        """
+        partition = quote_identifier(self.partition_by)
+        results = self.connector.query_concurrently(
+            *[
+                f"""
+                select cast({partition} as varchar) as partition,
+                    count(*) as row_count,
+                    hash_agg({", ".join(quote_identifier(col) for col in columns)}) as checksum
+                from {relation}
+                where {self.filter_condition}
+                group by 1
+                """
+                for relation, columns in (
+                    (self.relation_1, columns_1),
+                    (self.relation_2, columns_2),
+                )
+            ]
+        )
+        checksums = []
+        for result in results:
+            checksums.append(
+                {
+                    NULL_PARTITION if pd.isna(key) else str(key): (int(rows), str(checksum))
+                    for key, rows, checksum in result.itertuples(index=False, name=None)
+                }
+            )
+        return tuple(checksums)
+
+    def _refresh(self, relation: str, template: TableAccumulator, checksums: dict):
+        """
+        Brings the ledger of one table up to date and merges its partitions.
+        Args:
+            relation (str): fully qualified table name
+            template (TableAccumulator): empty accumulators with the column classification
+            checksums (dict): partition -> (row_count, checksum) of this run
+        Returns:
+            TableAccumulator: accumulators of the whole table
+        """
+        layout = [
+            template.columns,
+            sorted(template.numeric),
+            sorted(template.categorical),
+            sorted(template.unresolved),
+        ]
+        scope = self.ledger.scope(relation, self.partition_by, self.filter_condition, layout)
+        stored = self.ledger.load(scope)
+
+        changed = [
+            key
+            for key, (rows, checksum) in checksums.items()
+            if self.refresh or key not in stored or stored[key][:2] != (rows, checksum)
+        ]
+        # partitions gone from the table, also on a refresh
+        removed = [key for key in stored if key not in checksums]
+        self.ledger.remove(scope, removed)
+
+        entries = {}
+        if changed:
+            partition = quote_identifier(self.partition_by)
+            values = [key for key in changed if key != NULL_PARTITION]
+            conditions = []
+            if values:
+                literals = ", ".join("'{}'".format(v.replace("'", "''")) for v in values)
+                conditions.append(f"cast({partition} as varchar) in ({literals})")
+            if NULL_PARTITION in changed:
+                conditions.append(f"{partition} is null")
+            rows = self.connector.query(
+                f"""
+                select cast({partition} as varchar) as {PARTITION_COLUMN}, *
+                from {relation}
+                where ({self.filter_condition}) and ({" or ".join(conditions)})
+                """
+            )
+            keys = rows[PARTITION_COLUMN].astype(object)
+            keys = keys.where(keys.notna(), NULL_PARTITION).astype(str)
+            rows = rows.drop(columns=PARTITION_COLUMN)
+            accumulators = {key: TableAccumulator().merge(template) for key in changed}
+            # one pass over the rows instead of one mask per partition
+            for key, group in rows.groupby(keys.to_numpy(), sort=False):
+                if key in accumulators:
+                    accumulators[key].update(group)
+            for key, accumulator in accumulators.items():
+                entries[key] = checksums[key] + (accumulator,)
+            self.ledger.save(scope, entries)
+
+        self.partitions[relation] = len(checksums)
+        self.recomputed[relation] = len(changed)
+
+        table = TableAccumulator().merge(template)
+        for key in checksums:
+            table.merge(entries[key][2] if key in entries else stored[key][2])
+        return table
+
+    def _consume(self):
+        """Builds table_1 and table_2 from the ledger and the changed partitions."""
+        template_1, template_2 = self._classify()
+        checksums_1, checksums_2 = self._checksums(template_1.columns, template_2.columns)
+        self.table_1 = self._refresh(self.relation_1, template_1, checksums_1)
+        self.table_2 = self._refresh(self.relation_2, template_2, checksums_2)
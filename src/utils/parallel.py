@@ -0,0 +1,172 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import pyarrow as pa
+
+# attributes a shard profiler returns to be merged by ExpectedProfiler
+SHARD_ATTRIBUTES = [
+    "numeric_cols",
+    "categorical_cols",
+    "df_1_describe",
+    "df_2_describe",
+    "percent_differences",
+    "absolute_differences",
+    "distribution_differences",
+    "quantile_differences",
+    "avg_frequency_ratio",
+    "frequency_differences",
+    "sketch_summaries",
+]
+
+
+def default_jobs():
+    """Number of CPU cores available to this process."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # macOS, Windows
+        return os.cpu_count() or 1
+
+
+def shard_columns(columns: list, shards: int):
+    """
+    Deals columns round-robin into shards, so neighbouring columns (often
+    of the same type and cost) land on different workers.
+    Args:
+        columns (list): column names
+        shards (int): number of shards
+    Returns:
+        list: lists of column names, none empty
+    """
+    shards = max(1, min(shards, len(columns)))
+    return [columns[i::shards] for i in range(shards)]
+
+
+def share_frame(df):
+    """
+    Writes a DataFrame into a new shared memory block as an Arrow IPC
+    stream. Workers map the block and read their columns without the frame
+    being pickled through the pool.
+    Args:
+        df (pd.DataFrame): frame to share
+    Returns:
+        SharedMemory: block holding the stream (the caller unlinks it)
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sizer = pa.MockOutputStream()
+    with pa.ipc.new_stream(sizer, table.schema) as writer:
+        writer.write_table(table)
+    block = shared_memory.SharedMemory(create=True, size=max(sizer.size(), 1))
+    sink = pa.FixedSizeBufferWriter(pa.py_buffer(block.buf))
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    sink.close()
+    return block
+
+
+def _copy_columns(buf, columns: list):
+    """
+    Copies columns of an Arrow IPC stream held in shared memory into a
+    buffer owned by this process. Arrays read from the stream (e.g. the
+    dictionaries of categories) can point into the block, so they are only
+    referenced here and freed when this returns.
+    Args:
+        buf (memoryview): buffer of the shared memory block
+        columns (list): columns to copy
+    Returns:
+        pa.Buffer: Arrow IPC stream of the columns
+    """
+    shared = pa.py_buffer(buf)
+    table = pa.ipc.open_stream(shared).read_all().select(columns)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def _read_columns(name: str, columns: list):
+    """
+    Reads columns of a shared frame into pandas, copying them out of the
+    block so it can be closed.
+    Args:
+        name (str): shared memory block name
+        columns (list): columns to read
+    Returns:
+        pd.DataFrame: the columns
+    """
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        copied = _copy_columns(block.buf, columns)
+    finally:
+        # no buffer exported from the block is left, so it closes cleanly
+        block.close()
+    return pa.ipc.open_stream(copied).read_all().to_pandas()
+
+
+def _profile_shard(name_1: str, name_2: str, columns: list, scale_1, scale_2, max_categories):
+    """
+    Profiles a shard of columns in a worker process.
+    Returns:
+        dict: SHARD_ATTRIBUTES of an ExpectedProfiler over the shard
+    """
+    from src.utils.expected_profile import ExpectedProfiler
+
+    profiler = ExpectedProfiler(
+        _read_columns(name_1, columns),
+        _read_columns(name_2, columns),
+        scale_1,
+        scale_2,
+        max_categories=max_categories,
+    )
+    profiler.compare_columns()
+    return {attribute: getattr(profiler, attribute) for attribute in SHARD_ATTRIBUTES}
+
+
+def profile_columns(df_1, df_2, jobs: int, scale_1=1.0, scale_2=1.0, max_categories=None):
+    """
+    Profiles the columns of two frames on a process pool.
+
+    Both frames are shared once as Arrow IPC streams in shared memory;
+    every worker reads only its shard of columns and runs
+    ExpectedProfiler.compare_columns on it.
+    Args:
+        df_1 (pd.DataFrame): first table (timestamps dropped)
+        df_2 (pd.DataFrame): second table with the same columns
+        jobs (int): number of worker processes
+        scale_1 (float): factor applied to the counts of df_1
+        scale_2 (float): factor applied to the counts of df_2
+        max_categories (int): distinct values above which sketches are used
+    Returns:
+        list: SHARD_ATTRIBUTES dicts, one per shard; None if the frames
+        cannot be converted to Arrow (e.g. mixed object columns)
+    """
+    try:
+        block_1 = share_frame(df_1)
+    except (pa.ArrowException, TypeError):
+        return None
+    try:
+        block_2 = share_frame(df_2[df_1.columns])
+    except (pa.ArrowException, TypeError):
+        block_1.close()
+        block_1.unlink()
+        return None
+
+    shards = shard_columns(df_1.columns.tolist(), jobs)
+    try:
+        with ProcessPoolExecutor(max_workers=len(shards)) as pool:
+            futures = [
+                pool.submit(
+                    _profile_shard,
+                    block_1.name,
+                    block_2.name,
+                    columns,
+                    scale_1,
+                    scale_2,
+                    max_categories,
+                )
+                for columns in shards
+            ]
+            return [future.result() for future in futures]
+    finally:
+        for block in (block_1, block_2):
+            block.close()
+            block.unlink()
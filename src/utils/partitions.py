@@ -0,0 +1,119 @@
+import time
+from concurrent.futures import as_completed
+from src.utils.streaming_profile import StreamingProfiler
+
+
+def partition_predicate(partition: int, partitions: int, columns: list = None):
+    """
+    Predicate selecting one of several disjoint hash partitions of a table.
+    HASH never returns NULL, so every row falls in exactly one partition.
+    Args:
+        partition (int): partition number, 0 <= partition < partitions
+        partitions (int): number of partitions
+        columns (list): SQL expressions hashed, e.g. the key (None = every column)
+    Returns:
+        str: SQL predicate
+    """
+    expression = ", ".join(columns) if columns else "*"
+    return f"mod(abs(hash({expression})), {partitions}) = {partition}"
+
+
+class PartitionedProfiler(StreamingProfiler):
+    """
+    Class to perform the ExpectedProfiler comparisons on tables fetched in hash partitions.
+
+    The query of each table is split into disjoint slices with
+    partition_predicate and every slice is submitted at once, each on its
+    own cursor. The warehouse computes the slices concurrently and worker
+    threads fetch them in parallel, so one large result no longer comes
+    back through a single cursor. Each slice is added to the accumulators
+    of its table as soon as it arrives and then released.
+
+    Attributes:
+        connector (SnowflakeConnector): connector used to run the queries
+        relation_1 (str): fully qualified name of the first table
+        relation_2 (str): fully qualified name of the second table
+        filter_condition (str): where clause applied to both tables
+        partitions (int): number of slices each table is fetched in
+        preflight (SchemaPreflight): projects the select when given (None = every column)
+        hash_columns (list): SQL expressions the rows are partitioned by (None = every column)
+        seconds (dict): (side, partition) -> seconds until the slice was profiled
+        (plus the attributes of StreamingProfiler)
+
+    Methods:
+        queries: Queries of the slices of one table
+        _consume: Submits every slice and updates the accumulators as they arrive
+        (plus the methods of StreamingProfiler)
+    """
+
+    def __init__(
+        self,
+        connector,
+        relation_1: str,
+        relation_2: str,
+        filter_condition: str,
+        partitions: int,
+        preflight=None,
+        hash_columns: list = None,
+    ):
+        if partitions < 1:
+            raise ValueError(f"Invalid number of partitions {partitions}: use 1 or more.")
+        super().__init__(None, None)
+        self.connector = connector
+        self.relation_1 = relation_1
+        self.relation_2 = relation_2
+        self.filter_condition = filter_condition
+        self.partitions = partitions
+        self.preflight = preflight
+        self.hash_columns = hash_columns
+        self.seconds = {}
+
+    def queries(self, relation: str):
+        """
+        Queries of the slices of one table.
+        Args:
+            relation (str): fully qualified table name
+        Returns:
+            list: one SQL statement per partition
+        """
+        statements = []
+        for partition in range(self.partitions):
+            condition = (
+                f"({self.filter_condition}) and "
+                f"{partition_predicate(partition, self.partitions, self.hash_columns)}"
+            )
+            if self.preflight is not None:
+                statements.append(self.preflight.query(relation, condition))
+            else:
+                statements.append(f"select * from {relation} where {condition}")
+        return statements
+
+    def _consume(self):
+        """Submits every slice of both tables and profiles each one as it arrives."""
+        start = time.perf_counter()
+        tables = {1: self.table_1, 2: self.table_2}
+        handles = {}
+        try:
+            for side, relation in ((1, self.relation_1), (2, self.relation_2)):
+                # one version lookup per table rather than one per slice
+                version = self.connector.cache_version(relation)
+                for partition, query in enumerate(self.queries(relation)):
+                    handle = self.connector.submit(query, relation, version)
+                    handles[handle.future] = (side, partition, handle)
+            empty = {}
+            for future in as_completed(list(handles)):
+                side, partition, _ = handles.pop(future)
+                df = future.result()
+                if len(df):
+                    tables[side].update(df)
+                else:
+                    # columns are classified on the first slice with rows
+                    empty[side] = df
+                self.seconds[(side, partition)] = time.perf_counter() - start
+            for side, df in empty.items():
+                if tables[side].columns is None:
+                    tables[side].update(df)
+        except BaseException:
+            for _, _, handle in handles.values():
+                handle.cancel()
+            raise
@@ -0,0 +1,355 @@
+import json
+from abc import ABC, abstractmethod
+import pandas as pd
+from src.utils import sampling
+
+# rough throughputs turning bytes into seconds; they rank the strategies
+# against each other rather than predict the exact run time
+SCAN_BYTES_PER_SECOND = 500 * 2**20
+FETCH_BYTES_PER_SECOND = 25 * 2**20
+# fetched rows take more memory than the compressed micro-partitions they come from
+EXPANSION_FACTOR = 3
+# APPROX_PERCENTILE and one GROUP BY per categorical column cost about two scans
+PUSHDOWN_SCAN_FACTOR = 2
+# samples below this percentage say too little about the tables
+MIN_SAMPLE_PERCENT = 0.01
+ESTIMATE_COLUMNS = ["strategy", "bytes_fetched", "seconds", "fits", "detail"]
+STATS_COLUMNS = ["relation", "rows", "scanned_bytes", "partitions", "source"]
+
+
+def format_bytes(size):
+    """Readable size, e.g. 1.5 GB."""
+    if size is None or pd.isna(size):
+        return "unknown"
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if abs(size) < 1024 or unit == "TB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+class Strategy(ABC):
+    """
+    Way of running a comparison, costed by QueryPlanner.
+
+    Subclasses set name and implement estimate and profiler; a custom
+    strategy is added by passing it to QueryPlanner with the others.
+    Attributes:
+        name (str): name printed in the plan
+        fetches_rows (bool): whether the profiler selects rows, so the schema preflight applies
+
+    Methods:
+        estimate: Cost of the strategy on the planned tables
+        profiler: Builds the profiler running the strategy
+    """
+
+    name = None
+    fetches_rows = True
+
+    @abstractmethod
+    def estimate(self, scanned_bytes: int, local_bytes: int, byte_budget=None, time_budget=None):
+        """
+        Cost of the strategy on the planned tables.
+        Args:
+            scanned_bytes (int): compressed bytes Snowflake scans for both tables
+            local_bytes (int): memory both filtered tables take once fetched
+            byte_budget (int): bytes that may be fetched (None = no limit)
+            time_budget (float): seconds the comparison may take (None = no limit)
+        Returns:
+            dict: bytes_fetched, seconds, fits (bool) and detail (str), plus
+            any setting the profiler needs
+        """
+
+    @abstractmethod
+    def profiler(self, connector, relation_1, relation_2, filter_condition, plan,
+                 preflight=None, jobs=1, tracer=None):
+        """
+        Builds the profiler running the strategy.
+        Args:
+            connector (SnowflakeConnector): connector used to run the queries
+            relation_1 (str): fully qualified name of the first table
+            relation_2 (str): fully qualified name of the second table
+            filter_condition (str): where clause applied to both tables
+            plan (Plan): plan that chose this strategy
+            preflight (SchemaPreflight): projected select, None to select every column
+            jobs (int): worker processes for the column comparisons
+            tracer (Tracer): optional tracer
+        Returns:
+            profiler with a compare() method
+        """
+
+    @staticmethod
+    def _fits(bytes_fetched, seconds, byte_budget, time_budget):
+        """Whether a cost is within both budgets."""
+        return (byte_budget is None or bytes_fetched <= byte_budget) and (
+            time_budget is None or seconds <= time_budget
+        )
+
+
+class FetchStrategy(Strategy):
+    """Fetches both filtered tables and compares them locally (the default mode)."""
+
+    name = "fetch"
+
+    def estimate(self, scanned_bytes, local_bytes, byte_budget=None, time_budget=None):
+        seconds = scanned_bytes / SCAN_BYTES_PER_SECOND + local_bytes / FETCH_BYTES_PER_SECOND
+        return {
+            "bytes_fetched": local_bytes,
+            "seconds": seconds,
+            "fits": self._fits(local_bytes, seconds, byte_budget, time_budget),
+            "detail": "exact, every row fetched",
+        }
+
+    def profiler(self, connector, relation_1, relation_2, filter_condition, plan,
+                 preflight=None, jobs=1, tracer=None):
+        from src.utils.expected_profile import ExpectedProfiler
+
+        queries = [
+            preflight.query(relation, filter_condition)
+            if preflight is not None
+            else f"select * from {relation} where {filter_condition}"
+            for relation in (relation_1, relation_2)
+        ]
+        df_1, df_2 = connector.query_concurrently(*queries, relations=[relation_1, relation_2])
+        return ExpectedProfiler(df_1, df_2, tracer=tracer, jobs=jobs)
+
+
+class PushdownStrategy(Strategy):
+    """Computes the statistics inside Snowflake (--pushdown)."""
+
+    name = "pushdown"
+    fetches_rows = False
+
+    def estimate(self, scanned_bytes, local_bytes, byte_budget=None, time_budget=None):
+        seconds = PUSHDOWN_SCAN_FACTOR * scanned_bytes / SCAN_BYTES_PER_SECOND
+        return {
+            "bytes_fetched": 0,
+            "seconds": seconds,
+            "fits": self._fits(0, seconds, byte_budget, time_budget),
+            "detail": "exact aggregates, approximate quartiles",
+        }
+
+    def profiler(self, connector, relation_1, relation_2, filter_condition, plan,
+                 preflight=None, jobs=1, tracer=None):
+        from src.utils.pushdown import PushdownProfiler
+
+        return PushdownProfiler(connector, relation_1, relation_2, filter_condition)
+
+
+class SampleStrategy(Strategy):
+    """Fetches a Bernoulli sample sized to the budgets (--sample)."""
+
+    name = "sample"
+
+    def estimate(self, scanned_bytes, local_bytes, byte_budget=None, time_budget=None):
+        percent = 100.0
+        if byte_budget is not None and local_bytes:
+            percent = min(percent, 100 * byte_budget / local_bytes)
+        if time_budget is not None and local_bytes:
+            # a Bernoulli sample still scans every row
+            fetch_seconds = time_budget - scanned_bytes / SCAN_BYTES_PER_SECOND
+            percent = min(percent, 100 * fetch_seconds * FETCH_BYTES_PER_SECOND / local_bytes)
+        # round down to the precision of the SAMPLE clause
+        percent = max(int(percent * 100) / 100, MIN_SAMPLE_PERCENT)
+        bytes_fetched = local_bytes * percent / 100
+        seconds = (
+            scanned_bytes / SCAN_BYTES_PER_SECOND + bytes_fetched / FETCH_BYTES_PER_SECOND
+        )
+        return {
+            "bytes_fetched": bytes_fetched,
+            "seconds": seconds,
+            "fits": self._fits(bytes_fetched, seconds, byte_budget, time_budget),
+            "detail": f"{percent:g}% of the rows, with confidence intervals",
+            "sample_percent": percent,
+        }
+
+    def profiler(self, connector, relation_1, relation_2, filter_condition, plan,
+                 preflight=None, jobs=1, tracer=None):
+        from src.utils.expected_profile import ExpectedProfiler
+
+        percent = plan.estimate["sample_percent"]
+        clause = sampling.sample_clause(f"{percent:g}")
+        queries = [
+            preflight.query(relation, filter_condition, clause)
+            if preflight is not None
+            else f"select * from {relation} {clause} where {filter_condition}"
+            for relation in (relation_1, relation_2)
+        ]
+        df_1, df_2 = connector.query_concurrently(*queries)
+        scale = 100 / percent
+        return ExpectedProfiler(
+            df_1, df_2, scale, scale, confidence=0.95, tracer=tracer, jobs=jobs
+        )
+
+
+# in order of preference: the first strategy within the budgets is chosen
+STRATEGIES = [FetchStrategy(), PushdownStrategy(), SampleStrategy()]
+
+
+class Plan:
+    """
+    Strategy chosen by QueryPlanner and the estimates it was chosen on.
+    Attributes:
+        strategy (Strategy): chosen strategy
+        estimate (dict): cost of the chosen strategy
+        estimates (DataFrame): cost of every strategy (ESTIMATE_COLUMNS)
+        stats (DataFrame): size estimate of each table (STATS_COLUMNS)
+        byte_budget (int): bytes that may be fetched (None = no limit)
+        time_budget (float): seconds the comparison may take (None = no limit)
+    """
+
+    def __init__(self, strategy, estimate, estimates, stats, byte_budget, time_budget):
+        self.strategy = strategy
+        self.estimate = estimate
+        self.estimates = estimates
+        self.stats = stats
+        self.byte_budget = byte_budget
+        self.time_budget = time_budget
+
+
+class QueryPlanner:
+    """
+    Class to choose how to compare two tables before any row is fetched.
+
+    The rows and bytes each filtered table scans are estimated from
+    EXPLAIN USING JSON, which reports the micro-partitions and bytes left
+    after pruning by the filter, scaled with the ROW_COUNT of
+    INFORMATION_SCHEMA.TABLES. When EXPLAIN is not available the whole
+    table size from INFORMATION_SCHEMA is used. Filters on columns the
+    table is not clustered by do not prune, so the estimates are upper
+    bounds. Each strategy is then costed against the byte and time
+    budgets and the first one within both is chosen; when none is, the
+    fastest one is.
+
+    Attributes:
+        connector (SnowflakeConnector): connector used to run the queries
+        relation_1 (str): fully qualified name of the first table
+        relation_2 (str): fully qualified name of the second table
+        filter_condition (str): where clause applied to both tables
+        byte_budget (int): bytes that may be fetched (None = no limit)
+        time_budget (float): seconds the comparison may take (None = no limit)
+        strategies (list): Strategy instances in order of preference
+
+    Methods:
+        plan: Estimates the table sizes and chooses a strategy
+        _table_stats: Row counts and bytes from INFORMATION_SCHEMA.TABLES
+        _explain: Partitions and bytes left after pruning, None if EXPLAIN fails
+    """
+
+    def __init__(
+        self,
+        connector,
+        relation_1: str,
+        relation_2: str,
+        filter_condition: str = "1 = 1",
+        byte_budget: int = None,
+        time_budget: float = None,
+        strategies: list = None,
+    ):
+        self.connector = connector
+        self.relation_1 = relation_1
+        self.relation_2 = relation_2
+        self.filter_condition = filter_condition
+        self.byte_budget = byte_budget
+        self.time_budget = time_budget
+        self.strategies = strategies or STRATEGIES
+
+    @staticmethod
+    def _tables_query(relation: str):
+        """INFORMATION_SCHEMA.TABLES query of one table."""
+        database, schema, table = relation.split(".")
+        return f"""
+            select row_count, bytes
+            from {database}.information_schema.tables
+            where table_schema = '{schema.upper()}'
+                and table_name = '{table.upper()}'
+            """
+
+    def _table_stats(self):
+        """
+        Row counts and bytes of both tables from INFORMATION_SCHEMA.TABLES.
+        Returns:
+            list: (row_count, bytes) per table, None for unknown values (e.g. views)
+        """
+        results = self.connector.query_concurrently(
+            self._tables_query(self.relation_1), self._tables_query(self.relation_2)
+        )
+        stats = []
+        for relation, result in zip((self.relation_1, self.relation_2), results):
+            if result.empty:
+                raise ValueError(f"Table {relation.upper()} was not found in INFORMATION_SCHEMA.")
+            stats.append(
+                tuple(None if pd.isna(value) else int(value) for value in result.iloc[0, :2])
+            )
+        return stats
+
+    def _explain(self, relation: str):
+        """
+        Partitions and bytes of relation left after pruning by the filter.
+        Args:
+            relation (str): fully qualified table name
+        Returns:
+            dict: GlobalStats of EXPLAIN USING JSON (partitionsTotal,
+            partitionsAssigned, bytesAssigned), None if EXPLAIN failed
+        """
+        try:
+            result = self.connector.query(
+                f"explain using json select * from {relation} where {self.filter_condition}"
+            )
+            return json.loads(result.iloc[0, 0])["GlobalStats"]
+        except Exception:
+            return None
+
+    def plan(self):
+        """
+        Estimates the size of both filtered tables and chooses a strategy.
+        Args:
+            None
+        Returns:
+            Plan: chosen strategy with every estimate
+        """
+        rows = []
+        for relation, (row_count, size) in zip(
+            (self.relation_1, self.relation_2), self._table_stats()
+        ):
+            explain = self._explain(relation)
+            if explain is not None:
+                total = explain.get("partitionsTotal") or 0
+                assigned = explain.get("partitionsAssigned") or 0
+                fraction = assigned / total if total else 1.0
+                rows.append([
+                    relation,
+                    None if row_count is None else round(row_count * fraction),
+                    int(explain.get("bytesAssigned") or 0),
+                    f"{assigned}/{total}",
+                    "explain",
+                ])
+            else:
+                if size is None:
+                    raise ValueError(f"The size of {relation.upper()} could not be estimated.")
+                rows.append([relation, row_count, size, None, "information_schema"])
+        stats = pd.DataFrame(rows, columns=STATS_COLUMNS)
+
+        scanned_bytes = int(stats["scanned_bytes"].sum())
+        local_bytes = scanned_bytes * EXPANSION_FACTOR
+        costs = [
+            strategy.estimate(scanned_bytes, local_bytes, self.byte_budget, self.time_budget)
+            for strategy in self.strategies
+        ]
+        estimates = pd.DataFrame(
+            [[strategy.name] + [cost[col] for col in ESTIMATE_COLUMNS[1:]]
+             for strategy, cost in zip(self.strategies, costs)],
+            columns=ESTIMATE_COLUMNS,
+        )
+
+        fitting = [i for i, cost in enumerate(costs) if cost["fits"]]
+        chosen = fitting[0] if fitting else min(
+            range(len(costs)), key=lambda i: costs[i]["seconds"]
+        )
+        return Plan(
+            self.strategies[chosen],
+            costs[chosen],
+            estimates,
+            stats,
+            self.byte_budget,
+            self.time_budget,
+        )
@@ -0,0 +1,271 @@
+import pandas as pd
+from src.utils.expected_profile import (
+    percent_difference,
+    frequency_comparison,
+    is_timestamp,
+)
+
+DESCRIBE_STATISTICS = ["count", "mean", "std", "min", "25%", "50%", "75%", "max"]
+SUMMARY_COLUMNS = ["kind", "column_name", "category"] + DESCRIBE_STATISTICS
+
+
+def quote_identifier(column: str):
+    """
+    Quotes a column name so it keeps its case in the generated SQL.
+    Args:
+        column (str): column name as returned by the cursor description
+    Returns:
+        str: double quoted identifier
+    """
+    return '"{}"'.format(column.replace('"', '""'))
+
+
+def classify_columns(df: pd.DataFrame):
+    """
+    Splits the columns of a sample into numeric and categorical columns,
+    mirroring the conversion rules of ExpectedProfiler. Timestamp columns
+    are left out. Boolean columns are categorical, Snowflake cannot average
+    or take the standard deviation of a BOOLEAN.
+    Args:
+        df (pd.DataFrame): sample of the table
+    Returns:
+        (tuple) : numeric_cols (list), categorical_cols (list)
+    """
+    numeric_cols = []
+    categorical_cols = []
+    for col in df.columns:
+        if is_timestamp(df[col]):
+            continue
+        if pd.api.types.infer_dtype(df[col], skipna=True) == "boolean":
+            categorical_cols.append(col)
+            continue
+        try:
+            pd.to_numeric(df[col])
+            numeric_cols.append(col)
+        except (ValueError, TypeError):
+            categorical_cols.append(col)
+    return numeric_cols, categorical_cols
+
+
+def build_summary_query(
+    relation: str, filter_condition: str, numeric_cols: list, categorical_cols: list
+):
+    """
+    Builds a single aggregate statement returning describe() statistics for
+    numeric columns and value counts for categorical columns.
+
+    Every output row has the columns in SUMMARY_COLUMNS. The 'kind' column is
+    'rows' for the table row count, 'numeric' for describe() statistics and
+    'categorical' for one (column, value) frequency.
+    Args:
+        relation (str): fully qualified table name (database.schema.table)
+        filter_condition (str): where clause applied before aggregating
+        numeric_cols (list): columns to describe
+        categorical_cols (list): columns to count values for
+    Returns:
+        str: SQL statement
+    """
+    empty_stats = ", ".join(f"null as \"{stat}\"" for stat in DESCRIBE_STATISTICS[1:])
+    selects = [
+        f"select 'rows' as kind, null as column_name, null as category, "
+        f"count(*) as \"count\", {empty_stats} from base"
+    ]
+
+    for col in numeric_cols:
+        quoted = quote_identifier(col)
+        literal = col.replace("'", "''")
+        selects.append(
+            f"select 'numeric', '{literal}', null, "
+            f"count({quoted}), avg({quoted}), stddev({quoted}), min({quoted}), "
+            f"approx_percentile({quoted}, 0.25), approx_percentile({quoted}, 0.5), "
+            f"approx_percentile({quoted}, 0.75), max({quoted}) from base"
+        )
+
+    for col in categorical_cols:
+        quoted = quote_identifier(col)
+        literal = col.replace("'", "''")
+        selects.append(
+            f"select 'categorical', '{literal}', cast({quoted} as varchar), "
+            f"count(*), {empty_stats} from base "
+            f"where {quoted} is not null group by {quoted}"
+        )
+
+    union = "\n        union all ".join(selects)
+    return f"""
+        with base as (
+            select *
+            from {relation}
+            where {filter_condition}
+        )
+        {union}
+        """
+
+
+class PushdownProfiler:
+    """
+    Class to compute the ExpectedProfiler comparisons inside Snowflake.
+
+    Instead of pulling both tables with select *, one aggregate statement per
+    table returns only describe() statistics and value counts. Only a small
+    sample is fetched to find out which columns are numeric or categorical.
+
+    Attributes:
+        connector (SnowflakeConnector): connector used to run the queries
+        relation_1 (str): fully qualified name of the first table
+        relation_2 (str): fully qualified name of the second table
+        filter_condition (str): where clause applied to both tables
+        sample_rows (int): rows fetched to infer column types
+        df_1_describe (DataFrame): Descriptive statistics of relation_1.
+        df_2_describe (DataFrame): Descriptive statistics of relation_2.
+        numeric_cols (list): List of numeric column names in the tables.
+        categorical_cols (list): List of categorical column names in the tables.
+        shapes (DataFrame): Counts of rows/columns between tables and their percent/absolute differences.
+        percent_differences (DataFrame): Percent differences between descriptive statistics of numeric columns.
+        absolute_differences (DataFrame): Absolute differences between descriptive statistics of numeric columns.
+        avg_frequency_ratio (dict): Average frequency ratio of categorical values between the tables.
+        frequency_differences (dict): Frequency differences of categorical values between the tables.
+
+    Methods:
+        compare: Runs the aggregate queries and computes the comparisons
+        _classify_columns: Splits sampled columns into numeric and categorical
+        _parse_summary: Splits the aggregate query result for one table
+    """
+
+    def __init__(
+        self,
+        connector,
+        relation_1: str,
+        relation_2: str,
+        filter_condition: str,
+        sample_rows: int = 1000,
+    ):
+        self.connector = connector
+        self.relation_1 = relation_1
+        self.relation_2 = relation_2
+        self.filter_condition = filter_condition
+        self.sample_rows = sample_rows
+        self.df_1_describe = None
+        self.df_2_describe = None
+        self.numeric_cols = None
+        self.categorical_cols = None
+        self.shapes = None
+        self.percent_differences = None
+        self.absolute_differences = None
+        self.avg_frequency_ratio = None
+        self.frequency_differences = None
+
+    def _classify_columns(self, df: pd.DataFrame):
+        """Splits the columns of a sample, see classify_columns."""
+        return classify_columns(df)
+
+    def _parse_summary(self, summary: pd.DataFrame):
+        """
+        Splits the aggregate query result for one table.
+        Args:
+            summary (pd.DataFrame): result of build_summary_query
+        Returns:
+            (tuple) : row count (int), describe (pd.DataFrame), value counts (dict)
+        """
+        summary.columns = SUMMARY_COLUMNS
+
+        rows = int(summary.loc[summary["kind"] == "rows", "count"].iloc[0])
+
+        numeric = summary[summary["kind"] == "numeric"].set_index("column_name")
+        describe = (
+            numeric[DESCRIBE_STATISTICS]
+            .apply(pd.to_numeric)
+            .T.reindex(columns=self.numeric_cols)
+        )
+        describe.columns.name = None
+
+        categorical = summary[summary["kind"] == "categorical"]
+        value_counts = {}
+        for col in self.categorical_cols:
+            counts = categorical[categorical["column_name"] == col]
+            value_counts[col] = (
+                pd.Series(
+                    counts["count"].astype("int64").values,
+                    index=pd.Index(counts["category"].astype(str).values, name=col),
+                    name="count",
+                )
+                .sort_values(ascending=False)
+            )
+
+        return rows, describe, value_counts
+
+    def compare(self):
+        """
+        Runs one aggregate query per table and fills the comparison attributes.
+        Args:
+            None
+        Returns:
+            None
+        """
+        sample_query = """
+        select *
+        from {}
+        where {}
+        limit {}
+        """
+        sample_1, sample_2 = self.connector.query_concurrently(
+            sample_query.format(self.relation_1, self.filter_condition, self.sample_rows),
+            sample_query.format(self.relation_2, self.filter_condition, self.sample_rows),
+        )
+        self.numeric_cols, self.categorical_cols = self._classify_columns(sample_1)
+
+        same_columns = set(sample_1.columns) == set(sample_2.columns)
+        if not same_columns:
+            self.numeric_cols, self.categorical_cols = [], []
+
+        summary_1, summary_2 = self.connector.query_concurrently(
+            *[
+                build_summary_query(
+                    relation,
+                    self.filter_condition,
+                    self.numeric_cols,
+                    self.categorical_cols,
+                )
+                for relation in (self.relation_1, self.relation_2)
+            ]
+        )
+        rows_1, self.df_1_describe, counts_1 = self._parse_summary(summary_1)
+        rows_2, self.df_2_describe, counts_2 = self._parse_summary(summary_2)
+
+        self.shapes = pd.DataFrame(
+            {
+                "df_1": [rows_1, sample_1.shape[1]],
+                "df_2": [rows_2, sample_2.shape[1]],
+            },
+            index=["rows", "columns"],
+        ).assign(
+            absolute_difference=lambda x: abs(x["df_1"] - x["df_2"]),
+            percent_difference=lambda x: (
+                x["absolute_difference"] / (x["df_1"] + x["df_2"])
+            )
+            * 100,
+        )
+
+        try:
+            assert rows_1 > 0, "Table 1 has zero rows."
+            assert rows_2 > 0, "Table 2 has zero rows."
+        except AssertionError as e:
+            raise AssertionError(
+                "Assertion Error: {}\n Please check your filter parameter.".format(str(e))
+            )
+
+        if not same_columns:
+            return
+
+        self.percent_differences = percent_difference(
+            self.df_1_describe, self.df_2_describe
+        )
+        self.absolute_differences = (self.df_1_describe - self.df_2_describe).abs()
+
+        avg_frequency_ratio = {}
+        frequency_differences = {}
+        for col in self.categorical_cols:
+            avg_frequency_ratio[col], frequency_differences[col] = frequency_comparison(
+                counts_1[col], counts_2[col]
+            )
+        self.avg_frequency_ratio = avg_frequency_ratio
+        self.frequency_differences = frequency_differences
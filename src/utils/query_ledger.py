@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from src.utils.result_cache import normalize_query
+
+DEFAULT_QUERY_LEDGER_PATH = os.path.join(os.path.expanduser("~"), ".snowdiff", "queries.sqlite")
+
+# Snowflake keeps query results for 24 hours; entries close to expiring are
+# not reused so the result does not expire while it is fetched
+PERSISTED_RESULT_SECONDS = 24 * 60 * 60
+EXPIRY_MARGIN_SECONDS = 15 * 60
+
+
+class QueryLedger:
+    """
+    Local SQLite store of the Snowflake query IDs issued by snow-diff.
+
+    Entries are keyed by the normalized query text plus the version of the
+    table it reads (its LAST_ALTERED timestamp), like ResultCache, and hold
+    the ID of the query that computed the result and when it ran. While
+    Snowflake still persists that result, SnowflakeConnector reads it back
+    instead of executing the query again.
+    Attributes:
+        path (str): SQLite database file
+        max_age (float): seconds an entry is reused after its query ran
+
+    Methods:
+        key: Key of a query on one table version
+        get: Query ID of a persisted result, None if there is none
+        put: Records the query ID of a result
+        remove: Deletes the entry of a query
+        clear: Deletes every entry
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_QUERY_LEDGER_PATH,
+        max_age: float = PERSISTED_RESULT_SECONDS - EXPIRY_MARGIN_SECONDS,
+    ):
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        """Opens the database, creating it on first use."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.execute(
+            """
+            create table if not exists queries (
+                key text primary key,
+                query_id text not null,
+                issued_at real not null
+            )
+            """
+        )
+        return conn
+
+    @staticmethod
+    def key(query: str, version: str):
+        """
+        Key of a query on one table version.
+        Args:
+            query (str): SQL text
+            version (str): table version the query reads
+        Returns:
+            str: hex digest
+        """
+        text = json.dumps([normalize_query(query), version])
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get(self, query: str, version: str):
+        """
+        Query ID of a result that Snowflake still persists.
+        Args:
+            query (str): SQL text
+            version (str): table version the query reads
+        Returns:
+            str: query ID, None if the query did not run within max_age
+        """
+        with self._lock:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    "select query_id from queries where key = ? and issued_at >= ?",
+                    (self.key(query, version), time.time() - self.max_age),
+                ).fetchone()
+            finally:
+                conn.close()
+        return None if row is None else row[0]
+
+    def put(self, query: str, version: str, query_id: str):
+        """
+        Records the query ID of a result.
+        Args:
+            query (str): SQL text
+            version (str): table version the query read
+            query_id (str): Snowflake query ID
+        Returns:
+            None
+        """
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute(
+                        "insert or replace into queries values (?, ?, ?)",
+                        (self.key(query, version), query_id, time.time()),
+                    )
+            finally:
+                conn.close()
+
+    def remove(self, query: str, version: str):
+        """Deletes the entry of a query, e.g. once its result expired."""
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute("delete from queries where key = ?", (self.key(query, version),))
+            finally:
+                conn.close()
+
+    def clear(self):
+        """Deletes every entry."""
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute("delete from queries")
+            finally:
+                conn.close()
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".snowdiff", "cache")
+DEFAULT_MAX_BYTES = 2 * 1024**3
+
+
+def normalize_query(query: str):
+    """
+    Collapses whitespace so reformatting a query does not miss the cache.
+    Case is kept since it matters inside string literals.
+    Args:
+        query (str): SQL text
+    Returns:
+        str: normalized SQL text
+    """
+    return re.sub(r"\s+", " ", query).strip().rstrip(";").strip()
+
+
+class ResultCache:
+    """
+    Local on-disk cache of query results stored as Parquet files.
+
+    Entries are keyed by the normalized query text plus the version of the
+    table it reads (its LAST_ALTERED timestamp), so a result is reused only
+    while the table is unchanged. When the cache grows past max_bytes the
+    least recently used entries are evicted.
+    Attributes:
+        directory (str): folder holding the Parquet files and index.json
+        max_bytes (int): size limit of the cached files
+
+    Methods:
+        get: Returns a cached result or None
+        put: Stores a result
+        clear: Removes every entry
+        _evict: Removes least recently used entries above max_bytes
+    """
+
+    def __init__(
+        self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @property
+    def _index_path(self):
+        return os.path.join(self.directory, "index.json")
+
+    def _read_index(self):
+        try:
+            with open(self._index_path, "r") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_index(self, index: dict):
+        os.makedirs(self.directory, exist_ok=True)
+        temporary = self._index_path + ".tmp"
+        with open(temporary, "w") as file:
+            json.dump(index, file)
+        os.replace(temporary, self._index_path)
+
+    def key(self, query: str, version: str):
+        """
+        Cache key of a query against a given table version.
+        Args:
+            query (str): SQL text
+            version (str): table version, e.g. LAST_ALTERED
+        Returns:
+            str: hex digest
+        """
+        text = f"{normalize_query(query)}\n{version}"
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get(self, query: str, version: str):
+        """
+        Returns the cached result of a query, or None on a miss.
+        Args:
+            query (str): SQL text
+            version (str): table version the result must belong to
+        Returns:
+            df (pd.DataFrame): cached result or None
+        """
+        key = self.key(query, version)
+        with self._lock:
+            index = self._read_index()
+            entry = index.get(key)
+            if entry is None:
+                return None
+            path = os.path.join(self.directory, entry["file"])
+            try:
+                table = pq.read_table(path)
+            except OSError:
+                index.pop(key, None)
+                self._write_index(index)
+                return None
+            entry["last_access"] = time.time()
+            self._write_index(index)
+        # the pandas metadata written by put restores the original dtypes
+        return table.to_pandas()
+
+    def put(self, query: str, version: str, df: pd.DataFrame):
+        """
+        Stores the result of a query and evicts old entries if needed.
+        Args:
+            query (str): SQL text
+            version (str): table version the result belongs to
+            df (pd.DataFrame): query result
+        Returns:
+            None
+        """
+        key = self.key(query, version)
+        file_name = f"{key}.parquet"
+        path = os.path.join(self.directory, file_name)
+        os.makedirs(self.directory, exist_ok=True)
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), path)
+
+        with self._lock:
+            index = self._read_index()
+            index[key] = {
+                "file": file_name,
+                "bytes": os.path.getsize(path),
+                "last_access": time.time(),
+            }
+            self._evict(index)
+            self._write_index(index)
+
+    def _evict(self, index: dict):
+        """Removes least recently used entries until the cache fits max_bytes."""
+        total = sum(entry["bytes"] for entry in index.values())
+        for key, entry in sorted(index.items(), key=lambda item: item[1]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, entry["file"]))
+            except OSError:
+                pass
+            total -= entry["bytes"]
+            del index[key]
+
+    def clear(self):
+        """Removes every cached result."""
+        with self._lock:
+            for entry in self._read_index().values():
+                try:
+                    os.remove(os.path.join(self.directory, entry["file"]))
+                except OSError:
+                    pass
+            self._write_index({})
@@ -0,0 +1,83 @@
+from statistics import NormalDist
+import numpy as np
+import pandas as pd
+from src.utils.arguments import parse_sample
+
+
+def sample_clause(sample: str, seed: int = None):
+    """
+    Builds the Snowflake SAMPLE clause for a --sample value.
+
+    Percentage samples use BERNOULLI row sampling, and the same SEED is
+    used for prod and dev so reruns sample consistently. Snowflake does not
+    support a seed for fixed-size samples, so it is ignored for row counts.
+    Args:
+        sample (str): value of --sample
+        seed (int): optional seed
+    Returns:
+        str: clause to put after the table name
+    """
+    size, is_rows = parse_sample(sample)
+    if is_rows:
+        return f"sample ({int(size)} rows)"
+    clause = f"sample bernoulli ({size:g})"
+    if seed is not None:
+        clause += f" seed ({int(seed)})"
+    return clause
+
+
+def z_score(confidence: float):
+    """Two-sided standard normal quantile for a confidence level."""
+    return NormalDist().inv_cdf((1 + confidence) / 2)
+
+
+def mean_difference_intervals(describe_1: pd.DataFrame, describe_2: pd.DataFrame, confidence: float):
+    """
+    Confidence intervals of the mean percent differences (the 'mean' row of
+    ExpectedProfiler.percent_differences), using the standard error of each
+    sample mean and the delta method for the ratio.
+    Args:
+        describe_1 (pd.DataFrame): describe() of the first sample
+        describe_2 (pd.DataFrame): describe() of the second sample
+        confidence (float): confidence level, e.g. 0.95
+    Returns:
+        pd.DataFrame: estimate, lower and upper bound per numeric column
+    """
+    mean_1, mean_2 = describe_1.loc["mean"], describe_2.loc["mean"]
+    se_1 = describe_1.loc["std"] / np.sqrt(describe_1.loc["count"])
+    se_2 = describe_2.loc["std"] / np.sqrt(describe_2.loc["count"])
+
+    estimate = (mean_1 - mean_2) / mean_1 * 100
+    # d/d(mean_1) = 100 * mean_2 / mean_1**2, d/d(mean_2) = -100 / mean_1
+    standard_error = np.sqrt(
+        (100 * mean_2 / mean_1**2) ** 2 * se_1**2 + (100 / mean_1) ** 2 * se_2**2
+    )
+    margin = z_score(confidence) * standard_error
+    return pd.DataFrame(
+        {"estimate": estimate, "lower": estimate - margin, "upper": estimate + margin}
+    )
+
+
+def frequency_ratio_interval(counts_1: pd.Series, counts_2: pd.Series, confidence: float, scale: float = 1.0):
+    """
+    Confidence interval of an average frequency ratio, treating each value
+    count as Poisson so var(c1 / c2) ~ (c1 / c2)**2 * (1 / c1 + 1 / c2).
+    Args:
+        counts_1 (pd.Series): sampled value counts of the first table
+        counts_2 (pd.Series): sampled value counts of the second table
+        confidence (float): confidence level, e.g. 0.95
+        scale (float): ratio of the two sampling scales (scale_1 / scale_2)
+    Returns:
+        pd.Series: estimate, lower and upper bound
+    """
+    counts_1, counts_2 = counts_1.align(counts_2, join="inner")
+    shared = (counts_1 > 0) & (counts_2 > 0)
+    counts_1, counts_2 = counts_1[shared], counts_2[shared]
+    ratios = counts_1 / counts_2 * scale
+    if ratios.empty:
+        return pd.Series({"estimate": np.nan, "lower": np.nan, "upper": np.nan})
+
+    variance = (ratios**2 * (1 / counts_1 + 1 / counts_2)).sum() / len(ratios) ** 2
+    estimate = ratios.mean()
+    margin = z_score(confidence) * np.sqrt(variance)
+    return pd.Series({"estimate": estimate, "lower": estimate - margin, "upper": estimate + margin})
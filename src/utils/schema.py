@@ -0,0 +1,191 @@
+import pandas as pd
+from src.utils.pushdown import quote_identifier
+
+# INFORMATION_SCHEMA.COLUMNS data types by the comparison they go through
+TYPE_FAMILIES = {
+    "numeric": {"NUMBER", "DECIMAL", "NUMERIC", "INT", "INTEGER", "BIGINT", "SMALLINT",
+                "TINYINT", "BYTEINT", "FLOAT", "FLOAT4", "FLOAT8", "DOUBLE", "REAL"},
+    "text": {"TEXT", "VARCHAR", "CHAR", "CHARACTER", "STRING"},
+    "boolean": {"BOOLEAN"},
+}
+# families ExpectedProfiler compares; timestamps are dropped and
+# semi-structured or binary columns cannot be compared
+COMPARABLE_FAMILIES = {"numeric", "text", "boolean"}
+DIFFERENCE_COLUMNS = ["column", "type_df1", "type_df2", "difference", "compared"]
+
+
+def type_family(data_type: str):
+    """
+    Family of an INFORMATION_SCHEMA data type.
+    Args:
+        data_type (str): e.g. 'NUMBER', 'TEXT', 'TIMESTAMP_NTZ', 'VARIANT'
+    Returns:
+        str: 'numeric', 'text', 'boolean' or 'other'
+    """
+    data_type = str(data_type).upper()
+    for family, types in TYPE_FAMILIES.items():
+        if data_type in types:
+            return family
+    return "other"
+
+
+def describe_type(row):
+    """Readable type of an INFORMATION_SCHEMA.COLUMNS row, e.g. NUMBER(38,2)."""
+    if row["data_type"] == "NUMBER" and not pd.isna(row["numeric_precision"]):
+        return f"NUMBER({int(row['numeric_precision'])},{int(row['numeric_scale'])})"
+    return row["data_type"]
+
+
+def parse_columns(columns: str):
+    """Splits a comma separated --columns/--exclude-columns value."""
+    if not columns:
+        return []
+    return [col.strip() for col in columns.split(",") if col.strip()]
+
+
+class SchemaPreflight:
+    """
+    Class to compare the schemas of two tables before any row is fetched.
+
+    Reads INFORMATION_SCHEMA.COLUMNS of both tables, reports the columns
+    missing on one side or with a different type, and builds a projected
+    select list with only the columns that can be compared: present in
+    both tables, with a numeric, text or boolean type of the same family.
+    Timestamp, semi-structured (VARIANT, OBJECT, ARRAY) and binary columns
+    are left out unless they are listed in columns.
+
+    Attributes:
+        connector (SnowflakeConnector): connector used to run the queries
+        relation_1 (str): fully qualified name of the first table
+        relation_2 (str): fully qualified name of the second table
+        columns (list): columns to compare, overriding the type rules (None = all comparable)
+        exclude_columns (list): columns never compared
+        schema_1 (DataFrame): INFORMATION_SCHEMA.COLUMNS rows of relation_1
+        schema_2 (DataFrame): INFORMATION_SCHEMA.COLUMNS rows of relation_2
+        differences (DataFrame): one row per column missing or typed differently
+        projected (list): columns of the projected select, in the order of relation_1
+        skipped (list): columns in both tables left out of the projection
+
+    Methods:
+        run: Reads both schemas and computes the differences and projection
+        select_list: Projected columns as a quoted SQL select list
+        query: Projected select statement for a table
+        _columns_query: INFORMATION_SCHEMA.COLUMNS query of one table
+        _read_columns: Names and classifies the columns of one table
+    """
+
+    def __init__(
+        self,
+        connector,
+        relation_1: str,
+        relation_2: str,
+        columns: list = None,
+        exclude_columns: list = None,
+    ):
+        self.connector = connector
+        self.relation_1 = relation_1
+        self.relation_2 = relation_2
+        self.columns = columns or None
+        self.exclude_columns = exclude_columns or []
+        self.schema_1 = None
+        self.schema_2 = None
+        self.differences = None
+        self.projected = None
+        self.skipped = None
+
+    @staticmethod
+    def _columns_query(relation: str):
+        """INFORMATION_SCHEMA.COLUMNS query of one table."""
+        database, schema, table = relation.split(".")
+        return f"""
+            select column_name, data_type, numeric_precision, numeric_scale
+            from {database}.information_schema.columns
+            where table_schema = '{schema.upper()}'
+                and table_name = '{table.upper()}'
+            order by ordinal_position
+            """
+
+    def _read_columns(self, result: pd.DataFrame, relation: str):
+        """Names the INFORMATION_SCHEMA.COLUMNS result of one table."""
+        if result.empty:
+            raise ValueError(f"Table {relation.upper()} was not found in INFORMATION_SCHEMA.")
+        result = result.set_axis(
+            ["column_name", "data_type", "numeric_precision", "numeric_scale"], axis=1
+        )
+        result["family"] = result["data_type"].map(type_family)
+        result["type"] = result.apply(describe_type, axis=1)
+        return result.set_index("column_name")
+
+    def _resolve(self, names: list, available):
+        """Matches user supplied column names case-insensitively."""
+        lookup = {col.upper(): col for col in available}
+        missing = [name for name in names if name.upper() not in lookup]
+        if missing:
+            raise ValueError(f"Columns not found in both tables: {', '.join(missing)}")
+        return [lookup[name.upper()] for name in names]
+
+    def run(self):
+        """
+        Reads both schemas, then fills differences, projected and skipped.
+        Args:
+            None
+        Returns:
+            None
+        """
+        result_1, result_2 = self.connector.query_concurrently(
+            self._columns_query(self.relation_1), self._columns_query(self.relation_2)
+        )
+        self.schema_1 = self._read_columns(result_1, self.relation_1)
+        self.schema_2 = self._read_columns(result_2, self.relation_2)
+
+        rows = []
+        for col in self.schema_1.index.union(self.schema_2.index, sort=False):
+            in_1, in_2 = col in self.schema_1.index, col in self.schema_2.index
+            type_1 = self.schema_1.loc[col, "type"] if in_1 else None
+            type_2 = self.schema_2.loc[col, "type"] if in_2 else None
+            if not in_2:
+                rows.append([col, type_1, type_2, "only in df_1", False])
+            elif not in_1:
+                rows.append([col, type_1, type_2, "only in df_2", False])
+            elif type_1 != type_2:
+                same_family = (
+                    self.schema_1.loc[col, "family"] == self.schema_2.loc[col, "family"]
+                )
+                rows.append([col, type_1, type_2, "type differs", same_family])
+        self.differences = pd.DataFrame(rows, columns=DIFFERENCE_COLUMNS)
+
+        shared = [col for col in self.schema_1.index if col in self.schema_2.index]
+        excluded = set(self._resolve(self.exclude_columns, shared))
+        if self.columns is not None:
+            candidates = self._resolve(self.columns, shared)
+        else:
+            candidates = [
+                col
+                for col in shared
+                if self.schema_1.loc[col, "family"] in COMPARABLE_FAMILIES
+                and self.schema_1.loc[col, "family"] == self.schema_2.loc[col, "family"]
+            ]
+        self.projected = [col for col in candidates if col not in excluded]
+        self.skipped = [col for col in shared if col not in self.projected]
+        if not self.projected:
+            raise ValueError("No comparable columns are shared by both tables.")
+
+    def select_list(self):
+        """Projected columns as a quoted SQL select list."""
+        return ", ".join(quote_identifier(col) for col in self.projected)
+
+    def query(self, relation: str, filter_condition: str, clause: str = ""):
+        """
+        Projected select statement for a table.
+        Args:
+            relation (str): fully qualified table name
+            filter_condition (str): where clause
+            clause (str): clause placed after the table name, e.g. a SAMPLE clause
+        Returns:
+            str: SQL statement
+        """
+        return f"""
+        select {self.select_list()}
+        from {relation} {clause}
+        where {filter_condition}
+        """
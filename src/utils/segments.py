@@ -0,0 +1,227 @@
+import numbers
+import numpy as np
+import pandas as pd
+from src.utils.expected_profile import ExpectedProfiler, percent_difference
+from src.utils.pushdown import quote_identifier, classify_columns
+
+SEGMENT_COLUMNS = ["segment", "row_count", "checksum"]
+
+
+def segment_literal(value):
+    """
+    SQL predicate matching one segment value.
+    Args:
+        value: segment value as returned by the GROUP BY query
+    Returns:
+        str: 'is null' or '= <literal>'
+    """
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return "is null"
+    if isinstance(value, (bool, np.bool_)):
+        return f"= {str(bool(value)).lower()}"
+    if isinstance(value, numbers.Number):
+        return f"= {value}"
+    return "= '{}'".format(str(value).replace("'", "''"))
+
+
+def build_segment_query(
+    relation: str, filter_condition: str, segment_by: str, columns: list, numeric_cols: list
+):
+    """
+    Builds one GROUP BY statement returning the row count, a HASH_AGG
+    checksum of every column and the mean of every numeric column per segment.
+
+    The output columns are SEGMENT_COLUMNS followed by the numeric columns,
+    in order.
+    Args:
+        relation (str): fully qualified table name (database.schema.table)
+        filter_condition (str): where clause applied before grouping
+        segment_by (str): column the segments are defined by
+        columns (list): columns included in the checksum
+        numeric_cols (list): columns averaged per segment
+    Returns:
+        str: SQL statement
+    """
+    means = "".join(
+        f",\n            avg({quote_identifier(col)})" for col in numeric_cols
+    )
+    checksum = ", ".join(quote_identifier(col) for col in columns)
+    return f"""
+        select {quote_identifier(segment_by)} as segment,
+            count(*) as row_count,
+            hash_agg({checksum}) as checksum{means}
+        from {relation}
+        where {filter_condition}
+        group by 1
+        """
+
+
+class SegmentedComparison:
+    """
+    Class to compare two tables segment by segment, computed inside Snowflake.
+
+    One GROUP BY query per table returns the row count, a checksum and the
+    numeric means of every value of the segment column, so all segments are
+    compared with a single scan of each table. Segments are ranked by a
+    divergence score, and the worst segments whose checksums differ can be
+    fetched and profiled with ExpectedProfiler.
+
+    The divergence of a segment is the percent difference of its row counts
+    (as in shapes, 100 when the segment is missing on one side) plus the mean
+    absolute percent difference of its numeric means.
+
+    Attributes:
+        connector (SnowflakeConnector): connector used to run the queries
+        relation_1 (str): fully qualified name of the first table
+        relation_2 (str): fully qualified name of the second table
+        segment_by (str): column the segments are defined by
+        filter_condition (str): where clause applied to both tables
+        drill_down (int): number of differing segments profiled in full
+        sample_rows (int): rows fetched to infer column types
+        numeric_cols (list): numeric columns averaged per segment
+        segments (DataFrame): one row per segment, sorted by divergence
+        profiles (dict): segment value -> ExpectedProfiler of the drilled down segments
+
+    Methods:
+        compare: Runs the segment queries, ranks the segments and drills down
+        _columns: Shared columns and numeric columns of both tables
+        _rank: Joins the per-segment results and computes the divergence
+        _drill_down: Profiles the worst differing segments
+    """
+
+    def __init__(
+        self,
+        connector,
+        relation_1: str,
+        relation_2: str,
+        segment_by: str,
+        filter_condition: str = "1 = 1",
+        drill_down: int = 0,
+        sample_rows: int = 1000,
+    ):
+        self.connector = connector
+        self.relation_1 = relation_1
+        self.relation_2 = relation_2
+        self.segment_by = segment_by
+        self.filter_condition = filter_condition
+        self.drill_down = drill_down
+        self.sample_rows = sample_rows
+        self.numeric_cols = None
+        self.segments = None
+        self.profiles = {}
+
+    def _columns(self):
+        """
+        Shared columns of both tables, in the order of relation_1, and the
+        numeric ones among them. Resolves segment_by case-insensitively.
+        Args:
+            None
+        Returns:
+            (tuple) : shared columns (list), numeric columns (list)
+        """
+        sample_1, sample_2 = self.connector.query_concurrently(
+            *[
+                f"select * from {relation} where {self.filter_condition} limit {self.sample_rows}"
+                for relation in (self.relation_1, self.relation_2)
+            ]
+        )
+        shared = [col for col in sample_1.columns if col in set(sample_2.columns)]
+        matches = [col for col in shared if col.upper() == self.segment_by.upper()]
+        if not matches:
+            raise ValueError(
+                f"Segment column {self.segment_by} is not in both tables."
+            )
+        self.segment_by = matches[0]
+        numeric_cols, _ = classify_columns(sample_1[shared])
+        return shared, [col for col in numeric_cols if col != self.segment_by]
+
+    def _rank(self, segments_1: pd.DataFrame, segments_2: pd.DataFrame):
+        """
+        Joins the per-segment results of both tables and ranks the segments.
+        Args:
+            segments_1 (pd.DataFrame): result of build_segment_query on relation_1
+            segments_2 (pd.DataFrame): result of build_segment_query on relation_2
+        Returns:
+            pd.DataFrame: segments sorted by divergence, most divergent first
+        """
+        names = SEGMENT_COLUMNS + self.numeric_cols
+        frames = []
+        for suffix, segments in (("df1", segments_1), ("df2", segments_2)):
+            segments = segments.set_axis(names, axis=1).set_index("segment")
+            segments.columns = [f"{col}_{suffix}" for col in segments.columns]
+            frames.append(segments)
+        merged = frames[0].join(frames[1], how="outer")
+
+        rows_1 = merged["row_count_df1"].fillna(0)
+        rows_2 = merged["row_count_df2"].fillna(0)
+        ranked = pd.DataFrame(
+            {
+                "rows_df1": rows_1.astype("int64"),
+                "rows_df2": rows_2.astype("int64"),
+                "row_percent_difference": (rows_1 - rows_2).abs() / (rows_1 + rows_2) * 100,
+                "checksum_match": merged["checksum_df1"] == merged["checksum_df2"],
+            },
+            index=merged.index,
+        )
+        for col in self.numeric_cols:
+            means_1 = pd.to_numeric(merged[f"{col}_df1"]).astype("float64")
+            means_2 = pd.to_numeric(merged[f"{col}_df2"]).astype("float64")
+            ranked[f"{col}_percent_difference"] = percent_difference(means_1, means_2)
+
+        mean_differences = ranked[
+            [f"{col}_percent_difference" for col in self.numeric_cols]
+        ].abs()
+        ranked["divergence"] = ranked["row_percent_difference"] + (
+            mean_differences.mean(axis=1).fillna(0) if self.numeric_cols else 0
+        )
+        ranked.index.name = self.segment_by
+        return ranked.sort_values(
+            ["checksum_match", "divergence"], ascending=[True, False], kind="stable"
+        )
+
+    def _drill_down(self):
+        """Fetches and profiles the worst segments whose checksums differ."""
+        worst = self.segments[~self.segments["checksum_match"]].head(self.drill_down)
+        for value in worst.index:
+            predicate = f"{quote_identifier(self.segment_by)} {segment_literal(value)}"
+            df_1, df_2 = self.connector.query_concurrently(
+                *[
+                    f"""
+                    select *
+                    from {relation}
+                    where ({self.filter_condition}) and {predicate}
+                    """
+                    for relation in (self.relation_1, self.relation_2)
+                ]
+            )
+            profiler = ExpectedProfiler(df_1, df_2)
+            if len(df_1) and len(df_2):
+                profiler.compare()
+            self.profiles[value] = profiler
+
+    def compare(self):
+        """
+        Runs one segment query per table, ranks the segments and profiles the
+        drill_down worst differing segments.
+        Args:
+            None
+        Returns:
+            None
+        """
+        columns, self.numeric_cols = self._columns()
+        segments_1, segments_2 = self.connector.query_concurrently(
+            *[
+                build_segment_query(
+                    relation,
+                    self.filter_condition,
+                    self.segment_by,
+                    columns,
+                    self.numeric_cols,
+                )
+                for relation in (self.relation_1, self.relation_2)
+            ]
+        )
+        self.segments = self._rank(segments_1, segments_2)
+        if self.drill_down:
+            self._drill_down()
+
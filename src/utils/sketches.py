@@ -0,0 +1,478 @@
+import numpy as np
+import pandas as pd
+
+# distinct values above which a categorical column is summarized by sketches
+SKETCH_THRESHOLD = 100_000
+# rows of a column added to a sketch at a time
+SKETCH_CHUNK_ROWS = 1_000_000
+
+_MASK_32 = np.uint64(0xFFFFFFFF)
+
+
+def hash_values(values):
+    """
+    64-bit hashes of values, identical for equal strings whatever their dtype
+    (object, category or Arrow strings), so prod and dev sketches line up.
+    Args:
+        values (array-like): distinct values
+    Returns:
+        np.ndarray: uint64 hashes
+    """
+    text = np.asarray(pd.Index(values).astype(str), dtype=object)
+    return pd.util.hash_array(text)
+
+
+def _bit_length(values: np.ndarray):
+    """Bit length of each uint64, exact through two float64 halves."""
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & _MASK_32).astype(np.float64)
+    return np.where(high > 0, 32 + np.frexp(high)[1], np.frexp(low)[1])
+
+
+def _hash_family(size: int, seed: int):
+    """Odd multipliers and offsets of a multiply-shift hash family."""
+    rng = np.random.default_rng(seed)
+    multipliers = rng.integers(1, 2**63, size, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    offsets = rng.integers(0, 2**63, size, dtype=np.uint64)
+    return multipliers, offsets
+
+
+class HyperLogLog:
+    """
+    Distinct count estimate in 2**precision one-byte registers
+    (relative error about 1.04 / sqrt(2**precision)).
+    Attributes:
+        precision (int): number of index bits
+        registers (np.ndarray): maximum rank seen per register
+
+    Methods:
+        update: Adds hashed values
+        merge: Takes the register-wise maximum of another sketch
+        estimate: Estimated number of distinct values
+    """
+
+    def __init__(self, precision: int = 14):
+        self.precision = precision
+        self.registers = np.zeros(2**precision, dtype=np.uint8)
+
+    def update(self, hashes: np.ndarray):
+        """Adds uint64 hashes of values."""
+        if not len(hashes):
+            return
+        bits = 64 - self.precision
+        index = (hashes >> np.uint64(bits)).astype(np.int64)
+        rest = hashes & np.uint64(2**bits - 1)
+        rank = (bits - _bit_length(rest) + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other):
+        """Merges another HyperLogLog of the same precision."""
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self):
+        """Estimated number of distinct values."""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = np.count_nonzero(self.registers == 0)
+        if estimate <= 2.5 * m and zeros:
+            # linear counting for small cardinalities
+            estimate = m * np.log(m / zeros)
+        return float(estimate)
+
+
+class CountMinSketch:
+    """
+    Frequency estimates in a depth x width table of counters. Estimates
+    never undercount and overcount by at most e / width of the total with
+    probability 1 - exp(-depth).
+    Attributes:
+        width (int): counters per row, a power of two
+        depth (int): number of rows (hash functions)
+        table (np.ndarray): counters
+        total (int): sum of all weights added
+
+    Methods:
+        update: Adds hashed values with weights
+        merge: Adds the counters of another sketch
+        estimate: Estimated frequency of hashed values
+    """
+
+    def __init__(self, width: int = 2048, depth: int = 4, seed: int = 7):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.total = 0
+        self._multipliers, self._offsets = _hash_family(depth, seed)
+        self._shift = np.uint64(64 - int(np.log2(width)))
+
+    def _columns(self, hashes: np.ndarray, row: int):
+        return ((hashes * self._multipliers[row] + self._offsets[row]) >> self._shift).astype(
+            np.int64
+        )
+
+    def update(self, hashes: np.ndarray, weights: np.ndarray):
+        """Adds uint64 hashes of values, each with its count."""
+        for row in range(self.depth):
+            self.table[row] += np.bincount(
+                self._columns(hashes, row), weights=weights, minlength=self.width
+            ).astype(np.int64)
+        self.total += int(np.sum(weights))
+
+    def merge(self, other):
+        """Merges another sketch built with the same width, depth and seed."""
+        self.table += other.table
+        self.total += other.total
+        return self
+
+    def estimate(self, hashes: np.ndarray):
+        """Estimated frequency of each hashed value."""
+        return np.min(
+            [self.table[row][self._columns(hashes, row)] for row in range(self.depth)], axis=0
+        )
+
+
+class SpaceSaving:
+    """
+    The capacity most frequent values with upper-bound counts. A value
+    missing from a full summary has at most the smallest stored count.
+    Attributes:
+        capacity (int): number of values kept
+        counts (pd.Series): value -> upper bound of its count
+
+    Methods:
+        update: Adds values with their counts
+        merge: Merges another summary
+        floor: Upper bound of the count of a value that is not stored
+    """
+
+    def __init__(self, capacity: int = 100):
+        self.capacity = capacity
+        self.counts = pd.Series(dtype="int64")
+
+    def floor(self):
+        """Largest possible count of a value that is not stored."""
+        if len(self.counts) < self.capacity:
+            return 0
+        return int(self.counts.min())
+
+    def update(self, values, weights):
+        """Adds distinct values with their counts."""
+        batch = pd.Series(np.asarray(weights, dtype=np.int64), index=pd.Index(values))
+        kept = batch.nlargest(self.capacity)
+        # values cut from the batch have at most the smallest kept count
+        self._combine(kept, int(kept.min()) if len(batch) > self.capacity else 0)
+
+    def merge(self, other):
+        """Merges another summary (Space-Saving merge of the two counter sets)."""
+        self._combine(other.counts, other.floor())
+        return self
+
+    def _combine(self, counts: pd.Series, floor: int):
+        own_floor = self.floor()
+        union = self.counts.index.union(counts.index)
+        combined = self.counts.reindex(union, fill_value=own_floor) + counts.reindex(
+            union, fill_value=floor
+        )
+        self.counts = combined.nlargest(self.capacity)
+
+
+class MinHash:
+    """
+    Signature of a value set; the share of equal positions of two
+    signatures estimates the Jaccard similarity of the sets.
+    Attributes:
+        num_perm (int): signature length
+        signature (np.ndarray): minimum hash per permutation
+
+    Methods:
+        update: Adds hashed values
+        merge: Takes the position-wise minimum of another signature
+        jaccard: Estimated Jaccard similarity with another MinHash
+    """
+
+    def __init__(self, num_perm: int = 128, seed: int = 11):
+        self.num_perm = num_perm
+        self.signature = np.full(num_perm, np.iinfo(np.uint64).max, dtype=np.uint64)
+        self._multipliers, self._offsets = _hash_family(num_perm, seed)
+
+    def update(self, hashes: np.ndarray):
+        """Adds uint64 hashes of values."""
+        if not len(hashes):
+            return
+        for i in range(self.num_perm):
+            permuted = hashes * self._multipliers[i] + self._offsets[i]
+            self.signature[i] = min(self.signature[i], permuted.min())
+
+    def merge(self, other):
+        """Merges the signature of another set."""
+        np.minimum(self.signature, other.signature, out=self.signature)
+        return self
+
+    def jaccard(self, other):
+        """Estimated Jaccard similarity of the two value sets."""
+        empty = np.iinfo(np.uint64).max
+        if (self.signature == empty).all() and (other.signature == empty).all():
+            return np.nan
+        return float(np.mean(self.signature == other.signature))
+
+
+class CategoricalSketch:
+    """
+    Fixed-memory summary of a categorical column: distinct count
+    (HyperLogLog), frequencies (Count-Min), heavy hitters (Space-Saving)
+    and the value set (MinHash). All parts are mergeable.
+    Attributes:
+        rows (int): non-null values added
+        distinct (HyperLogLog)
+        frequencies (CountMinSketch)
+        heavy_hitters (SpaceSaving)
+        values (MinHash)
+
+    Methods:
+        update: Adds a column or batch
+        update_counts: Adds distinct values with their counts
+        merge: Merges another sketch
+        estimate: Estimated frequencies of values
+    """
+
+    def __init__(self, capacity: int = 100):
+        self.rows = 0
+        self.distinct = HyperLogLog()
+        self.frequencies = CountMinSketch()
+        self.heavy_hitters = SpaceSaving(capacity)
+        self.values = MinHash()
+
+    def update(self, values: pd.Series):
+        """
+        Adds the values of a column or batch. Nulls are skipped.
+        Args:
+            values (pd.Series): categorical values
+        Returns:
+            None
+        """
+        counts = values.value_counts()
+        self.update_counts(counts.index, counts.to_numpy())
+
+    def update_counts(self, values, counts):
+        """
+        Adds distinct values with their counts.
+        Args:
+            values (array-like): distinct non-null values
+            counts (array-like): count of each value
+        Returns:
+            None
+        """
+        counts = np.asarray(counts, dtype=np.int64)
+        present = counts > 0
+        values = pd.Index(values)[present]
+        counts = counts[present]
+        if not len(values):
+            return
+        hashes = hash_values(values)
+        self.rows += int(counts.sum())
+        self.distinct.update(hashes)
+        self.frequencies.update(hashes, counts)
+        self.heavy_hitters.update(np.asarray(values.astype(str), dtype=object), counts)
+        self.values.update(hashes)
+
+    def merge(self, other):
+        """Merges another CategoricalSketch."""
+        self.rows += other.rows
+        self.distinct.merge(other.distinct)
+        self.frequencies.merge(other.frequencies)
+        self.heavy_hitters.merge(other.heavy_hitters)
+        self.values.merge(other.values)
+        return self
+
+    def estimate(self, values):
+        """
+        Estimated frequencies of values, the tighter of the Count-Min and
+        Space-Saving upper bounds.
+        Args:
+            values (array-like): values as strings
+        Returns:
+            np.ndarray: estimated counts
+        """
+        estimates = self.frequencies.estimate(hash_values(values))
+        bounds = (
+            self.heavy_hitters.counts.reindex(pd.Index(values), fill_value=self.heavy_hitters.floor())
+            .to_numpy()
+        )
+        return np.minimum(estimates, bounds)
+
+
+# quantiles compared by the distribution metrics
+QUANTILES = [0.01, 0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99]
+
+
+class QuantileSketch:
+    """
+    KLL quantile sketch of a numeric column. Values are kept in levels of
+    compactors; an item on level h stands for 2**h values, and a full level
+    is sorted and every other item promoted, so about 3 * k values are kept
+    whatever the column length. Rank errors are around 1.7 / k; until the
+    first compaction the sketch is exact.
+    Attributes:
+        k (int): capacity of the top level
+        levels (list): np.ndarray of values per level
+        count (int): non-null values added
+        min (float): smallest value seen
+        max (float): largest value seen
+
+    Methods:
+        update: Adds a batch of values
+        merge: Merges another sketch
+        quantiles: Estimated quantiles
+        cdf: Estimated share of values <= each point
+    """
+
+    def __init__(self, k: int = 200, seed: int = 0):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self.min = np.nan
+        self.max = np.nan
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int):
+        """Lower levels get geometrically smaller compactors."""
+        depth = len(self.levels) - level - 1
+        return max(8, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        """Compacts every level above its capacity, lowest level first."""
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # an odd item out stays on this level
+                kept, items = items[: len(items) % 2], items[len(items) % 2 :]
+                promoted = items[self._rng.integers(2) :: 2]
+                self.levels[level] = kept
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def update(self, values):
+        """
+        Adds a batch of values. Nulls are skipped like in describe().
+        Args:
+            values (array-like): batch of a numeric column
+        Returns:
+            None
+        """
+        array = np.asarray(values, dtype="float64")
+        array = array[~np.isnan(array)]
+        if array.size == 0:
+            return
+        self.count += array.size
+        self.min = np.nanmin([self.min, array.min()])
+        self.max = np.nanmax([self.max, array.max()])
+        self.levels[0] = np.concatenate([self.levels[0], array])
+        self._compress()
+
+    def merge(self, other):
+        """Merges another QuantileSketch (same k)."""
+        if other.count == 0:
+            return self
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self.min = np.nanmin([self.min, other.min])
+        self.max = np.nanmax([self.max, other.max])
+        self._compress()
+        return self
+
+    def _weighted(self):
+        """Sorted items with their weights."""
+        values = np.concatenate(self.levels)
+        weights = np.concatenate(
+            [np.full(len(items), 2**level, dtype=np.int64) for level, items in enumerate(self.levels)]
+        )
+        order = np.argsort(values, kind="stable")
+        return values[order], weights[order]
+
+    def quantiles(self, quantiles):
+        """
+        Estimated quantiles, with the same linear interpolation as
+        describe() while the sketch is exact.
+        Args:
+            quantiles (list): quantiles between 0 and 1
+        Returns:
+            np.ndarray: estimated values (NaN for an empty sketch)
+        """
+        quantiles = np.asarray(quantiles, dtype="float64")
+        if self.count == 0:
+            return np.full(quantiles.shape, np.nan)
+        if len(self.levels) == 1:
+            return np.quantile(self.levels[0], quantiles)
+        values, weights = self._weighted()
+        ranks = np.cumsum(weights) / self.count
+        index = np.searchsorted(ranks, quantiles, side="left").clip(0, len(values) - 1)
+        result = values[index]
+        result[quantiles <= 0] = self.min
+        result[quantiles >= 1] = self.max
+        return result
+
+    def cdf(self, points):
+        """
+        Estimated share of the values lower than or equal to each point.
+        Args:
+            points (array-like): values to evaluate
+        Returns:
+            np.ndarray: shares between 0 and 1
+        """
+        points = np.asarray(points, dtype="float64")
+        if self.count == 0:
+            return np.full(points.shape, np.nan)
+        values, weights = self._weighted()
+        cumulative = np.concatenate([[0], np.cumsum(weights)])
+        return cumulative[np.searchsorted(values, points, side="right")] / self.count
+
+
+def ks_distance(sketch_1: QuantileSketch, sketch_2: QuantileSketch):
+    """
+    Two-sample Kolmogorov-Smirnov statistic, the largest gap between the
+    two estimated CDFs.
+    Args:
+        sketch_1 (QuantileSketch): first column
+        sketch_2 (QuantileSketch): second column
+    Returns:
+        float: distance between 0 and 1 (NaN if a side is empty)
+    """
+    if sketch_1.count == 0 or sketch_2.count == 0:
+        return np.nan
+    points = np.concatenate(sketch_1.levels + sketch_2.levels)
+    return float(np.max(np.abs(sketch_1.cdf(points) - sketch_2.cdf(points))))
+
+
+def population_stability_index(
+    sketch_1: QuantileSketch, sketch_2: QuantileSketch, bins: int = 10, floor: float = 1e-4
+):
+    """
+    Population stability index of the second column against the first,
+    over bins holding equal shares of the first column.
+    Args:
+        sketch_1 (QuantileSketch): reference column
+        sketch_2 (QuantileSketch): compared column
+        bins (int): number of bins
+        floor (float): smallest share of a bin, so empty bins stay finite
+    Returns:
+        float: PSI (NaN if a side is empty)
+    """
+    if sketch_1.count == 0 or sketch_2.count == 0:
+        return np.nan
+    edges = np.unique(sketch_1.quantiles(np.linspace(0, 1, bins + 1)[1:-1]))
+
+    def shares(sketch):
+        cdf = np.concatenate([[0], sketch.cdf(edges), [1]])
+        return np.clip(np.diff(cdf), floor, None)
+
+    shares_1, shares_2 = shares(sketch_1), shares(sketch_2)
+    return float(np.sum((shares_2 - shares_1) * np.log(shares_2 / shares_1)))
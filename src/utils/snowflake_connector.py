@@ -1,5 +1,64 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import Future, ThreadPoolExecutor
 import pandas as pd
+import pyarrow as pa
 import snowflake.connector
+from snowflake.connector.errors import NotSupportedError
+from src.utils import type_conversion
+
+# default of submit(version=...): look the table version up for the query
+LOOKUP_VERSION = object()
+
+
+class QueryHandle:
+    """
+    Handle to a query submitted with SnowflakeConnector.submit.
+    Attributes:
+        cursor: cursor the query runs on (one cursor per query), None for cached results
+        query_id: Snowflake query ID, None if the driver does not support async execution
+        future: concurrent.futures.Future resolving to the result dataframe
+
+    Methods:
+        result: Waits for the query and returns its dataframe
+        cancel: Aborts the query in Snowflake and closes its cursor
+    """
+
+    def __init__(self, cursor, query_id, future):
+        self.cursor = cursor
+        self.query_id = query_id
+        self.future = future
+
+    def result(self, timeout: float = None):
+        """
+        Waits for the query to finish and returns the result.
+        Args:
+            timeout (float): seconds to wait before raising TimeoutError
+        Returns:
+            df (pd.DataFrame): query result
+        """
+        return self.future.result(timeout=timeout)
+
+    def cancel(self):
+        """Abort the query if it is still running and close its cursor."""
+        if self.future.done():
+            return
+        self.future.cancel()
+        if self.cursor is None:
+            return
+        if self.query_id is not None and hasattr(self.cursor, "abort_query"):
+            try:
+                self.cursor.abort_query(self.query_id)
+            except Exception:
+                # the query may have finished in the meantime
+                pass
+        try:
+            self.cursor.close()
+        except Exception:
+            pass
+
 
 class SnowflakeConnector:
     """
@@ -11,12 +70,35 @@ class SnowflakeConnector:
         account: alpha-num-id.location-id.cloud-provider
         warehouse: Snowflake warehouse
         authenticator: Snowflake SSO (default = 'external')
+        fetch_engine: 'arrow' (default) to fetch Arrow batches, 'tuples' for fetchall
+        cache: ResultCache consulted before executing queries on a known table (None = off)
+        refresh_cache: re-execute queries and overwrite their cached results
+        query_ledger: QueryLedger of the query IDs whose persisted results are reused (None = off)
+        pool_size: maximum number of connections used for synchronous queries
+        connect_seconds: setup time of each connection opened, in seconds
+        tracer: Tracer recording the connect/execute/fetch/convert phases (None = off)
         conn: Snowflake connector object
 
     Methods:
         query: Executes query against Snowflake to return a dataframe
-        close_connection: Closes the Snowflake connection once run is complete
+        query_batches: Executes query and yields the result as a stream of dataframes
+        submit: Starts a query on its own cursor and returns a QueryHandle
+        query_concurrently: Executes several queries at once and returns their dataframes
+        table_version: Returns LAST_ALTERED of a table from INFORMATION_SCHEMA
+        cache_version: Version a query result is cached under, None if not cacheable
+        query_history: Returns QUERY_HISTORY rows of the given query IDs
+        close_connection: Closes the Snowflake connection(s) once run is complete
+        connection_report: Summarizes the connection setup time
+        from_connection: Wraps an already open DB-API connection
         _connect_to_snowflake: Creates Snowflake connector object
+        _open_connection: Opens a connection and records its setup time
+        _connection: Borrows a connection of the pool
+        _fetch_dataframe: Fetches the results of an executed cursor
+        _fetch_arrow_table: Fetches the results of an executed cursor as an Arrow table
+        _arrow_to_dataframe: Converts an Arrow table to an Arrow-backed dataframe
+        _reused_result: Reads the persisted result of an earlier run of a query
+        _record_query: Records the query ID of a result in the query ledger
+        _phase: Records a phase on the tracer, if any
     """
 
     def __init__(
@@ -26,20 +108,160 @@ class SnowflakeConnector:
         warehouse: str,
         authenticator: str = "externalbrowser",
         password: str = None,
+        fetch_engine: str = "arrow",
+        cache=None,
+        refresh_cache: bool = False,
+        pool_size: int = 1,
+        tracer=None,
+        query_ledger=None,
     ):
         self.user = user
         self.password = password
         self.account = account
         self.authenticator = authenticator
         self.warehouse = warehouse.upper()
-        self.conn = self._connect_to_snowflake()
+        self.fetch_engine = fetch_engine
+        self.cache = cache
+        self.refresh_cache = refresh_cache
+        self.query_ledger = query_ledger
+        self.pool_size = max(pool_size, 1)
+        self.connect_seconds = []
+        self.tracer = tracer
+        self.conn = self._open_connection()
+        self._connections = [self.conn]
+        self._idle = queue.LifoQueue()
+        self._idle.put(self.conn)
+        self._pool_lock = threading.Lock()
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    @classmethod
+    def from_connection(
+        cls,
+        conn,
+        warehouse: str = "",
+        fetch_engine: str = "arrow",
+        cache=None,
+        refresh_cache: bool = False,
+        tracer=None,
+        query_ledger=None,
+    ):
+        """
+        Wraps an already open DB-API connection (e.g. sqlite3) without
+        logging in to Snowflake. Useful for tests and local stand-ins.
+        Args:
+            conn: DB-API 2.0 connection object
+            warehouse (str): Warehouse name to record on the instance
+            fetch_engine (str): 'arrow' or 'tuples'
+            cache (ResultCache): optional local result cache
+            refresh_cache (bool): re-execute queries and overwrite cached results
+            tracer (Tracer): optional phase tracer
+            query_ledger (QueryLedger): optional ledger of reusable query IDs
+        Returns:
+            SnowflakeConnector
+        """
+        connector = cls.__new__(cls)
+        connector.user = None
+        connector.password = None
+        connector.account = None
+        connector.authenticator = None
+        connector.warehouse = warehouse.upper()
+        connector.fetch_engine = fetch_engine
+        connector.cache = cache
+        connector.refresh_cache = refresh_cache
+        connector.query_ledger = query_ledger
+        # a wrapped connection cannot be cloned, so the pool holds just it
+        connector.pool_size = 1
+        connector.connect_seconds = []
+        connector.tracer = tracer
+        connector.conn = conn
+        connector._connections = [conn]
+        connector._idle = queue.LifoQueue()
+        connector._idle.put(conn)
+        connector._pool_lock = threading.Lock()
+        connector._executor = None
+        connector._executor_lock = threading.Lock()
+        return connector
 
     def close_connection(self):
         """Close Snowflake connector."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        for conn in self._connections:
+            if conn is not self.conn:
+                conn.close()
         self.conn.close()
 
+    def connection_report(self):
+        """
+        Summarizes how long opening the connections took.
+        Args:
+            None
+        Returns:
+            str: number of connections and their setup time
+        """
+        if not self.connect_seconds:
+            return "No connections opened"
+        return (
+            f"Opened {len(self.connect_seconds)} connection(s) in "
+            f"{sum(self.connect_seconds):.2f}s (first {self.connect_seconds[0]:.2f}s)"
+        )
+
+    def _phase(self, name: str, side: str = None):
+        """
+        Context manager recording a phase on the tracer. Without a tracer
+        it yields a throwaway record.
+        Args:
+            name (str): phase name
+            side (str): table the phase works on
+        Returns:
+            context manager yielding the phase record (dict)
+        """
+        if self.tracer is None:
+            return nullcontext({})
+        return self.tracer.phase(name, side)
+
+    def _open_connection(self):
+        """Opens a Snowflake connection and records its setup time."""
+        with self._phase("connect"):
+            start = time.perf_counter()
+            conn = self._connect_to_snowflake()
+            self.connect_seconds.append(time.perf_counter() - start)
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        """
+        Borrows a connection of the pool for one synchronous statement.
+        A new connection is opened while fewer than pool_size exist,
+        otherwise the caller waits for one to be returned.
+        Yields:
+            connection object
+        """
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._pool_lock:
+                if len(self._connections) < self.pool_size:
+                    conn = self._open_connection()
+                    self._connections.append(conn)
+            if conn is None:
+                conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
     def _connect_to_snowflake(self):
-        """Establish connection to Snowflake via Password or SSO"""
+        """
+        Establish connection to Snowflake via Password or SSO.
+
+        With SSO the ID token is stored in the local credential cache
+        (client_store_temporary_credential), so later connections and later
+        runs reuse the session instead of opening the browser again.
+        """
         if self.password is not None:
             conn = snowflake.connector.connect(
                 user=self.user,
@@ -54,30 +276,395 @@ class SnowflakeConnector:
                 authenticator=self.authenticator,
                 account=self.account,
                 warehouse=self.warehouse,
+                client_store_temporary_credential=True,
             )
             return conn
 
-    def query(self, query: str):
+    def _fetch_arrow_table(self, cur):
+        """
+        Fetches the results of an executed cursor as one Arrow table.
+        The batches are concatenated without copying their buffers.
+        Args:
+            cur: cursor that has executed a query
+        Returns:
+            pa.Table: query result, None if the result is not available as Arrow
+        """
+        try:
+            batches = [
+                pa.Table.from_batches([batch])
+                if isinstance(batch, pa.RecordBatch)
+                else batch
+                for batch in cur.fetch_arrow_batches()
+            ]
+        except NotSupportedError:
+            # e.g. results returned in JSON format
+            return None
+
+        if not batches:
+            return None
+
+        return pa.concat_tables(batches)
+
+    def _arrow_to_dataframe(self, table: pa.Table):
+        """
+        Converts an Arrow table to a dataframe backed by the Arrow buffers.
+        Decimal columns are cast so they are profiled as numbers: NUMBER
+        columns without a scale to int64 when they fit, all others to float64.
+        Args:
+            table (pa.Table): query result
+        Returns:
+            df (pd.DataFrame): Arrow-backed dataframe
+        """
+        for i, field in enumerate(table.schema):
+            if pa.types.is_decimal(field.type):
+                column = table.column(i)
+                try:
+                    if field.type.scale != 0:
+                        raise pa.ArrowInvalid("decimal has a scale")
+                    column = column.cast(pa.int64())
+                except pa.ArrowInvalid:
+                    column = column.cast(pa.float64())
+                table = table.set_column(i, field.name, column)
+
+        return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+    def _fetch_dataframe(self, cur, side: str = None):
+        """
+        Fetches the results of an executed cursor as a dataframe.
+
+        The 'arrow' engine keeps the result in Arrow buffers end to end and
+        falls back to fetchall for drivers or results without Arrow support.
+        Columns are converted once, from the Snowflake types in cur.description.
+        Args:
+            cur: cursor that has executed a query
+            side (str): table the query reads, recorded by the tracer
+        Returns:
+            df (pd.DataFrame): query result
+        """
+        if self.fetch_engine == "arrow" and hasattr(cur, "fetch_arrow_batches"):
+            with self._phase("fetch", side) as record:
+                table = self._fetch_arrow_table(cur)
+                if table is not None:
+                    record.update(rows=table.num_rows, bytes=table.nbytes)
+            if table is not None:
+                with self._phase("convert", side) as record:
+                    df = type_conversion.convert_dataframe(
+                        self._arrow_to_dataframe(table), cur.description
+                    )
+                    record.update(rows=len(df), bytes=int(df.memory_usage().sum()))
+                return df
+
+        with self._phase("fetch", side) as record:
+            # Fetch the results
+            results = cur.fetchall()
+            record["rows"] = len(results)
+
+        with self._phase("convert", side) as record:
+            # convert to df
+            df = pd.DataFrame(results, columns=[col[0] for col in cur.description])
+            df = type_conversion.convert_dataframe(df, cur.description)
+            record.update(rows=len(df), bytes=int(df.memory_usage().sum()))
+
+        return df
+
+    def table_version(self, relation: str):
+        """
+        Returns the LAST_ALTERED timestamp of a table from INFORMATION_SCHEMA.
+
+        Only base tables have a version: LAST_ALTERED of a view (most dbt
+        models) follows its DDL, not the data of the tables it reads.
+        Args:
+            relation (str): fully qualified table name (database.schema.table)
+        Returns:
+            str: last altered timestamp, None if the table was not found or is not a base table
+        """
+        database, schema, table = relation.split(".")
+        df = self.query(
+            f"""
+            select last_altered, table_type
+            from {database}.information_schema.tables
+            where table_schema = '{schema.upper()}'
+                and table_name = '{table.upper()}'
+            """
+        )
+        if df.empty or str(df.iloc[0, 1]).upper() != "BASE TABLE":
+            return None
+        return str(df.iloc[0, 0])
+
+    def query_history(self, query_ids: list):
+        """
+        Returns the QUERY_HISTORY rows of queries run in this session.
+        Args:
+            query_ids (list): Snowflake query IDs
+        Returns:
+            pd.DataFrame: query_id, bytes_scanned, execution_time and
+            total_elapsed_time (ms) of each query found
+        """
+        ids = ", ".join(f"'{query_id}'" for query_id in query_ids)
+        return self.query(
+            f"""
+            select query_id, bytes_scanned, execution_time, total_elapsed_time
+            from table(information_schema.query_history_by_session(result_limit => 10000))
+            where query_id in ({ids})
+            """
+        )
+
+    def cache_version(self, relation: str):
+        """
+        Version a query result on relation is cached or recorded under.
+        Args:
+            relation (str): fully qualified table name the query reads
+        Returns:
+            str: table version, None if neither the cache nor the query ledger applies
+        """
+        if (self.cache is None and self.query_ledger is None) or relation is None:
+            return None
+        try:
+            return self.table_version(relation)
+        except Exception:
+            # e.g. no access to INFORMATION_SCHEMA: run the query uncached
+            return None
+
+    def _cached_result(self, query: str, version: str, relation: str = None):
+        """Result of query in the local cache, None on a miss."""
+        if self.cache is None or version is None or self.refresh_cache:
+            return None
+        with self._phase("cache", relation) as record:
+            df = self.cache.get(query, version)
+            record["rows"] = None if df is None else len(df)
+        return df
+
+    def _previous_query_id(self, query: str, version: str):
+        """ID of an earlier run of query on the same table version, None if there is none."""
+        if self.query_ledger is None or version is None or self.refresh_cache:
+            return None
+        return self.query_ledger.get(query, version)
+
+    def _reused_result(self, query: str, version: str, query_id: str, relation: str = None):
+        """
+        Reads the persisted result of an earlier run of query without
+        executing it again, with get_results_from_sfqid or, for cursors
+        without it, RESULT_SCAN. A result that expired or cannot be read
+        is removed from the query ledger.
+        Args:
+            query (str): query the result belongs to
+            version (str): table version the query read
+            query_id (str): Snowflake query ID of the earlier run
+            relation (str): table the query reads, recorded by the tracer
+        Returns:
+            df (pd.DataFrame): persisted result, None if it is not available
+        """
+        try:
+            with self._connection() as conn:
+                cur = conn.cursor()
+                try:
+                    with self._phase("reuse", relation) as record:
+                        record["query_id"] = query_id
+                        if hasattr(cur, "get_results_from_sfqid"):
+                            cur.get_results_from_sfqid(query_id)
+                        else:
+                            cur.execute(f"select * from table(result_scan('{query_id}'))")
+                    return self._fetch_dataframe(cur, relation)
+                finally:
+                    cur.close()
+        except Exception:
+            # expired, or run by another role: execute the query again
+            self.query_ledger.remove(query, version)
+            return None
+
+    def _record_query(self, query: str, version: str, query_id: str, df: pd.DataFrame):
+        """Stores a fresh result in the cache and its query ID in the query ledger."""
+        if version is None:
+            return
+        if self.cache is not None:
+            self.cache.put(query, version, df)
+        if self.query_ledger is not None and query_id is not None:
+            self.query_ledger.put(query, version, query_id)
+
+    def query(self, query: str, relation: str = None):
         """
         Executes query and retuns a dataframe
         Args:
             :param query: query
             :type query: string
+            :param relation: table the query reads, enables the result cache
+            :type relation: string
         Returns:
             df (pd.DataFrame): Snowflake table as a dataframe
         """
-        # Create a cursor object
+        version = self.cache_version(relation)
+        df = self._cached_result(query, version, relation)
+        if df is not None:
+            return df
+
+        query_id = self._previous_query_id(query, version)
+        if query_id is not None:
+            df = self._reused_result(query, version, query_id, relation)
+            if df is not None:
+                return df
+
+        with self._connection() as conn:
+            # Create a cursor object
+            cur = conn.cursor()
+
+            # Execute a query
+            with self._phase("execute", relation) as record:
+                cur.execute(f"{query}")
+                query_id = getattr(cur, "sfqid", None)
+                record["query_id"] = query_id
+
+            df = self._fetch_dataframe(cur, relation)
+
+            cur.close()
+
+        self._record_query(query, version, query_id, df)
+        return df
+
+    def query_batches(self, query: str, batch_size: int = 100_000):
+        """
+        Executes query and yields the result as a stream of dataframes, so
+        the whole result never has to be held in memory at once.
+
+        The 'arrow' engine yields one dataframe per Arrow batch sent by
+        Snowflake; otherwise rows are fetched with fetchmany(batch_size).
+        The query runs when the generator is first advanced.
+        Args:
+            query (str): query to execute
+            batch_size (int): rows per batch for the fetchmany path
+        Yields:
+            df (pd.DataFrame): batch of the result
+        """
         cur = self.conn.cursor()
+        try:
+            cur.execute(f"{query}")
+            columns = [col[0] for col in cur.description]
+
+            if self.fetch_engine == "arrow" and hasattr(cur, "fetch_arrow_batches"):
+                try:
+                    batches = cur.fetch_arrow_batches()
+                except NotSupportedError:
+                    batches = None
+                if batches is not None:
+                    for batch in batches:
+                        if isinstance(batch, pa.RecordBatch):
+                            batch = pa.Table.from_batches([batch])
+                        yield type_conversion.convert_dataframe(
+                            self._arrow_to_dataframe(batch), cur.description
+                        )
+                    return
 
-        # Execute a query
-        cur.execute(f"{query}")
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield type_conversion.convert_dataframe(
+                    pd.DataFrame(rows, columns=columns), cur.description
+                )
+        finally:
+            cur.close()
+
+    def submit(self, query: str, relation: str = None, version=LOOKUP_VERSION):
+        """
+        Starts a query on its own cursor without waiting for it.
+
+        With the Snowflake driver the query is submitted with execute_async
+        so it runs in the warehouse right away, and a worker thread waits for
+        the query ID and fetches the result. Other DB-API drivers execute the
+        query inside the worker thread on a connection borrowed from the
+        pool, since they do not all allow concurrent statements on one
+        connection.
+
+        When relation is given and a result cache is set, a cached result of
+        the unchanged table is returned without executing the query. With a
+        query ledger, the persisted result of an earlier run on the unchanged
+        table is read back instead, and the query only runs if it expired.
+        Callers submitting many queries on one table pass the version from
+        cache_version, so it is looked up once instead of once per query.
+        Args:
+            query (str): query to execute
+            relation (str): table the query reads, enables the result cache
+            version (str): cache_version of relation (default: looked up)
+        Returns:
+            QueryHandle: handle resolving to the result dataframe
+        """
+        if version is LOOKUP_VERSION:
+            version = self.cache_version(relation)
+        df = self._cached_result(query, version, relation)
+        if df is not None:
+            future = Future()
+            future.set_result(df)
+            return QueryHandle(None, None, future)
 
-        # Fetch the results
-        results = cur.fetchall()
+        with self._executor_lock:
+            # submit may be called from several threads, e.g. by a batch run
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(thread_name_prefix="snow-diff-query")
 
-        # convert to df
-        df = pd.DataFrame(results, columns=[col[0] for col in cur.description])
+        def fetch(cur, query_id):
+            df = self._fetch_dataframe(cur, relation)
+            self._record_query(query, version, query_id, df)
+            return df
+
+        def run_pooled():
+            with self._connection() as conn:
+                pooled = conn.cursor()
+                try:
+                    with self._phase("execute", relation) as record:
+                        pooled.execute(query)
+                        record["query_id"] = getattr(pooled, "sfqid", None)
+                    return fetch(pooled, record["query_id"])
+                finally:
+                    pooled.close()
+
+        previous_id = self._previous_query_id(query, version)
+        if previous_id is not None:
+
+            def reuse():
+                df = self._reused_result(query, version, previous_id, relation)
+                return df if df is not None else run_pooled()
+
+            return QueryHandle(None, None, self._executor.submit(reuse))
+
+        cur = self.conn.cursor()
+
+        if hasattr(cur, "execute_async"):
+            cur.execute_async(query)
+            query_id = cur.sfqid
+
+            def run():
+                try:
+                    # time until the warehouse finished the query
+                    with self._phase("execute", relation) as record:
+                        record["query_id"] = query_id
+                        cur.get_results_from_sfqid(query_id)
+                    return fetch(cur, query_id)
+                finally:
+                    cur.close()
+
+            return QueryHandle(cur, query_id, self._executor.submit(run))
 
         cur.close()
+        return QueryHandle(None, None, self._executor.submit(run_pooled))
+
+    def query_concurrently(self, *queries: str, relations: list = None):
+        """
+        Executes several queries at the same time, one cursor per query.
 
-        return df
\ No newline at end of file
+        If any query fails, or the wait is interrupted (e.g. Ctrl-C), the
+        queries that are still running are aborted before the error is raised.
+        Args:
+            *queries (str): queries to execute
+            relations (list): table read by each query, enables the result cache
+        Returns:
+            list: result dataframes in the same order as the queries
+        """
+        relations = relations or [None] * len(queries)
+        handles = []
+        try:
+            for query, relation in zip(queries, relations):
+                handles.append(self.submit(query, relation))
+            return [handle.result() for handle in handles]
+        except BaseException:
+            for handle in handles:
+                handle.cancel()
+            raise
@@ -0,0 +1,406 @@
+import math
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from src.utils.arguments import parse_memory_budget
+from src.utils.key_diff import diff_by_key
+from src.utils.streaming_profile import StreamingProfiler
+
+# a chunk held as pandas takes a few times its Arrow size: the conversion,
+# merge results and boolean masks are copies
+WORKING_SET_FACTOR = 4
+
+
+def chunk_rows(memory_budget: int, bytes_per_row: float, parts: int = 1):
+    """
+    Rows per chunk so parts chunks fit the memory budget together.
+    Args:
+        memory_budget (int): bytes available
+        bytes_per_row (float): Arrow size of a row
+        parts (int): chunks held at the same time
+    Returns:
+        int: rows per chunk, at least 1
+    """
+    return max(1, int(memory_budget / (WORKING_SET_FACTOR * parts * max(bytes_per_row, 1))))
+
+
+def arrow_table(batch: pd.DataFrame):
+    """
+    Converts a batch to Arrow with the types spill files are written with.
+    Dtypes chosen per batch by type_conversion are widened so every batch
+    of a result has the same schema: categories are decoded, integers
+    become int64, floats float64 and all-null columns strings.
+    Args:
+        batch (pd.DataFrame): batch of a query result
+    Returns:
+        pa.Table: the batch without pandas metadata
+    """
+    table = pa.Table.from_pandas(batch, preserve_index=False)
+    fields = []
+    for field in table.schema:
+        data_type = field.type
+        if pa.types.is_dictionary(data_type):
+            data_type = data_type.value_type
+        if pa.types.is_integer(data_type):
+            data_type = pa.int64()
+        elif pa.types.is_floating(data_type):
+            data_type = pa.float64()
+        elif pa.types.is_large_string(data_type) or pa.types.is_null(data_type):
+            data_type = pa.string()
+        fields.append(pa.field(field.name, data_type))
+    return table.cast(pa.schema(fields))
+
+
+def to_dataframe(table):
+    """Converts spilled rows back to pandas, keeping strings in Arrow buffers."""
+    return table.to_pandas(types_mapper={pa.string(): pd.StringDtype("pyarrow")}.get)
+
+
+def key_buckets(keys: pd.DataFrame, buckets: int):
+    """
+    Bucket number of every row by the hash of its key. Numeric keys are
+    hashed as float64 and others as strings, so a key typed int64 on one
+    side and float64 (with nulls) on the other lands in the same bucket.
+    Args:
+        keys (pd.DataFrame): key column(s)
+        buckets (int): number of buckets
+    Returns:
+        np.ndarray: bucket of every row
+    """
+    normalized = pd.DataFrame(
+        {
+            col: (
+                pd.to_numeric(keys[col]).astype("float64")
+                if pd.api.types.is_numeric_dtype(keys[col])
+                and not pd.api.types.is_bool_dtype(keys[col])
+                else keys[col].astype(str)
+            )
+            for col in keys.columns
+        }
+    )
+    return pd.util.hash_pandas_object(normalized, index=False).to_numpy() % buckets
+
+
+class SpillFile:
+    """
+    Parquet file one side of a comparison is spilled to.
+
+    Row groups are sized from the first batch so that reading one back
+    stays within the memory budget.
+    Attributes:
+        path (str): Parquet file
+        memory_budget (int): bytes a chunk read back may take
+        schema (pa.Schema): schema of the first batch, None until a batch is written
+        rows (int): rows written
+        bytes (int): Arrow size of the rows written
+        row_group_size (int): rows per row group
+
+    Methods:
+        write: Appends a batch
+        close: Finishes the file
+        bytes_per_row: Average Arrow size of a row
+        record_batches: Reads the file back as Arrow batches
+        batches: Reads the file back as dataframes
+    """
+
+    def __init__(self, path: str, memory_budget: int):
+        self.path = path
+        self.memory_budget = memory_budget
+        self.schema = None
+        self.rows = 0
+        self.bytes = 0
+        self.row_group_size = None
+        self.writer = None
+
+    def write(self, batch):
+        """
+        Appends a batch, cast to the schema of the first one.
+        Args:
+            batch (pd.DataFrame | pa.Table): rows to append
+        Returns:
+            None
+        """
+        table = arrow_table(batch) if isinstance(batch, pd.DataFrame) else batch
+        if table.num_rows == 0 and self.writer is not None:
+            return
+        if self.writer is None:
+            self.schema = table.schema
+            self.row_group_size = chunk_rows(
+                self.memory_budget, table.nbytes / max(table.num_rows, 1)
+            )
+            self.writer = pq.ParquetWriter(self.path, self.schema)
+        else:
+            table = table.select(self.schema.names).cast(self.schema)
+        self.writer.write_table(table, row_group_size=self.row_group_size)
+        self.rows += table.num_rows
+        self.bytes += table.nbytes
+
+    def close(self):
+        """Finishes the file so it can be read."""
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    def bytes_per_row(self):
+        """Average Arrow size of a row written."""
+        return self.bytes / max(self.rows, 1)
+
+    def record_batches(self, batch_size: int, columns: list = None):
+        """
+        Reads the file back through a memory map, batch_size rows at a time.
+        Args:
+            batch_size (int): rows per batch
+            columns (list): columns to read (None = all)
+        Yields:
+            pa.RecordBatch: rows of the file
+        """
+        if self.schema is None:
+            return
+        file = pq.ParquetFile(self.path, memory_map=True)
+        try:
+            yield from file.iter_batches(batch_size=batch_size, columns=columns)
+        finally:
+            file.close()
+
+    def batches(self, batch_size: int, columns: list = None):
+        """Reads the file back as dataframes of batch_size rows."""
+        for batch in self.record_batches(batch_size, columns):
+            yield to_dataframe(batch)
+
+
+def spill_sides(batches_1, batches_2, directory: str, memory_budget: int):
+    """
+    Writes both streams of batches to Parquet files, one thread per side,
+    so both queries are fetched at the same time and only the batch being
+    written is held in memory.
+    Args:
+        batches_1 (iterable): batches (DataFrames) of the first table
+        batches_2 (iterable): batches (DataFrames) of the second table
+        directory (str): directory the files are written to
+        memory_budget (int): bytes a chunk read back may take
+    Returns:
+        (tuple) : SpillFile of each side, closed
+    """
+
+    def spill(side, batches):
+        spill_file = SpillFile(f"{directory}/side_{side}.parquet", memory_budget)
+        try:
+            for batch in batches:
+                spill_file.write(batch)
+        finally:
+            spill_file.close()
+        return spill_file
+
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="snow-diff-spill") as pool:
+        futures = [pool.submit(spill, 1, batches_1), pool.submit(spill, 2, batches_2)]
+        return tuple(future.result() for future in futures)
+
+
+class OutOfCoreProfiler(StreamingProfiler):
+    """
+    Class to perform the ExpectedProfiler comparisons on tables larger than memory.
+
+    Both streams are first spilled to local Parquet files. The files are
+    then read back through memory maps in chunks sized to the memory
+    budget and fed to the mergeable accumulators of StreamingProfiler, so
+    the describe statistics and frequency tables are computed without
+    either table being held in memory. The spill files are removed once
+    the comparison finishes.
+
+    Attributes:
+        memory_budget (int): bytes the chunks read back may take
+        spill_dir (str): directory the temporary spill directory is created in (None = system default)
+        spilled (dict): side -> (rows, bytes) written to the spill files
+        (plus the attributes of StreamingProfiler)
+
+    Methods:
+        _consume: Spills both streams, then updates the accumulators chunk by chunk
+        (plus the methods of StreamingProfiler)
+    """
+
+    def __init__(self, batches_1, batches_2, memory_budget: int, spill_dir: str = None):
+        super().__init__(batches_1, batches_2)
+        self.memory_budget = memory_budget
+        self.spill_dir = spill_dir
+        self.spilled = {}
+
+    def _consume(self):
+        """Spills both streams, then updates the accumulators chunk by chunk."""
+        with tempfile.TemporaryDirectory(prefix="snowdiff-", dir=self.spill_dir) as directory:
+            spills = spill_sides(self.batches_1, self.batches_2, directory, self.memory_budget)
+            for side, table, spill_file in zip((1, 2), (self.table_1, self.table_2), spills):
+                self.spilled[side] = (spill_file.rows, spill_file.bytes)
+                rows = chunk_rows(self.memory_budget, spill_file.bytes_per_row())
+                for batch in spill_file.batches(rows):
+                    table.update(batch)
+
+
+class OutOfCoreKeyDiff:
+    """
+    Class to diff two tables by primary key when they do not fit in memory.
+
+    Both tables are fetched in full and spilled to local Parquet files.
+    Every row is then written to one of several bucket files per side by
+    the hash of its key, with enough buckets for the two files of a bucket
+    to fit the memory budget together. A key lands in the same bucket on
+    both sides, so the tables are joined bucket by bucket with the same
+    comparison as KeyDiff.
+
+    Attributes:
+        connector (SnowflakeConnector): connector used to run the queries
+        relation_1 (str): fully qualified name of the first table
+        relation_2 (str): fully qualified name of the second table
+        key (list): primary key column(s)
+        filter_condition (str): where clause applied to both tables
+        memory_budget (int): bytes the buckets read back may take
+        spill_dir (str): directory the temporary spill directory is created in (None = system default)
+        columns (list): columns compared (shared by both tables)
+        buckets (int): number of hash buckets the tables were split into
+        inserted (DataFrame): keys only present in relation_2
+        deleted (DataFrame): keys only present in relation_1
+        updated (DataFrame): keys present in both with the columns that changed
+        rows_fetched (int): number of rows pulled from both tables
+
+    Methods:
+        compare: Spills both tables and diffs them bucket by bucket
+        _resolve_key: Matches the key to the shared columns
+        _partition: Splits a spill file into bucket files by key hash
+        _read_bucket: Reads one bucket file of a side
+    """
+
+    def __init__(
+        self,
+        connector,
+        relation_1: str,
+        relation_2: str,
+        key,
+        filter_condition: str = "1 = 1",
+        memory_budget: int = 2**30,
+        spill_dir: str = None,
+    ):
+        self.connector = connector
+        self.relation_1 = relation_1
+        self.relation_2 = relation_2
+        self.key = [key] if isinstance(key, str) else list(key)
+        self.filter_condition = filter_condition
+        self.memory_budget = memory_budget
+        self.spill_dir = spill_dir
+        self.columns = None
+        self.buckets = None
+        self.inserted = None
+        self.deleted = None
+        self.updated = None
+        self.rows_fetched = 0
+
+    def _resolve_key(self, schema_1: pa.Schema, schema_2: pa.Schema):
+        """Sets the shared columns and matches the key to them case-insensitively."""
+        self.columns = [col for col in schema_1.names if col in set(schema_2.names)]
+        lookup = {col.upper(): col for col in self.columns}
+        self.key = [lookup.get(k.upper(), k) for k in self.key]
+        missing = [k for k in self.key if k not in self.columns]
+        if missing:
+            raise KeyError(f"Key column(s) {missing} are not present in both tables.")
+
+    def _partition(self, spill_file: SpillFile, side: int, directory: str):
+        """
+        Splits a spill file into bucket files by the hash of the key.
+        Args:
+            spill_file (SpillFile): spilled rows of one side
+            side (int): 1 or 2
+            directory (str): directory the bucket files are written to
+        Returns:
+            dict: bucket number -> SpillFile
+        """
+        files = {}
+        rows = chunk_rows(self.memory_budget, spill_file.bytes_per_row())
+        try:
+            for batch in spill_file.record_batches(rows, self.columns):
+                table = pa.Table.from_batches([batch])
+                bucket = key_buckets(to_dataframe(table.select(self.key)), self.buckets)
+                for number in np.unique(bucket):
+                    if number not in files:
+                        files[number] = SpillFile(
+                            f"{directory}/side_{side}_bucket_{number}.parquet",
+                            self.memory_budget,
+                        )
+                    files[number].write(table.take(np.flatnonzero(bucket == number)))
+        finally:
+            for bucket_file in files.values():
+                bucket_file.close()
+        return files
+
+    def _read_bucket(self, files: dict, number: int, schema: pa.Schema):
+        """Reads one bucket file of a side, empty if no key fell into it."""
+        if number not in files:
+            return to_dataframe(schema.empty_table().select(self.columns))
+        return to_dataframe(pq.read_table(files[number].path, memory_map=True))
+
+    def compare(self):
+        """
+        Spills both tables and diffs them bucket by bucket.
+        Args:
+            None
+        Returns:
+            None
+        """
+        queries = [
+            f"""
+            select *
+            from {relation}
+            where {self.filter_condition}
+            """
+            for relation in (self.relation_1, self.relation_2)
+        ]
+        with tempfile.TemporaryDirectory(prefix="snowdiff-", dir=self.spill_dir) as directory:
+            spills = spill_sides(
+                self.connector.query_batches(queries[0]),
+                self.connector.query_batches(queries[1]),
+                directory,
+                self.memory_budget,
+            )
+            schema_1 = spills[0].schema or spills[1].schema
+            schema_2 = spills[1].schema or spills[0].schema
+            if schema_1 is None:
+                raise AssertionError("Both tables are empty, please check your filter parameter.")
+            self._resolve_key(schema_1, schema_2)
+            self.rows_fetched = spills[0].rows + spills[1].rows
+
+            # the two files of a bucket are held in memory together
+            self.buckets = max(
+                1,
+                math.ceil(
+                    WORKING_SET_FACTOR * (spills[0].bytes + spills[1].bytes) / self.memory_budget
+                ),
+            )
+            if self.buckets == 1:
+                files_1, files_2 = (
+                    {0: spill_file} if spill_file.schema is not None else {}
+                    for spill_file in spills
+                )
+            else:
+                files_1 = self._partition(spills[0], 1, directory)
+                files_2 = self._partition(spills[1], 2, directory)
+
+            deleted, inserted, updated = [], [], []
+            for number in sorted(set(files_1) | set(files_2)):
+                result = diff_by_key(
+                    self._read_bucket(files_1, number, schema_1)[self.columns],
+                    self._read_bucket(files_2, number, schema_2)[self.columns],
+                    self.key,
+                    self.columns,
+                )
+                deleted.append(result[0])
+                inserted.append(result[1])
+                updated.append(result[2])
+
+        empty = pd.DataFrame(columns=self.key)
+        self.deleted = pd.concat(deleted, ignore_index=True) if deleted else empty
+        self.inserted = pd.concat(inserted, ignore_index=True) if inserted else empty.copy()
+        self.updated = (
+            pd.concat(updated, ignore_index=True)
+            if updated
+            else empty.assign(changed_columns=[])
+        )
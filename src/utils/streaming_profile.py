@@ -0,0 +1,575 @@
+import queue
+import threading
+import numpy as np
+import pandas as pd
+from src.utils import sketches
+from src.utils.expected_profile import (
+    percent_difference,
+    frequency_comparison,
+    sketch_comparison,
+    distribution_comparison,
+    is_timestamp,
+)
+
+DESCRIBE_STATISTICS = ["count", "mean", "std", "min", "25%", "50%", "75%", "max"]
+
+
+class NumericAccumulator:
+    """
+    Mergeable running statistics of a numeric column.
+
+    Batches are combined with the parallel form of Welford's algorithm
+    (Chan et al.), so two accumulators built on different batches can be
+    merged without revisiting the data. Quartiles come from a mergeable
+    quantile sketch of the column.
+    Attributes:
+        count (int): number of non-null values
+        sum (float): sum of the values
+        mean (float): running mean
+        m2 (float): running sum of squared differences from the mean
+        min (float): smallest value seen
+        max (float): largest value seen
+        sketch (QuantileSketch): quantile sketch of the values
+
+    Methods:
+        update: Adds a batch of values
+        merge: Adds the statistics of another accumulator
+        std: Sample standard deviation (ddof=1, like describe())
+        describe: Statistics in describe() order
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.nan
+        self.max = np.nan
+        self.sketch = sketches.QuantileSketch()
+
+    def _combine(self, count, total, mean, m2, minimum, maximum):
+        """Combines the statistics of a second partition into this one."""
+        if count == 0:
+            return
+        if self.count == 0:
+            self.count, self.sum, self.mean, self.m2 = count, total, mean, m2
+            self.min, self.max = minimum, maximum
+            return
+
+        combined = self.count + count
+        delta = mean - self.mean
+        self.mean = self.mean + delta * count / combined
+        self.m2 = self.m2 + m2 + delta**2 * self.count * count / combined
+        self.count = combined
+        self.sum += total
+        self.min = min(self.min, minimum)
+        self.max = max(self.max, maximum)
+
+    def update(self, values: pd.Series):
+        """
+        Adds a batch of values. Nulls are skipped like in describe().
+        Args:
+            values (pd.Series): batch of a numeric column
+        Returns:
+            None
+        """
+        array = values.dropna().to_numpy(dtype="float64")
+        if array.size == 0:
+            return
+        self.sketch.update(array)
+        mean = array.mean()
+        self._combine(
+            array.size,
+            array.sum(),
+            mean,
+            ((array - mean) ** 2).sum(),
+            array.min(),
+            array.max(),
+        )
+
+    def merge(self, other):
+        """
+        Adds the statistics of another accumulator.
+        Args:
+            other (NumericAccumulator): accumulator built on other batches
+        Returns:
+            NumericAccumulator: self
+        """
+        self._combine(other.count, other.sum, other.mean, other.m2, other.min, other.max)
+        self.sketch.merge(other.sketch)
+        return self
+
+    def std(self):
+        """Sample standard deviation (ddof=1, like describe())."""
+        if self.count < 2:
+            return np.nan
+        return np.sqrt(self.m2 / (self.count - 1))
+
+    def describe(self):
+        """
+        Statistics in describe() order. Quartiles are estimated from the
+        quantile sketch (exact until it first compacts).
+        Args:
+            None
+        Returns:
+            pd.Series: statistics indexed by DESCRIBE_STATISTICS
+        """
+        return pd.Series(
+            [
+                float(self.count),
+                self.mean if self.count else np.nan,
+                self.std(),
+                self.min,
+                *self.sketch.quantiles([0.25, 0.5, 0.75]),
+                self.max,
+            ],
+            index=DESCRIBE_STATISTICS,
+        )
+
+
+class FrequencyAccumulator:
+    """
+    Mergeable value counts of a categorical column.
+
+    Once the column has more than max_categories distinct values the exact
+    counts are folded into a fixed-size CategoricalSketch, so memory stays
+    bounded on high-cardinality columns.
+    Attributes:
+        counts (dict): value -> frequency, None once sketched
+        max_categories (int): distinct values above which a sketch is used (None = never)
+        sketched (CategoricalSketch): sketch of the column, None while counts are exact
+
+    Methods:
+        update: Adds the values of a batch
+        merge: Adds the counts of another accumulator
+        value_counts: Counts as a Series like pd.Series.value_counts()
+        sketch: The counts as a CategoricalSketch
+    """
+
+    def __init__(self, max_categories: int = sketches.SKETCH_THRESHOLD):
+        self.counts = {}
+        self.max_categories = max_categories
+        self.sketched = None
+
+    def update(self, values: pd.Series):
+        """
+        Adds the values of a batch. Nulls are skipped like in value_counts().
+        Args:
+            values (pd.Series): batch of a categorical column
+        Returns:
+            None
+        """
+        batch = values.astype(str).where(values.notna()).value_counts()
+        if self.sketched is not None:
+            self.sketched.update_counts(batch.index, batch.to_numpy())
+            return
+        for value, count in batch.items():
+            self.counts[value] = self.counts.get(value, 0) + int(count)
+        self._check_cardinality()
+
+    def merge(self, other):
+        """
+        Adds the counts of another accumulator.
+        Args:
+            other (FrequencyAccumulator): accumulator built on other batches
+        Returns:
+            FrequencyAccumulator: self
+        """
+        if self.sketched is not None or other.sketched is not None:
+            self.sketched = self.sketch().merge(other.sketch())
+            self.counts = None
+            return self
+        for value, count in other.counts.items():
+            self.counts[value] = self.counts.get(value, 0) + count
+        self._check_cardinality()
+        return self
+
+    def _check_cardinality(self):
+        """Switches to a sketch once there are too many distinct values."""
+        if self.max_categories is not None and len(self.counts) > self.max_categories:
+            self.sketched = self.sketch()
+            self.counts = None
+
+    def value_counts(self):
+        """Counts as a Series sorted like pd.Series.value_counts()."""
+        if self.sketched is not None:
+            # only the heavy hitters are known once sketched
+            counts = self.sketched.heavy_hitters.counts
+            return counts.rename("count").sort_values(ascending=False)
+        return pd.Series(self.counts, name="count", dtype="int64").sort_values(
+            ascending=False
+        )
+
+    def sketch(self):
+        """
+        The counts as a CategoricalSketch (a copy while counts are exact).
+        Args:
+            None
+        Returns:
+            CategoricalSketch: sketch of the column
+        """
+        if self.sketched is not None:
+            return self.sketched
+        sketch = sketches.CategoricalSketch()
+        sketch.update_counts(list(self.counts), list(self.counts.values()))
+        return sketch
+
+
+class TableAccumulator:
+    """
+    Accumulators for every column of one side of the comparison.
+
+    Columns are classified with the same rules as ExpectedProfiler:
+    timestamps are ignored, columns that convert with pd.to_numeric are
+    numeric and everything else is categorical. A column only holding
+    nulls so far is classified again on the first batch with values, and
+    a text column that stops converting to numbers becomes categorical,
+    so the result matches a classification of the whole column.
+    Attributes:
+        rows (int): rows consumed so far
+        columns (list): column names of the result
+        numeric (dict): column -> NumericAccumulator
+        categorical (dict): column -> FrequencyAccumulator
+        fallback (dict): text column classified numeric -> its FrequencyAccumulator
+        unresolved (set): columns that only held nulls so far
+
+    Methods:
+        update: Adds a batch of rows
+        merge: Adds the accumulators of another TableAccumulator
+        describe: describe() like frame of the numeric columns
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.columns = None
+        self.numeric = {}
+        self.categorical = {}
+        self.fallback = {}
+        self.unresolved = set()
+
+    def _classify(self, batch: pd.DataFrame):
+        """Creates the column accumulators from the first batch."""
+        self.columns = batch.columns.tolist()
+        for col in self.columns:
+            self._classify_column(col, batch[col])
+
+    def _classify_column(self, col: str, values: pd.Series):
+        """(Re)creates the accumulators of one column from a batch of its values."""
+        self.numeric.pop(col, None)
+        self.categorical.pop(col, None)
+        self.fallback.pop(col, None)
+        self.unresolved.discard(col)
+        if values.isna().all():
+            self.unresolved.add(col)
+        if is_timestamp(values):
+            return
+        try:
+            pd.to_numeric(values)
+            self.numeric[col] = NumericAccumulator()
+            if not pd.api.types.is_numeric_dtype(values):
+                # text may stop converting in a later batch
+                self.fallback[col] = FrequencyAccumulator()
+        except (ValueError, TypeError):
+            self.categorical[col] = FrequencyAccumulator()
+
+    def _demote(self, col: str):
+        """Moves a numeric text column to the categorical columns."""
+        del self.numeric[col]
+        self.categorical[col] = self.fallback.pop(col, None) or FrequencyAccumulator()
+        self._order()
+
+    def _order(self):
+        """Puts the accumulators back in the column order of the result."""
+        self.numeric = {col: self.numeric[col] for col in self.columns if col in self.numeric}
+        self.categorical = {
+            col: self.categorical[col] for col in self.columns if col in self.categorical
+        }
+
+    def update(self, batch: pd.DataFrame):
+        """
+        Adds a batch of rows.
+        Args:
+            batch (pd.DataFrame): batch of the query result
+        Returns:
+            None
+        """
+        if self.columns is None:
+            self._classify(batch)
+        resolved = [col for col in self.unresolved if batch[col].notna().any()]
+        for col in resolved:
+            self._classify_column(col, batch[col])
+        if resolved:
+            self._order()
+        self.rows += len(batch)
+        for col, accumulator in list(self.numeric.items()):
+            try:
+                values = pd.to_numeric(batch[col])
+            except (ValueError, TypeError):
+                self._demote(col)
+                continue
+            accumulator.update(values)
+            if col in self.fallback:
+                self.fallback[col].update(batch[col])
+        for col, accumulator in self.categorical.items():
+            accumulator.update(batch[col])
+
+    def merge(self, other):
+        """
+        Adds the accumulators of another TableAccumulator over the same columns.
+        Columns classified differently on both sides are reconciled first:
+        a column that only held nulls takes the classification of the other
+        side and a numeric text column becomes categorical if the other side
+        found values that do not convert.
+        Args:
+            other (TableAccumulator): accumulators built on other batches
+        Returns:
+            TableAccumulator: self
+        """
+        if other.columns is None:
+            return self
+        if self.columns is None:
+            self.columns = list(other.columns)
+            self.numeric = {col: NumericAccumulator() for col in other.numeric}
+            self.categorical = {col: FrequencyAccumulator() for col in other.categorical}
+            self.fallback = {col: FrequencyAccumulator() for col in other.fallback}
+            self.unresolved = set(other.unresolved)
+        self.rows += other.rows
+        for col in self.columns:
+            if col in other.unresolved:
+                # only nulls on the other side, nothing to add
+                continue
+            if col in self.unresolved:
+                self.numeric.pop(col, None)
+                self.categorical.pop(col, None)
+                self.fallback.pop(col, None)
+                self.unresolved.discard(col)
+                if col in other.numeric:
+                    self.numeric[col] = NumericAccumulator()
+                if col in other.fallback:
+                    self.fallback[col] = FrequencyAccumulator()
+                if col in other.categorical:
+                    self.categorical[col] = FrequencyAccumulator()
+            elif col in self.numeric and col in other.categorical:
+                self._demote(col)
+
+            if col in self.numeric:
+                self.numeric[col].merge(other.numeric[col])
+                if col in self.fallback and col in other.fallback:
+                    self.fallback[col].merge(other.fallback[col])
+                else:
+                    self.fallback.pop(col, None)
+            elif col in self.categorical:
+                counts = other.categorical.get(col, other.fallback.get(col))
+                if counts is not None:
+                    self.categorical[col].merge(counts)
+        self._order()
+        return self
+
+    def describe(self):
+        """describe() like frame of the numeric columns."""
+        return pd.DataFrame(
+            {col: accumulator.describe() for col, accumulator in self.numeric.items()},
+            index=DESCRIBE_STATISTICS,
+        )
+
+
+class StreamingProfiler:
+    """
+    Class to perform the ExpectedProfiler comparisons on streams of batches.
+
+    Each side is fetched by a producer thread that pushes batches onto a
+    bounded queue, while the calling thread consumes them and updates the
+    mergeable accumulators. Network fetch and computation overlap and peak
+    memory is bounded by queue_size batches rather than by the table size.
+
+    Attributes:
+        batches_1 (iterable): batches (DataFrames) of the first table
+        batches_2 (iterable): batches (DataFrames) of the second table
+        queue_size (int): maximum number of batches waiting to be consumed
+        table_1 (TableAccumulator): accumulators of the first table
+        table_2 (TableAccumulator): accumulators of the second table
+        df_1_describe (DataFrame): Descriptive statistics of the first table.
+        df_2_describe (DataFrame): Descriptive statistics of the second table.
+        shapes (DataFrame): Counts of rows/columns between tables and their percent/absolute differences.
+        percent_differences (DataFrame): Percent differences between descriptive statistics of numeric columns.
+        absolute_differences (DataFrame): Absolute differences between descriptive statistics of numeric columns.
+        avg_frequency_ratio (dict): Average frequency ratio of categorical values between the tables.
+        frequency_differences (dict): Frequency differences of categorical values between the tables.
+        sketch_summaries (dict): Estimated distinct counts and Jaccard similarity of the sketched columns.
+        distribution_differences (DataFrame): KS distance and PSI of each numeric column.
+        quantile_differences (DataFrame): Percent differences of the 1%..99% quantiles of numeric columns.
+
+    Methods:
+        compare: Consumes both streams and computes the comparisons
+        summarize: Computes the comparisons from table_1 and table_2
+        from_tables: Profiler over accumulators that were already built
+        _produce: Pushes the batches of one side onto the queue
+        _consume: Updates the accumulators until both sides are exhausted
+    """
+
+    def __init__(self, batches_1, batches_2, queue_size: int = 4):
+        self.batches_1 = batches_1
+        self.batches_2 = batches_2
+        self.queue_size = queue_size
+        self.table_1 = TableAccumulator()
+        self.table_2 = TableAccumulator()
+        self.df_1_describe = None
+        self.df_2_describe = None
+        self.shapes = None
+        self.percent_differences = None
+        self.absolute_differences = None
+        self.avg_frequency_ratio = None
+        self.frequency_differences = None
+        self.sketch_summaries = None
+        self.distribution_differences = None
+        self.quantile_differences = None
+
+    @classmethod
+    def from_tables(cls, table_1, table_2):
+        """
+        Profiler over accumulators that were already built, e.g. the
+        profiles of several environments compared pair by pair. Call
+        summarize() instead of compare(); the accumulators are only read.
+        Args:
+            table_1 (TableAccumulator): accumulators of the first table
+            table_2 (TableAccumulator): accumulators of the second table
+        Returns:
+            StreamingProfiler
+        """
+        profiler = cls(None, None)
+        profiler.table_1 = table_1
+        profiler.table_2 = table_2
+        return profiler
+
+    def _produce(self, side: int, batches, batch_queue: queue.Queue, stop: threading.Event):
+        """
+        Pushes the batches of one side onto the queue, followed by None.
+        Errors are forwarded to the consumer instead of being raised here.
+        """
+
+        def put(item):
+            # give up once the consumer has stopped so the thread can exit
+            while not stop.is_set():
+                try:
+                    batch_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        try:
+            for batch in batches:
+                if not put((side, batch)):
+                    return
+            put((side, None))
+        except BaseException as e:
+            put((side, e))
+
+    def _consume(self):
+        """Updates the accumulators until both producers are exhausted."""
+        batch_queue = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        producers = [
+            threading.Thread(
+                target=self._produce,
+                args=(side, batches, batch_queue, stop),
+                name=f"snow-diff-producer-{side}",
+                daemon=True,
+            )
+            for side, batches in ((1, self.batches_1), (2, self.batches_2))
+        ]
+        for producer in producers:
+            producer.start()
+
+        tables = {1: self.table_1, 2: self.table_2}
+        running = len(producers)
+        try:
+            while running:
+                side, batch = batch_queue.get()
+                if batch is None:
+                    running -= 1
+                elif isinstance(batch, BaseException):
+                    raise batch
+                else:
+                    tables[side].update(batch)
+        finally:
+            stop.set()
+
+    def compare(self):
+        """
+        Consumes both streams and computes the comparisons.
+        Args:
+            None
+        Returns:
+            None
+        """
+        self._consume()
+        self.summarize()
+
+    def summarize(self):
+        """
+        Computes the comparisons from the accumulators of both tables.
+        Args:
+            None
+        Returns:
+            None
+        """
+        self.df_1_describe = self.table_1.describe()
+        self.df_2_describe = self.table_2.describe()
+
+        self.shapes = pd.DataFrame(
+            {
+                "df_1": [self.table_1.rows, len(self.table_1.columns or [])],
+                "df_2": [self.table_2.rows, len(self.table_2.columns or [])],
+            },
+            index=["rows", "columns"],
+        ).assign(
+            absolute_difference=lambda x: abs(x["df_1"] - x["df_2"]),
+            percent_difference=lambda x: (
+                x["absolute_difference"] / (x["df_1"] + x["df_2"])
+            )
+            * 100,
+        )
+
+        try:
+            assert self.table_1.rows > 0, "DataFrame 1 has zero length."
+            assert self.table_2.rows > 0, "DataFrame 2 has zero length."
+        except AssertionError as e:
+            raise AssertionError(
+                "Assertion Error: {}\n Please check your table dtypes and/or filter parameter.".format(str(e))
+            )
+
+        if set(self.table_1.columns) != set(self.table_2.columns):
+            return
+        if set(self.table_1.numeric) != set(self.table_2.numeric):
+            return
+
+        self.percent_differences = percent_difference(
+            self.df_1_describe, self.df_2_describe[self.df_1_describe.columns]
+        )
+        self.absolute_differences = (
+            self.df_1_describe - self.df_2_describe[self.df_1_describe.columns]
+        ).abs()
+        self.distribution_differences, self.quantile_differences = distribution_comparison(
+            {col: accumulator.sketch for col, accumulator in self.table_1.numeric.items()},
+            {col: accumulator.sketch for col, accumulator in self.table_2.numeric.items()},
+        )
+
+        avg_frequency_ratio = {}
+        frequency_differences = {}
+        sketch_summaries = {}
+        for col, accumulator in self.table_1.categorical.items():
+            other = self.table_2.categorical[col]
+            if accumulator.sketched is not None or other.sketched is not None:
+                (
+                    avg_frequency_ratio[col],
+                    frequency_differences[col],
+                    sketch_summaries[col],
+                ) = sketch_comparison(accumulator.sketch(), other.sketch())
+                continue
+            avg_frequency_ratio[col], frequency_differences[col] = frequency_comparison(
+                accumulator.value_counts(), other.value_counts()
+            )
+        self.avg_frequency_ratio = avg_frequency_ratio
+        self.frequency_differences = frequency_differences
+        self.sketch_summaries = sketch_summaries
@@ -0,0 +1,101 @@
+import pandas as pd
+from snowflake.connector.constants import FIELD_ID_TO_NAME
+
+# share of distinct values below which text columns are stored as category
+CATEGORY_THRESHOLD = 0.5
+
+TIMESTAMP_TYPES = {"DATE", "TIMESTAMP", "TIMESTAMP_NTZ"}
+TIMESTAMP_TZ_TYPES = {"TIMESTAMP_LTZ", "TIMESTAMP_TZ"}
+
+
+def column_types(description):
+    """
+    Maps the columns of a cursor description to their Snowflake type.
+    Args:
+        description (list): cur.description / result_metadata of an executed cursor
+    Returns:
+        dict: column name -> (type name, scale); columns without a known
+        type code (e.g. other DB-API drivers) are left out
+    """
+    types = {}
+    for column in description or []:
+        type_code = column[1] if len(column) > 1 else None
+        type_name = FIELD_ID_TO_NAME.get(type_code) if isinstance(type_code, int) else None
+        if type_name is not None:
+            scale = column[5] if len(column) > 5 else None
+            types[column[0]] = (type_name, scale)
+    return types
+
+
+def _to_integer(column: pd.Series):
+    """Downcasts an integer column to the smallest integer dtype, or float64 if it has nulls."""
+    if column.isna().any():
+        return pd.to_numeric(column).astype("float64")
+    return pd.to_numeric(column.to_numpy(), downcast="integer")
+
+
+def _to_text(column: pd.Series, threshold: float):
+    """Stores low-cardinality text as category and the rest as Arrow strings."""
+    if len(column) and column.nunique(dropna=True) <= threshold * len(column):
+        return column.astype("category")
+    return column.astype("string[pyarrow]")
+
+
+def convert_column(column: pd.Series, type_name: str, scale=None, threshold=CATEGORY_THRESHOLD):
+    """
+    Converts a fetched column to a compact dtype for its Snowflake type.
+    Args:
+        column (pd.Series): fetched values
+        type_name (str): Snowflake type name, e.g. FIXED, REAL, TEXT
+        scale (int): scale of a NUMBER column
+        threshold (float): share of distinct values below which text becomes a category
+    Returns:
+        pd.Series: converted column, unchanged for types without a mapping
+    """
+    if type_name == "FIXED":
+        if not scale:
+            return pd.Series(_to_integer(column), index=column.index, name=column.name)
+        return pd.to_numeric(column).astype("float64")
+    if type_name == "REAL":
+        # floats are not downcast: float32 sums lose precision in describe()
+        return pd.to_numeric(column).astype("float64")
+    if type_name == "TEXT":
+        return _to_text(column, threshold)
+    if type_name == "BOOLEAN":
+        return column.astype("boolean")
+    if type_name in TIMESTAMP_TYPES | TIMESTAMP_TZ_TYPES and (
+        pd.api.types.is_datetime64_any_dtype(column)
+        or (isinstance(column.dtype, pd.ArrowDtype) and column.dtype.kind == "M")
+    ):
+        # Arrow timestamps are already typed; to_datetime would go through objects
+        return column
+    if type_name in TIMESTAMP_TYPES:
+        return pd.to_datetime(column)
+    if type_name in TIMESTAMP_TZ_TYPES:
+        return pd.to_datetime(column, utc=True)
+    return column
+
+
+def convert_dataframe(df: pd.DataFrame, description, threshold=CATEGORY_THRESHOLD):
+    """
+    Converts a fetched result once, using the column types of the cursor
+    instead of trial conversions.
+    Args:
+        df (pd.DataFrame): fetched result
+        description (list): cur.description of the cursor that fetched df
+        threshold (float): share of distinct values below which text becomes a category
+    Returns:
+        df (pd.DataFrame): result with compact dtypes
+    """
+    types = column_types(description)
+    if not types:
+        return df
+
+    converted = {}
+    for col in df.columns:
+        if col in types:
+            type_name, scale = types[col]
+            converted[col] = convert_column(df[col], type_name, scale, threshold)
+        else:
+            converted[col] = df[col]
+    return pd.DataFrame(converted, index=df.index)
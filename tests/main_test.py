@@ -3,7 +3,7 @@ import pytest
 from unittest.mock import patch, MagicMock, mock_open
 from argparse import Namespace
 from src.utils import expected_profile, snowflake_connector
-from src.__main__ import parse_arguments, get_user_input, load_profile_data, main
+from src.__main__ import parse_arguments, get_user_input, load_profile_data, main, batch_models
 
 try:
     username = os.getenv("USER")
@@ -48,4 +48,138 @@ def test_main(mock_parse_args, mock_snowflake_connector):
     mock_snowflake_connector_instance = MagicMock()
     mock_snowflake_connector.return_value = mock_snowflake_connector_instance
     main()
-    mock_snowflake_connector_instance.query.assert_called()
+    mock_snowflake_connector_instance.query_concurrently.assert_called()
+
+@patch('argparse.ArgumentParser.parse_args')
+def test_parse_arguments_sample_without_filter(mock_parse_args):
+    mock_parse_args.return_value = Namespace(table='test_table', filter=None, custom_schema=None, sample='1')
+    assert parse_arguments().filter == '1 = 1'
+
+@patch('argparse.ArgumentParser.parse_args')
+def test_parse_arguments_batch_skips_prompts(mock_parse_args):
+    mock_parse_args.return_value = Namespace(table=None, filter=None, custom_schema=None, tables='a, b')
+    args = parse_arguments()
+    assert args.filter == '1 = 1'
+    assert batch_models(args) == [('a', None), ('b', None)]
+
+def test_startup_import_time():
+    from benchmarks.startup_benchmark import measure, STARTUP_THRESHOLD_SECONDS
+    startup = measure("src.__main__")
+    assert startup["heavy_modules_loaded"] == []
+    assert startup["seconds"] < STARTUP_THRESHOLD_SECONDS
+
+def test_parse_arguments_stays_light():
+    from benchmarks.startup_benchmark import measure_flags, FLAG_CASES
+    for flags in FLAG_CASES:
+        assert measure_flags(flags)["heavy_modules_loaded"] == [], flags
+
+@patch('os.getenv', MagicMock(return_value=username))
+@patch('src.utils.segments.SegmentedComparison')
+@patch('src.utils.snowflake_connector.SnowflakeConnector')
+@patch('argparse.ArgumentParser.parse_args')
+def test_main_segment_by(mock_parse_args, mock_snowflake_connector, mock_segments):
+    mock_parse_args.return_value = Namespace(
+        table='test_table', filter='test_filter', custom_schema=None, segment_by='region', drill_down=2
+    )
+    main()
+    args = mock_segments.call_args
+    assert args.args[3:] == ('region', 'test_filter')
+    assert args.kwargs == {'drill_down': 2}
+    mock_segments.return_value.compare.assert_called_once()
+
+@patch('os.getenv', MagicMock(return_value=username))
+@patch('src.utils.ledger.IncrementalProfiler')
+@patch('src.utils.snowflake_connector.SnowflakeConnector')
+@patch('argparse.ArgumentParser.parse_args')
+def test_main_incremental(mock_parse_args, mock_snowflake_connector, mock_profiler):
+    mock_parse_args.return_value = Namespace(
+        table='test_table', filter='test_filter', custom_schema=None, incremental='day', refresh=True
+    )
+    main()
+    assert mock_profiler.call_args.args[3:] == ('day', 'test_filter')
+    assert mock_profiler.call_args.kwargs == {'refresh': True}
+    mock_profiler.return_value.compare.assert_called_once()
+
+@patch('os.getenv', MagicMock(return_value=username))
+@patch('src.utils.snowflake_connector.SnowflakeConnector')
+@patch('argparse.ArgumentParser.parse_args')
+def test_main_projects_columns(mock_parse_args, mock_snowflake_connector):
+    import pandas as pd
+    mock_parse_args.return_value = Namespace(
+        table='test_table', filter='test_filter', custom_schema=None, exclude_columns='b'
+    )
+    schema = pd.DataFrame(
+        [('A', 'NUMBER', 38, 0), ('B', 'TEXT', None, None), ('C', 'VARIANT', None, None)]
+    )
+    data = pd.DataFrame({'A': [1, 2]})
+    instance = mock_snowflake_connector.return_value
+    instance.query_concurrently.side_effect = [(schema, schema), (data, data)]
+    main()
+    query_prod, query_dev = instance.query_concurrently.call_args_list[1].args
+    assert 'select "A"' in query_prod and 'select "A"' in query_dev
+
+@patch('os.getenv', MagicMock(return_value=username))
+@patch('src.utils.spill.OutOfCoreKeyDiff')
+@patch('src.utils.snowflake_connector.SnowflakeConnector')
+@patch('argparse.ArgumentParser.parse_args')
+def test_main_memory_budget_key(mock_parse_args, mock_snowflake_connector, mock_diff):
+    mock_parse_args.return_value = Namespace(
+        table='test_table', filter='test_filter', custom_schema=None, key='id', memory_budget='1GB'
+    )
+    main()
+    assert mock_diff.call_args.args[3:] == (['id'], 'test_filter', 2**30)
+    mock_diff.return_value.compare.assert_called_once()
+
+@patch('os.getenv', MagicMock(return_value=username))
+@patch('src.utils.snowflake_connector.SnowflakeConnector')
+@patch('argparse.ArgumentParser.parse_args')
+def test_main_budget_plans_pushdown(mock_parse_args, mock_snowflake_connector, capsys):
+    import pandas as pd
+    mock_parse_args.return_value = Namespace(
+        table='test_table', filter='test_filter', custom_schema=None, budget='1MB', no_preflight=True
+    )
+    instance = mock_snowflake_connector.return_value
+    tables = pd.DataFrame([(10**6, 2**30)])
+    instance.query_concurrently.return_value = (tables, tables)
+    instance.query.side_effect = RuntimeError("no EXPLAIN")
+    with patch('src.utils.pushdown.PushdownProfiler') as mock_profiler:
+        main()
+    mock_profiler.return_value.compare.assert_called_once()
+    assert 'Chosen: pushdown' in capsys.readouterr().out
+
+@patch('os.getenv', MagicMock(return_value=username))
+@patch('src.utils.environments.EnvironmentComparison')
+@patch('src.utils.snowflake_connector.SnowflakeConnector')
+@patch('argparse.ArgumentParser.parse_args')
+def test_main_envs(mock_parse_args, mock_snowflake_connector, mock_comparison):
+    credentials = {'account': 'a', 'password': 'p', 'user': 'u', 'warehouse': 'w'}
+    profiles = {'default': {'outputs': {
+        'dev': {**credentials, 'schema': 'DBT_DEV'},
+        'uat': {**credentials, 'database': 'UAT_EDW', 'schema': 'DBT_UAT'},
+        'prod': {**credentials, 'schema': 'DBT'},
+    }}}
+    mock_parse_args.return_value = Namespace(
+        table='orders', filter='test_filter', custom_schema=None, envs='prod, uat,dev', pairwise=True
+    )
+    with patch('src.__main__.read_profiles', return_value=profiles):
+        main()
+    assert mock_comparison.call_args.args[1] == {
+        'prod': 'PRD_EDW_DBT.DBT.orders',
+        'uat': 'UAT_EDW.DBT_UAT.orders',
+        'dev': 'SANDBOX_EDW.DBT_DEV.orders',
+    }
+    assert mock_comparison.call_args.kwargs == {'baseline': None, 'pairwise': True}
+    mock_comparison.return_value.compare.assert_called_once()
+
+@patch('os.getenv', MagicMock(return_value=username))
+@patch('src.utils.partitions.PartitionedProfiler')
+@patch('src.utils.snowflake_connector.SnowflakeConnector')
+@patch('argparse.ArgumentParser.parse_args')
+def test_main_partitions(mock_parse_args, mock_snowflake_connector, mock_profiler):
+    mock_parse_args.return_value = Namespace(
+        table='test_table', filter='test_filter', custom_schema=None, partitions=8, no_preflight=True
+    )
+    main()
+    assert mock_profiler.call_args.args[-1] == 8
+    assert mock_profiler.call_args.kwargs == {'preflight': None, 'hash_columns': None}
+    mock_profiler.return_value.compare.assert_called_once()
@@ -0,0 +1,76 @@
+import json
+import sqlite3
+import pandas as pd
+import pytest
+from src.utils import batch
+from src.utils import snowflake_connector as sc
+
+manifest = {
+    "nodes": {
+        "model.shop.orders": {
+            "resource_type": "model", "name": "orders", "alias": "orders",
+            "config": {"materialized": "table", "schema": None, "enabled": True},
+        },
+        "model.shop.sales": {
+            "resource_type": "model", "name": "sales", "alias": "sales",
+            "config": {"materialized": "view", "schema": "fpa_reporting", "enabled": True},
+        },
+        "model.shop.stg_tmp": {
+            "resource_type": "model", "name": "stg_tmp",
+            "config": {"materialized": "ephemeral"},
+        },
+        "test.shop.not_null": {"resource_type": "test", "name": "not_null", "config": {}},
+    }
+}
+run_results = {
+    "results": [
+        {"unique_id": "model.shop.orders", "status": "success"},
+        {"unique_id": "model.shop.sales", "status": "error"},
+        {"unique_id": "test.shop.not_null", "status": "pass"},
+    ]
+}
+
+
+def test_models_from_manifest(tmp_path):
+    path = tmp_path / "manifest.json"
+    path.write_text(json.dumps(manifest))
+    assert batch.models_from_manifest(str(path)) == [
+        ("orders", None), ("sales", "fpa_reporting")
+    ]
+
+
+def test_models_from_run_results(tmp_path):
+    (tmp_path / "manifest.json").write_text(json.dumps(manifest))
+    path = tmp_path / "run_results.json"
+    path.write_text(json.dumps(run_results))
+    assert batch.models_from_run_results(str(path)) == [("orders", None)]
+
+
+@pytest.fixture
+def connector():
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    for i in range(6):
+        df = pd.DataFrame({"A": range(100), "B": ["x", "y"] * 50})
+        df.to_sql(f"prod_{i}", conn, index=False)
+        df.iloc[: 100 - i].to_sql(f"dev_{i}", conn, index=False)
+    yield sc.SnowflakeConnector.from_connection(conn)
+    conn.close()
+
+
+def test_batch_comparison(connector):
+    models = [(f"model_{i}", f"prod_{i}", f"dev_{i}") for i in range(6)]
+    models.append(("missing", "prod_missing", "dev_missing"))
+    comparison = batch.BatchComparison(connector, models, workers=3)
+
+    rows = {row["model"]: row for row in comparison.run()}
+    assert len(rows) == 7
+    assert rows["model_0"]["status"] == "ok"
+    assert rows["model_0"]["max_abs_mean_pct_diff"] == 0
+    assert rows["model_5"]["rows_df2"] == 95
+    assert rows["missing"]["status"].startswith("error")
+    assert batch.format_row(rows["model_5"]).startswith("model_5")
+    connector.close_connection()
+
+
+if __name__ == "__main__":
+    pytest.main()
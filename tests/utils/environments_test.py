@@ -0,0 +1,85 @@
+import sqlite3
+import numpy as np
+import pandas as pd
+import pytest
+from src.utils import environments as en
+from src.utils import expected_profile as ep
+from src.utils import snowflake_connector as sc
+
+
+rng = np.random.default_rng(5)
+
+
+def orders(rows, mean):
+    return pd.DataFrame({
+        'AMOUNT': rng.normal(mean, 2, rows),
+        'STATUS': rng.choice(['open', 'closed', 'void'], rows),
+    })
+
+
+frames = {'prod': orders(1000, 10), 'uat': orders(900, 11), 'dev': orders(800, 12)}
+
+
+@pytest.fixture
+def connection():
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    for env, df in frames.items():
+        df.to_sql(f"{env}_orders", conn, index=False)
+    yield conn
+    conn.close()
+
+
+def comparison(conn, **kwargs):
+    statements = []
+    conn.set_trace_callback(statements.append)
+    connector = sc.SnowflakeConnector.from_connection(conn)
+    env_comparison = en.EnvironmentComparison(
+        connector, {env: f"{env}_orders" for env in frames}, **kwargs
+    )
+    env_comparison.compare()
+    connector.close_connection()
+    return env_comparison, [s for s in statements if s.lstrip().startswith('select')]
+
+
+def test_baseline_against_others(connection):
+    result, statements = comparison(connection)
+    # every environment is queried once
+    assert sorted(statements) == sorted(f"select * from {env}_orders where 1 = 1" for env in frames)
+    assert list(result.comparisons) == [('prod', 'uat'), ('prod', 'dev')]
+    assert result.summary['model'].tolist() == ['prod vs uat', 'prod vs dev']
+    assert result.summary['rows_df2'].tolist() == [900, 800]
+
+    local = ep.ExpectedProfiler(frames['prod'], frames['dev'])
+    local.compare()
+    profiler = result.comparisons[('prod', 'dev')]
+    assert profiler.percent_differences.loc['mean', 'AMOUNT'] == pytest.approx(
+        local.percent_differences.loc['mean', 'AMOUNT']
+    )
+    assert profiler.avg_frequency_ratio['STATUS'] == pytest.approx(local.avg_frequency_ratio['STATUS'])
+
+
+def test_pairwise(connection):
+    result, statements = comparison(connection, baseline='uat', pairwise=True)
+    assert len(statements) == 3
+    assert list(result.comparisons) == [('prod', 'uat'), ('prod', 'dev'), ('uat', 'dev')]
+
+
+def test_invalid_baseline(connection):
+    connector = sc.SnowflakeConnector.from_connection(connection)
+    with pytest.raises(ValueError):
+        en.EnvironmentComparison(connector, {'prod': 'prod_orders', 'dev': 'dev_orders'}, baseline='uat')
+    with pytest.raises(ValueError):
+        en.EnvironmentComparison(connector, {'prod': 'prod_orders'})
+
+
+def test_target_relation():
+    uat = {'database': 'UAT_EDW', 'schema': 'DBT_UAT'}
+    assert en.target_relation('uat', uat, 'orders') == 'UAT_EDW.DBT_UAT.orders'
+    assert en.target_relation('uat', uat, 'orders', 'finance') == 'UAT_EDW.DBT_UAT_finance.orders'
+    assert en.target_relation('prod', {'schema': 'DBT'}, 'orders', database='PRD') == 'PRD.DBT.orders'
+    with pytest.raises(KeyError):
+        en.target_relation('qa', {'schema': 'DBT_QA'}, 'orders')
+
+
+if __name__ == "__main__":
+    pytest.main()
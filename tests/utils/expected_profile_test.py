@@ -63,8 +63,65 @@ class TestExpectedProfiler:
         # test avg_frequency_ratio
         assert profiler.avg_frequency_ratio == {'B': 0.8333333333333334}
 
-        # test frequency_differences
-        assert (profiler.frequency_differences['B']['absolute_difference'] == pd.Series([1, 0, 0], index=['a', 'c', 'd'])).all()
+        # test frequency_differences (outer: 'b' only exists in df_1)
+        assert (profiler.frequency_differences['B']['absolute_difference'] == pd.Series([1, 1, 0, 0], index=['a', 'b', 'c', 'd'])).all()
+        assert profiler.frequency_differences['B'].loc['b', 'count_df2'] == 0
+
+    def test_compare_arrow_backed(self):
+        arrow_1 = df_1.astype({'A': 'int64[pyarrow]', 'B': 'string[pyarrow]'})
+        arrow_2 = df_2.astype({'A': 'int64[pyarrow]', 'B': 'string[pyarrow]'})
+        profiler = ep.ExpectedProfiler(arrow_1, arrow_2)
+        profiler.compare()
+
+        assert profiler.df_1['B'].dtype == 'string[pyarrow]'
+        assert np.allclose(profiler.percent_differences, ((df_1.describe() - df_2.describe()) / df_1.describe()) * 100)
+        assert profiler.avg_frequency_ratio == {'B': 0.8333333333333334}
+
+    def test_categorical_comparison_matches_value_counts(self):
+        rng = np.random.default_rng(0)
+        left = pd.DataFrame({
+            'X': rng.choice(['p', 'q', 'r', None], 500),
+            'Y': rng.integers(0, 50, 500).astype(str),
+        })
+        right = pd.DataFrame({
+            'X': rng.choice(['p', 'q', 's'], 400),
+            'Y': rng.integers(25, 75, 400).astype(str),
+        })
+        ratios, tables, sketched = ep.categorical_comparison(left, right, ['X', 'Y'])
+
+        for col in ['X', 'Y']:
+            expected_ratio, expected = ep.frequency_comparison(
+                left[col].value_counts(), right[col].value_counts()
+            )
+            assert ratios[col] == pytest.approx(expected_ratio)
+            pd.testing.assert_frame_equal(
+                tables[col].sort_index(), expected.sort_index(),
+                check_dtype=False, check_names=False, check_index_type=False,
+            )
+        assert tables['X'].loc['r', 'count_df2'] == 0
+        assert tables['X'].loc['s', 'count_df1'] == 0
+        assert None not in tables['X'].index
+        assert sketched == {}
+
+    def test_compare_with_timestamps(self):
+        profiler = ep.ExpectedProfiler(df_3.copy(), df_3.copy())
+        profiler.compare()
+        assert list(profiler.df_1_describe.columns) == ['A', 'B']
+        assert set(profiler.avg_frequency_ratio) == {'D'}
+        assert (profiler.percent_differences == 0).all().all()
+
+    def test_compare_numeric_text(self):
+        # 'A' only becomes numeric on df_1 once converted
+        profiler = ep.ExpectedProfiler(df_1.astype({'A': str}).astype({'A': object}), df_2.copy())
+        profiler.compare()
+        assert list(profiler.percent_differences.columns) == ['A']
+        assert profiler.avg_frequency_ratio == {'B': 0.8333333333333334}
+
+    def test_compare_without_numeric_columns(self):
+        profiler = ep.ExpectedProfiler(df_1[['B']].copy(), df_2[['B']].copy())
+        profiler.compare()
+        assert profiler.percent_differences is None
+        assert profiler.avg_frequency_ratio == {'B': 0.8333333333333334}
 
     def test_drop_time_cols(self, profiler):
         all_columns = df_3.columns
@@ -0,0 +1,84 @@
+import json
+import sqlite3
+import pandas as pd
+import pytest
+from src.utils import expected_profile as ep
+from src.utils import instrumentation
+from src.utils import snowflake_connector as sc
+
+
+class TestTracer:
+    def test_phase_and_hooks(self):
+        tracer = instrumentation.Tracer()
+        seen = []
+        tracer.add_hook(seen.append)
+        with tracer.phase("fetch", "prod") as record:
+            record.update(rows=10, bytes=80, query_id="qid-1")
+
+        assert seen == tracer.records
+        record = tracer.records[0]
+        assert record["phase"] == "fetch" and record["side"] == "prod"
+        assert record["rows"] == 10 and record["seconds"] >= 0
+        assert tracer.query_ids() == ["qid-1"]
+
+    def test_rss_growth_per_phase(self, monkeypatch):
+        # process peak read before and after each phase
+        peaks = iter([100.0, 180.0, 180.0, 180.0])
+        monkeypatch.setattr(instrumentation, "peak_rss_mb", lambda: next(peaks))
+        tracer = instrumentation.Tracer()
+        with tracer.phase("fetch"):
+            pass
+        with tracer.phase("describe"):
+            pass
+        fetch, describe = tracer.records
+        assert (fetch["peak_rss_mb"], fetch["rss_growth_mb"]) == (180.0, 80.0)
+        # the process peak carries over, the growth does not
+        assert (describe["peak_rss_mb"], describe["rss_growth_mb"]) == (180.0, 0.0)
+
+    def test_phase_recorded_on_error(self):
+        tracer = instrumentation.Tracer()
+        with pytest.raises(ValueError):
+            with tracer.phase("execute"):
+                raise ValueError("boom")
+        assert tracer.records[0]["phase"] == "execute"
+
+    def test_query_history_and_output(self, tmp_path):
+        tracer = instrumentation.Tracer()
+        with tracer.phase("execute", "dev") as record:
+            record["query_id"] = "qid-2"
+        tracer.add_query_history(
+            pd.DataFrame({"QUERY_ID": ["qid-2"], "BYTES_SCANNED": [1024]})
+        )
+        assert tracer.records[0]["bytes_scanned"] == 1024
+        assert "execute" in tracer.format_table()
+
+        path = tmp_path / "trace.json"
+        tracer.to_json(str(path))
+        assert json.loads(path.read_text())["records"][0]["query_id"] == "qid-2"
+
+
+def test_connector_and_profiler_phases():
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    df = pd.DataFrame({"A": [1, 2, 3], "B": ["x", "y", "x"]})
+    df.to_sql("prod_table", conn, index=False)
+    df.to_sql("dev_table", conn, index=False)
+    tracer = instrumentation.Tracer()
+    connector = sc.SnowflakeConnector.from_connection(conn, tracer=tracer)
+
+    df_1, df_2 = connector.query_concurrently(
+        "select * from prod_table", "select * from dev_table",
+        relations=["prod_table", "dev_table"],
+    )
+    ep.ExpectedProfiler(df_1, df_2, tracer=tracer).compare()
+    connector.close_connection()
+
+    phases = {(record["phase"], record["side"]) for record in tracer.records}
+    for side in ["prod_table", "dev_table"]:
+        assert {("execute", side), ("fetch", side), ("convert", side)} <= phases
+    assert {"convert", "describe", "categorical"} <= {record["phase"] for record in tracer.records}
+    fetches = [record for record in tracer.records if record["phase"] == "fetch"]
+    assert all(record["rows"] == 3 for record in fetches)
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,167 @@
+import hashlib
+import sqlite3
+import pandas as pd
+import pytest
+from src.utils import key_diff as kd
+from src.utils import snowflake_connector as sc
+from src.utils import type_conversion as tc
+
+
+def row_hash(*values):
+    """Deterministic stand-in for Snowflake HASH, kept away from segment boundaries."""
+    digest = hashlib.sha256(repr(values).encode()).hexdigest()
+    return int(digest[:12], 16) % 10**9 + 10**12
+
+
+class HashAgg:
+    """Order independent stand-in for Snowflake HASH_AGG in sqlite."""
+    def __init__(self):
+        self.total = 0
+
+    def step(self, *values):
+        self.total = (self.total + row_hash(*values)) % 2**62
+
+    def finalize(self):
+        return self.total
+
+
+rows = 5000
+df_prod = pd.DataFrame({
+    'ID': range(rows),
+    'CODE': [f"code_{i}" for i in range(rows)],
+    'AMOUNT': [float(i % 97) for i in range(rows)],
+    'STATUS': ['open' if i % 3 else 'closed' for i in range(rows)],
+})
+df_dev = df_prod.copy()
+df_dev.loc[df_dev['ID'] == 1234, 'AMOUNT'] = -1.0
+df_dev.loc[df_dev['ID'] == 4000, ['AMOUNT', 'STATUS']] = [-2.0, 'void']
+df_dev = df_dev[df_dev['ID'] != 42]
+df_dev = pd.concat([df_dev, pd.DataFrame({
+    'ID': [rows + 10], 'CODE': ['code_new'], 'AMOUNT': [1.0], 'STATUS': ['open']
+})])
+
+
+@pytest.fixture
+def connector():
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    conn.create_function("hash", -1, row_hash)
+    conn.create_aggregate("hash_agg", -1, HashAgg)
+    df_prod.to_sql("prod_table", conn, index=False)
+    df_dev.to_sql("dev_table", conn, index=False)
+    yield sc.SnowflakeConnector.from_connection(conn)
+    conn.close()
+
+
+class TestKeyDiff:
+    def check_differences(self, diff):
+        assert diff.deleted.iloc[:, 0].tolist() in ([42], ['code_42'])
+        assert diff.inserted.iloc[:, 0].tolist() in ([rows + 10], ['code_new'])
+        updated = dict(zip(diff.updated.iloc[:, 0], diff.updated['changed_columns']))
+        assert len(updated) == 2
+        assert sorted(map(sorted, updated.values())) == [['AMOUNT'], ['AMOUNT', 'STATUS']]
+
+    def test_integer_key(self, connector):
+        diff = kd.KeyDiff(connector, "prod_table", "dev_table", "ID", max_segment_rows=50)
+        diff.compare()
+        self.check_differences(diff)
+        assert diff.updated.set_index('ID').loc[4000, 'changed_columns'] == ['AMOUNT', 'STATUS']
+        # only the segments around the 4 differences are fetched
+        assert diff.rows_fetched < 8 * 50
+        assert diff.queries > 1
+
+    def test_hashed_key(self, connector):
+        diff = kd.KeyDiff(connector, "prod_table", "dev_table", "code", max_segment_rows=50)
+        diff.compare()
+        self.check_differences(diff)
+        assert diff.rows_fetched < rows
+
+    def test_fractional_key(self):
+        # whole-number bounds around fractional keys
+        prod = df_prod.head(500).assign(ID=lambda df: df['ID'].astype(float))
+        prod.loc[prod['ID'] == 123, 'ID'] = 123.5
+        dev = prod.copy()
+        dev.loc[dev['ID'] == 123.5, 'AMOUNT'] = -1.0
+        conn = sqlite3.connect(":memory:", check_same_thread=False)
+        conn.create_function("hash", -1, row_hash)
+        conn.create_aggregate("hash_agg", -1, HashAgg)
+        prod.to_sql("prod_table", conn, index=False)
+        dev.to_sql("dev_table", conn, index=False)
+        diff = kd.KeyDiff(
+            sc.SnowflakeConnector.from_connection(conn), "prod_table", "dev_table", "ID",
+            max_segment_rows=1,
+        )
+        diff.compare()
+        conn.close()
+        assert diff.inserted.empty and diff.deleted.empty
+        assert diff.updated['ID'].tolist() == [123.5]
+        assert diff.updated['changed_columns'].tolist() == [['AMOUNT']]
+
+    def test_filter_and_no_differences(self, connector):
+        diff = kd.KeyDiff(connector, "prod_table", "dev_table", "ID", filter_condition="ID < 40")
+        diff.compare()
+        assert diff.inserted.empty and diff.deleted.empty and diff.updated.empty
+        assert diff.rows_fetched == 0
+
+    def test_missing_key(self, connector):
+        diff = kd.KeyDiff(connector, "prod_table", "dev_table", "NOT_A_COLUMN")
+        with pytest.raises(KeyError):
+            diff.compare()
+
+
+def test_segment_case():
+    case = kd.segment_case('"ID"', 0, 9, 4)
+    assert case == 'case when "ID" < 4 then 0 when "ID" < 8 then 1 else 2 end'
+    assert kd.segment_case('"ID"', 5, 5, 1) == "0"
+
+
+def test_full_range_hashes():
+    # signed 64-bit hashes on both sides of every first-level segment boundary
+    low, high = kd.HASH_RANGE
+    width = -(-(high - low + 1) // 16)
+    hashes = [low, high] + [
+        low + segment * width + step for segment in range(1, 16) for step in (-1, 0)
+    ]
+    codes = [f"code_{i}" for i in range(len(hashes))]
+    full_hash = dict(zip(codes, hashes)).get
+    prod = pd.DataFrame({'CODE': codes, 'AMOUNT': [float(i) for i in range(len(codes))]})
+    dev = prod.copy()
+    # the last value below a boundary, the first one above it and both ends
+    changed = [codes[0], codes[1], codes[2], codes[5]]
+    dev.loc[dev['CODE'].isin(changed), 'AMOUNT'] = -1.0
+
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    conn.create_function("hash", 1, full_hash)
+    conn.create_aggregate("hash_agg", -1, HashAgg)
+    prod.to_sql("prod_table", conn, index=False)
+    dev.to_sql("dev_table", conn, index=False)
+    diff = kd.KeyDiff(
+        sc.SnowflakeConnector.from_connection(conn), "prod_table", "dev_table", ["CODE"],
+        max_segment_rows=1,
+    )
+    diff.compare()
+    conn.close()
+    assert diff.inserted.empty and diff.deleted.empty
+    assert sorted(diff.updated['CODE']) == sorted(changed)
+    assert diff.rows_fetched == 2 * len(changed)
+
+
+def test_diff_by_key_converted_frames():
+    # (name, type_code, display_size, internal_size, precision, scale, null_ok): FIXED, TEXT
+    description = [('ID', 0, None, None, None, 0, True), ('STATUS', 2, None, None, None, None, True)]
+    rows_1 = tc.convert_dataframe(
+        pd.DataFrame({'ID': range(6), 'STATUS': ['open', 'closed'] * 3}), description
+    )
+    rows_2 = tc.convert_dataframe(
+        pd.DataFrame({'ID': range(6), 'STATUS': ['open', 'closed', 'void'] * 2}), description
+    )
+    # low-cardinality text is converted to categoricals with different categories
+    assert isinstance(rows_1['STATUS'].dtype, pd.CategoricalDtype)
+    assert list(rows_1['STATUS'].cat.categories) != list(rows_2['STATUS'].cat.categories)
+    deleted, inserted, updated = kd.diff_by_key(rows_1, rows_2, ['ID'], ['ID', 'STATUS'])
+    assert deleted.empty and inserted.empty
+    assert updated['ID'].tolist() == [2, 3, 4, 5]
+    assert updated['changed_columns'].tolist() == [['STATUS']] * 4
+
+
+if __name__ == "__main__":
+    pytest.main()
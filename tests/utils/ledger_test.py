@@ -0,0 +1,130 @@
+import hashlib
+import sqlite3
+import numpy as np
+import pandas as pd
+import pytest
+from src.utils import ledger as lg
+from src.utils import streaming_profile as sp
+from src.utils import snowflake_connector as sc
+
+
+class HashAgg:
+    """Order independent stand-in for Snowflake HASH_AGG in sqlite."""
+    def __init__(self):
+        self.total = 0
+
+    def step(self, *values):
+        digest = hashlib.sha256(repr(values).encode()).hexdigest()
+        self.total = (self.total + int(digest[:12], 16)) % 2**62
+
+    def finalize(self):
+        return self.total
+
+
+rng = np.random.default_rng(5)
+rows = 2000
+df_prod = pd.DataFrame({
+    'DAY': [f"2024-01-{i % 10 + 1:02d}" for i in range(rows)],
+    'AMOUNT': rng.normal(100, 10, rows).round(2),
+    'STATUS': rng.choice(['open', 'closed'], rows),
+})
+df_prod.loc[:9, 'DAY'] = None
+df_dev = df_prod.copy()
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    conn.create_aggregate("hash_agg", -1, HashAgg)
+    df_prod.to_sql("prod_table", conn, index=False)
+    df_dev.to_sql("dev_table", conn, index=False)
+    yield conn
+    conn.close()
+
+
+def run(conn, ledger, **kwargs):
+    profiler = lg.IncrementalProfiler(
+        sc.SnowflakeConnector.from_connection(conn), "prod_table", "dev_table", "day",
+        ledger=ledger, **kwargs,
+    )
+    profiler.compare()
+    return profiler
+
+
+def full(conn):
+    profiler = sp.StreamingProfiler(
+        [pd.read_sql("select * from prod_table", conn)],
+        [pd.read_sql("select * from dev_table", conn)],
+    )
+    profiler.compare()
+    return profiler
+
+
+def test_only_changed_partitions_are_recomputed(conn, tmp_path):
+    ledger = lg.ChecksumLedger(str(tmp_path / "ledger.sqlite"))
+    first = run(conn, ledger)
+    assert first.partitions == {'prod_table': 11, 'dev_table': 11}
+    assert first.recomputed == {'prod_table': 11, 'dev_table': 11}
+    assert (first.percent_differences.fillna(0) == 0).all().all()
+
+    second = run(conn, ledger)
+    assert second.recomputed == {'prod_table': 0, 'dev_table': 0}
+    pd.testing.assert_frame_equal(second.df_2_describe, first.df_2_describe)
+
+    conn.execute("update dev_table set AMOUNT = AMOUNT * 2 where DAY = '2024-01-03'")
+    conn.execute("delete from dev_table where DAY is null")
+    third = run(conn, ledger)
+    assert third.recomputed == {'prod_table': 0, 'dev_table': 1}
+    assert third.partitions['dev_table'] == 10
+
+    expected = full(conn)
+    assert third.shapes.loc['rows', 'df_2'] == expected.shapes.loc['rows', 'df_2']
+    rows = ['count', 'mean', 'std', 'min', 'max']
+    assert np.allclose(third.df_2_describe.loc[rows], expected.df_2_describe.loc[rows])
+    assert third.avg_frequency_ratio['STATUS'] == pytest.approx(
+        expected.avg_frequency_ratio['STATUS']
+    )
+
+
+def test_refresh_recomputes_everything(conn, tmp_path):
+    ledger = lg.ChecksumLedger(str(tmp_path / "ledger.sqlite"))
+    run(conn, ledger)
+    assert run(conn, ledger, refresh=True).recomputed['prod_table'] == 11
+
+
+def test_refresh_removes_missing_partitions(conn, tmp_path):
+    ledger = lg.ChecksumLedger(str(tmp_path / "ledger.sqlite"))
+    first = run(conn, ledger)
+    conn.execute("delete from dev_table where DAY = '2024-01-05'")
+    refreshed = run(conn, ledger, refresh=True)
+    assert refreshed.partitions['dev_table'] == 10
+    scope = ledger.scope("dev_table", "DAY", "1 = 1", [
+        first.table_2.columns,
+        sorted(first.table_2.numeric),
+        sorted(first.table_2.categorical),
+        sorted(first.table_2.unresolved),
+    ])
+    assert '2024-01-05' not in ledger.load(scope)
+    assert len(ledger.load(scope)) == 10
+    # the next run merges only the partitions that still exist
+    assert run(conn, ledger).shapes.loc['rows', 'df_2'] == full(conn).shapes.loc['rows', 'df_2']
+
+
+def test_filter_starts_a_new_scope(conn, tmp_path):
+    ledger = lg.ChecksumLedger(str(tmp_path / "ledger.sqlite"))
+    run(conn, ledger)
+    filtered = run(conn, ledger, filter_condition="STATUS = 'open'")
+    assert filtered.recomputed['prod_table'] == 11
+
+
+def test_ledger_store(tmp_path):
+    ledger = lg.ChecksumLedger(str(tmp_path / "nested" / "ledger.sqlite"))
+    scope = ledger.scope("db.s.t", "DAY", "1 = 1", [['A'], ['A'], []])
+    accumulator = sp.TableAccumulator()
+    accumulator.update(pd.DataFrame({'A': [1.0, 2.0]}))
+    ledger.save(scope, {'2024-01-01': (2, '42', accumulator)})
+    entries = ledger.load(scope)
+    assert entries['2024-01-01'][:2] == (2, '42')
+    assert entries['2024-01-01'][2].numeric['A'].mean == 1.5
+    ledger.remove(scope, ['2024-01-01'])
+    assert ledger.load(scope) == {}
@@ -0,0 +1,84 @@
+from decimal import Decimal
+import numpy as np
+import pandas as pd
+import pytest
+from src.utils import expected_profile as ep
+from src.utils import parallel
+
+
+rng = np.random.default_rng(11)
+rows = 2000
+df_1 = pd.DataFrame({
+    'A': rng.normal(10, 2, rows),
+    'B': rng.choice(['a', 'b', 'c', None], rows),
+    'C': rng.integers(0, 100, rows),
+    'D': pd.date_range('2023-01-01', periods=rows, freq='h'),
+    'E': rng.choice(['x', 'y'], rows).astype(object),
+    'F': rng.integers(0, 5, rows).astype(str).astype(object),
+})
+df_2 = df_1.sample(frac=0.9, random_state=1).reset_index(drop=True)
+df_2['A'] = df_2['A'] * 1.1
+
+
+def test_shard_columns():
+    assert parallel.shard_columns(['a', 'b', 'c', 'd', 'e'], 2) == [['a', 'c', 'e'], ['b', 'd']]
+    assert parallel.shard_columns(['a'], 4) == [['a']]
+
+
+def test_shared_frame_round_trip():
+    block = parallel.share_frame(df_1)
+    try:
+        df = parallel._read_columns(block.name, ['A', 'B'])
+        pd.testing.assert_frame_equal(df, df_1[['A', 'B']])
+    finally:
+        block.close()
+        block.unlink()
+
+
+def test_read_columns_releases_block():
+    # dictionary and boolean columns can be read back pointing into the block
+    typed = df_1.astype({'B': 'category', 'E': 'category'}).assign(G=pd.array([True, None] * (rows // 2), dtype='boolean'))
+    block = parallel.share_frame(typed)
+    try:
+        # close() inside _read_columns raises BufferError if a column still maps the block
+        df = parallel._read_columns(block.name, ['B', 'E', 'G'])
+    finally:
+        block.close()
+        block.unlink()
+    pd.testing.assert_frame_equal(df, typed[['B', 'E', 'G']])
+
+
+def test_parallel_matches_serial():
+    serial = ep.ExpectedProfiler(df_1.copy(), df_2.copy(), confidence=0.95)
+    serial.compare()
+    sharded = ep.ExpectedProfiler(df_1.copy(), df_2.copy(), confidence=0.95, jobs=3)
+    sharded.compare()
+
+    assert sharded.numeric_cols == serial.numeric_cols == ['A', 'C', 'F']
+    assert sharded.categorical_cols == serial.categorical_cols
+    pd.testing.assert_frame_equal(sharded.percent_differences, serial.percent_differences)
+    pd.testing.assert_frame_equal(
+        sharded.distribution_differences, serial.distribution_differences
+    )
+    assert list(sharded.frequency_differences) == list(serial.frequency_differences)
+    assert sharded.avg_frequency_ratio == pytest.approx(serial.avg_frequency_ratio)
+    pd.testing.assert_frame_equal(
+        sharded.confidence_intervals['avg_frequency_ratio'],
+        serial.confidence_intervals['avg_frequency_ratio'],
+    )
+
+
+def test_unshareable_frames_run_serially():
+    mixed_1 = df_1.assign(G=[Decimal(1), 'x'] * (rows // 2))
+    mixed_2 = df_2.assign(G='x')
+    profiler = ep.ExpectedProfiler(mixed_1, mixed_2, jobs=2)
+    profiler.compare()
+    assert 'G' in profiler.avg_frequency_ratio
+    assert 'A' in profiler.percent_differences.columns
+
+
+def test_parallel_without_numeric_columns():
+    profiler = ep.ExpectedProfiler(df_1[['B', 'E']].copy(), df_2[['B', 'E']].copy(), jobs=2)
+    profiler.compare()
+    assert profiler.percent_differences is None
+    assert set(profiler.avg_frequency_ratio) == {'B', 'E'}
@@ -0,0 +1,117 @@
+import sqlite3
+import zlib
+import numpy as np
+import pandas as pd
+import pytest
+from src.utils import expected_profile as ep
+from src.utils import partitions as pt
+from src.utils import result_cache as rc
+from src.utils import snowflake_connector as sc
+
+
+rng = np.random.default_rng(11)
+
+
+def snowflake_hash(*values):
+    """Stand-in for Snowflake's HASH: deterministic, never NULL, signed 64 bit."""
+    digest = zlib.crc32(repr(values).encode("utf-8"))
+    return digest - 2**31
+
+
+def orders(rows, mean):
+    amount = rng.normal(mean, 2, rows)
+    amount[::50] = np.nan
+    return pd.DataFrame({
+        'ORDER_ID': np.arange(rows),
+        'AMOUNT': amount,
+        'STATUS': rng.choice(['open', 'closed', 'void'], rows),
+    })
+
+
+frames = {'prod_orders': orders(1000, 10), 'dev_orders': orders(700, 12)}
+
+
+@pytest.fixture
+def connection():
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    conn.create_function("hash", -1, snowflake_hash, deterministic=True)
+    for name, df in frames.items():
+        df.to_sql(name, conn, index=False)
+    yield conn
+    conn.close()
+
+
+def profiled(conn, partitions, **kwargs):
+    statements = []
+    conn.set_trace_callback(statements.append)
+    connector = sc.SnowflakeConnector.from_connection(conn)
+    profiler = pt.PartitionedProfiler(
+        connector, 'prod_orders', 'dev_orders', 'ORDER_ID >= 0', partitions, **kwargs
+    )
+    profiler.compare()
+    connector.close_connection()
+    return profiler, [s for s in statements if s.lstrip().startswith('select')]
+
+
+def test_partition_predicate():
+    assert pt.partition_predicate(2, 8) == "mod(abs(hash(*)), 8) = 2"
+    assert pt.partition_predicate(0, 4, ['"ID"', '"DAY"']) == 'mod(abs(hash("ID", "DAY")), 4) = 0'
+
+
+def test_partitions_are_disjoint(connection):
+    columns = ['ORDER_ID', 'AMOUNT', 'STATUS']
+    ids = []
+    for partition in range(4):
+        predicate = pt.partition_predicate(partition, 4, columns)
+        ids += [row[0] for row in connection.execute(f"select ORDER_ID from prod_orders where {predicate}")]
+    assert sorted(ids) == list(range(1000))
+
+
+def test_matches_full_fetch(connection):
+    profiler, statements = profiled(connection, 4, hash_columns=['ORDER_ID'])
+    # one query per partition and table
+    assert len(statements) == 8
+    assert len(profiler.seconds) == 8
+    assert profiler.shapes.loc['rows', 'df_1'] == 1000
+    assert profiler.shapes.loc['rows', 'df_2'] == 700
+
+    local = ep.ExpectedProfiler(frames['prod_orders'], frames['dev_orders'])
+    local.compare()
+    for stat in ('count', 'mean', 'std', 'min', 'max'):
+        assert profiler.percent_differences.loc[stat, 'AMOUNT'] == pytest.approx(
+            local.percent_differences.loc[stat, 'AMOUNT']
+        )
+    assert profiler.avg_frequency_ratio['STATUS'] == pytest.approx(local.avg_frequency_ratio['STATUS'])
+
+
+def test_empty_partitions(connection):
+    # more partitions than distinct keys leaves some slices empty
+    connection.execute("delete from dev_orders where ORDER_ID >= 3")
+    profiler, _ = profiled(connection, 16, hash_columns=['ORDER_ID'])
+    assert profiler.shapes.loc['rows', 'df_2'] == 3
+    assert set(profiler.table_2.categorical) == {'STATUS'}
+
+
+def test_table_version_looked_up_once(connection, tmp_path):
+    connector = sc.SnowflakeConnector.from_connection(
+        connection, cache=rc.ResultCache(str(tmp_path / 'cache'))
+    )
+    lookups = []
+    connector.table_version = lambda relation: lookups.append(relation) or '2024-01-01'
+    profiler = pt.PartitionedProfiler(
+        connector, 'prod_orders', 'dev_orders', '1 = 1', 4, hash_columns=['ORDER_ID']
+    )
+    profiler.compare()
+    assert lookups == ['prod_orders', 'dev_orders']
+    assert profiler.shapes.loc['rows', 'df_1'] == 1000
+    connector.close_connection()
+
+
+def test_invalid_partitions(connection):
+    connector = sc.SnowflakeConnector.from_connection(connection)
+    with pytest.raises(ValueError):
+        pt.PartitionedProfiler(connector, 'prod_orders', 'dev_orders', '1 = 1', 0)
+
+
+if __name__ == "__main__":
+    pytest.main()
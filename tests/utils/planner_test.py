@@ -0,0 +1,93 @@
+import json
+from unittest.mock import MagicMock
+import pandas as pd
+import pytest
+from src.utils import planner
+
+
+GB = 2**30
+
+
+def tables(row_count, size):
+    return pd.DataFrame([(row_count, size)], columns=['ROW_COUNT', 'BYTES'])
+
+
+def explain(total, assigned, size):
+    stats = {"partitionsTotal": total, "partitionsAssigned": assigned, "bytesAssigned": size}
+    return pd.DataFrame({'content': [json.dumps({"GlobalStats": stats, "Operations": []})]})
+
+
+def plan(size=GB, explained=True, **kwargs):
+    connector = MagicMock()
+    connector.query_concurrently.return_value = (tables(10**9, size), tables(10**9, size))
+    if explained:
+        # the filter prunes to a tenth of the partitions
+        connector.query.return_value = explain(1000, 100, size // 10)
+    else:
+        connector.query.side_effect = RuntimeError("EXPLAIN is not supported")
+    return planner.QueryPlanner(connector, "db.dbt.orders", "db.dbt_dev.orders", "x = 1", **kwargs).plan()
+
+
+def test_explain_estimates():
+    result = plan(byte_budget=4 * GB)
+    assert result.stats['source'].tolist() == ['explain', 'explain']
+    assert result.stats['rows'].tolist() == [10**8, 10**8]
+    assert result.stats['scanned_bytes'].sum() == 2 * (GB // 10)
+    assert result.strategy.name == 'fetch'
+    assert result.estimates['strategy'].tolist() == ['fetch', 'pushdown', 'sample']
+
+
+def test_information_schema_fallback():
+    result = plan(explained=False, byte_budget=4 * GB)
+    assert result.stats['source'].tolist() == ['information_schema'] * 2
+    # the whole tables are over the budget once fetched
+    assert result.strategy.name == 'pushdown'
+
+
+def test_time_budget_chooses_sample():
+    result = plan(size=100 * GB, time_budget=60)
+    assert result.strategy.name == 'sample'
+    percent = result.estimate['sample_percent']
+    assert 0 < percent < 100
+    assert result.estimate['fits']
+
+
+def test_sample_profiler_query():
+    result = plan(size=100 * GB, time_budget=60)
+    connector = MagicMock()
+    df = pd.DataFrame({'A': [1.0, 2.0, 3.0], 'B': ['a', 'b', 'a']})
+    connector.query_concurrently.return_value = (df, df)
+    profiler = result.strategy.profiler(connector, "db.dbt.orders", "db.dbt_dev.orders", "x = 1", result)
+    query = connector.query_concurrently.call_args.args[0]
+    assert f"sample bernoulli ({result.estimate['sample_percent']:g})" in query
+    assert profiler.scale_1 == pytest.approx(100 / result.estimate['sample_percent'])
+
+
+def test_custom_strategy():
+    class Cached(planner.Strategy):
+        name = "cached"
+
+        def estimate(self, scanned_bytes, local_bytes, byte_budget=None, time_budget=None):
+            return {"bytes_fetched": 0, "seconds": 0.0, "fits": True, "detail": "cached"}
+
+    # a strategy without a profiler cannot be planned
+    with pytest.raises(TypeError):
+        Cached()
+
+    class CachedProfile(Cached):
+        def profiler(self, connector, relation_1, relation_2, filter_condition, plan,
+                     preflight=None, jobs=1, tracer=None):
+            return None
+
+    result = plan(byte_budget=1, strategies=[planner.FetchStrategy(), CachedProfile()])
+    assert result.strategy.name == 'cached'
+
+
+def test_format_bytes():
+    assert planner.format_bytes(512) == '512 B'
+    assert planner.format_bytes(1.5 * GB) == '1.5 GB'
+    assert planner.format_bytes(None) == 'unknown'
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,127 @@
+import sqlite3
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+from src.utils import expected_profile as ep
+from src.utils import pushdown as pd_profile
+from src.utils import snowflake_connector as sc
+
+
+df_prod = pd.DataFrame({
+    'A': [5, 6, 7, 8, 9],
+    'B': ['a', 'b', 'c', 'd', 'd'],
+    'C': [1.5, 2.5, 3.5, 4.5, 5.5],
+})
+df_dev = pd.DataFrame({
+    'A': [1, 2, 3, 4, 5],
+    'B': ['a', 'a', 'c', 'd', 'd'],
+    'C': [1.5, 2.0, 3.5, 4.0, 5.5],
+})
+
+
+class StdDev:
+    """Sample standard deviation aggregate for sqlite."""
+    def __init__(self):
+        self.values = []
+
+    def step(self, value):
+        if value is not None:
+            self.values.append(value)
+
+    def finalize(self):
+        return float(np.std(self.values, ddof=1)) if len(self.values) > 1 else None
+
+
+class ApproxPercentile:
+    """Exact stand-in for Snowflake APPROX_PERCENTILE in sqlite."""
+    def __init__(self):
+        self.values = []
+        self.percentile = None
+
+    def step(self, value, percentile):
+        self.percentile = percentile
+        if value is not None:
+            self.values.append(value)
+
+    def finalize(self):
+        return float(np.percentile(self.values, self.percentile * 100)) if self.values else None
+
+
+@pytest.fixture
+def connector():
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    conn.create_aggregate("stddev", 1, StdDev)
+    conn.create_aggregate("approx_percentile", 2, ApproxPercentile)
+    df_prod.to_sql("prod_table", conn, index=False)
+    df_dev.to_sql("dev_table", conn, index=False)
+    yield sc.SnowflakeConnector.from_connection(conn)
+    conn.close()
+
+
+class TestPushdownProfiler:
+    def test_build_summary_query(self):
+        query = pd_profile.build_summary_query("db.schema.tbl", "1 = 1", ['A'], ['B'])
+        assert "approx_percentile(\"A\", 0.25)" in query
+        assert "group by \"B\"" in query
+        assert query.count("union all") == 2
+
+    def test_classify_columns(self, connector):
+        profiler = pd_profile.PushdownProfiler(connector, "prod_table", "dev_table", "1 = 1")
+        frame = df_prod.assign(D=pd.to_datetime(['2023-01-01'] * 5))
+        assert profiler._classify_columns(frame) == (['A', 'C'], ['B'])
+
+    def test_classify_arrow_timestamps(self):
+        # as returned by the default Arrow fetch
+        arrow = pa.table({
+            'A': pa.array([1, 2]),
+            'TS': pa.array(pd.to_datetime(['2023-01-01', '2023-01-02'])),
+            'DAY': pa.array(pd.to_datetime(['2023-01-01', '2023-01-02']).date, pa.date32()),
+            'TS_TZ': pa.array(pd.to_datetime(['2023-01-01', '2023-01-02'], utc=True)),
+            'B': pa.array(['x', 'y']),
+        }).to_pandas(types_mapper=pd.ArrowDtype)
+        assert [str(arrow[col].dtype) for col in ['TS', 'DAY', 'TS_TZ']] == [
+            'timestamp[ns][pyarrow]', 'date32[day][pyarrow]', 'timestamp[ns, tz=UTC][pyarrow]'
+        ]
+        assert pd_profile.classify_columns(arrow) == (['A'], ['B'])
+
+    def test_classify_boolean_columns(self):
+        frame = pd.DataFrame({
+            'A': [1, 2], 'FLAG': [True, False], 'NULLABLE': pd.Series([True, None], dtype=object)
+        })
+        assert pd_profile.classify_columns(frame) == (['A'], ['FLAG', 'NULLABLE'])
+        query = pd_profile.build_summary_query("db.schema.tbl", "1 = 1", ['A'], ['FLAG'])
+        assert 'avg("FLAG")' not in query.lower()
+
+    def test_compare_matches_expected_profiler(self, connector):
+        profiler = pd_profile.PushdownProfiler(connector, "prod_table", "dev_table", "1 = 1")
+        profiler.compare()
+
+        local = ep.ExpectedProfiler(df_prod.copy(), df_dev.copy())
+        local.compare()
+
+        assert (profiler.shapes.values == local.shapes.values).all()
+        assert np.allclose(profiler.percent_differences, local.percent_differences)
+        assert np.allclose(profiler.absolute_differences, local.absolute_differences)
+        assert profiler.avg_frequency_ratio == pytest.approx(local.avg_frequency_ratio)
+        pd.testing.assert_frame_equal(
+            profiler.frequency_differences['B'].sort_index(),
+            local.frequency_differences['B'].sort_index(),
+            check_names=False,
+            check_dtype=False,
+        )
+
+    def test_compare_applies_filter(self, connector):
+        profiler = pd_profile.PushdownProfiler(connector, "prod_table", "dev_table", "A > 4")
+        profiler.compare()
+        assert profiler.shapes.loc["rows", "df_1"] == 5
+        assert profiler.shapes.loc["rows", "df_2"] == 1
+
+    def test_compare_zero_rows(self, connector):
+        profiler = pd_profile.PushdownProfiler(connector, "prod_table", "dev_table", "A > 100")
+        with pytest.raises(AssertionError):
+            profiler.compare()
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,131 @@
+import sqlite3
+import pytest
+from src.utils import query_ledger as ql
+from src.utils import snowflake_connector as sc
+
+
+class FakeCursor:
+    """Cursor double keeping every result by query ID, like Snowflake persisted results."""
+    def __init__(self, connection):
+        self.connection = connection
+        self.sfqid = None
+        self.description = None
+        self.rows = None
+
+    def execute(self, query):
+        self.connection.executed.append(query)
+        self.sfqid = f"qid-{len(self.connection.executed)}"
+        if "information_schema.tables" in query:
+            result = ([('LAST_ALTERED',), ('TABLE_TYPE',)], [(self.connection.version, 'BASE TABLE')])
+        else:
+            result = ([('A',)], [(1,), (2,)])
+        self.description, self.rows = result
+        self.connection.results[self.sfqid] = result
+
+    def get_results_from_sfqid(self, qid):
+        if qid in self.connection.expired or qid not in self.connection.results:
+            raise RuntimeError(f"result of {qid} is no longer available")
+        self.connection.reused.append(qid)
+        self.description, self.rows = self.connection.results[qid]
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.executed = []
+        self.results = {}
+        self.expired = set()
+        self.reused = []
+        self.version = '2024-01-01 00:00:00'
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def close(self):
+        pass
+
+
+QUERY = "select * from db.dbt.orders where 1 = 1"
+
+
+def data_queries(connection):
+    return [query for query in connection.executed if "information_schema" not in query]
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    return ql.QueryLedger(str(tmp_path / 'queries.sqlite'))
+
+
+def test_ledger_entries(ledger):
+    assert ledger.get(QUERY, 'v1') is None
+    ledger.put(QUERY, 'v1', 'qid-1')
+    assert ledger.get("select *\n from db.dbt.orders where 1 = 1;", 'v1') == 'qid-1'
+    assert ledger.get(QUERY, 'v2') is None
+    ledger.remove(QUERY, 'v1')
+    assert ledger.get(QUERY, 'v1') is None
+
+
+def test_ledger_expiry(tmp_path):
+    ledger = ql.QueryLedger(str(tmp_path / 'queries.sqlite'), max_age=0)
+    ledger.put(QUERY, 'v1', 'qid-1')
+    assert ledger.get(QUERY, 'v1') is None
+
+
+def test_reuses_persisted_result(ledger):
+    connection = FakeConnection()
+    connector = sc.SnowflakeConnector.from_connection(connection, query_ledger=ledger)
+    first = connector.query(QUERY, relation='db.dbt.orders')
+    second = connector.query(QUERY, relation='db.dbt.orders')
+    assert first.equals(second)
+    assert len(data_queries(connection)) == 1
+    assert connection.reused == [ledger.get(QUERY, connection.version)]
+
+    # a new table version runs the query again
+    connection.version = '2024-01-02 00:00:00'
+    connector.query(QUERY, relation='db.dbt.orders')
+    assert len(data_queries(connection)) == 2
+
+
+def test_expired_result_falls_back(ledger):
+    connection = FakeConnection()
+    connector = sc.SnowflakeConnector.from_connection(connection, query_ledger=ledger)
+    connector.query(QUERY, relation='db.dbt.orders')
+    expired = ledger.get(QUERY, connection.version)
+    connection.expired.add(expired)
+    assert connector.query(QUERY, relation='db.dbt.orders')['A'].tolist() == [1, 2]
+    assert len(data_queries(connection)) == 2
+    # the ledger now points at the result of the new run
+    assert ledger.get(QUERY, connection.version) not in (None, expired)
+
+
+def test_concurrent_queries_reuse(ledger):
+    connection = FakeConnection()
+    connector = sc.SnowflakeConnector.from_connection(connection, query_ledger=ledger)
+    connector.query(QUERY, relation='db.dbt.orders')
+    df_1, df_2 = connector.query_concurrently(QUERY, QUERY, relations=['db.dbt.orders'] * 2)
+    assert df_1['A'].tolist() == df_2['A'].tolist() == [1, 2]
+    assert len(data_queries(connection)) == 1
+    assert len(connection.reused) == 2
+    connector.close_connection()
+
+
+def test_result_scan_fallback(ledger):
+    """Cursors without get_results_from_sfqid use RESULT_SCAN, and sqlite has neither"""
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    conn.execute("create table orders (a integer)")
+    connector = sc.SnowflakeConnector.from_connection(conn, query_ledger=ledger)
+    ledger.put("select a from orders", 'v1', 'qid-1')
+    df = connector._reused_result("select a from orders", 'v1', 'qid-1')
+    assert df is None
+    assert ledger.get("select a from orders", 'v1') is None
+    connector.close_connection()
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,152 @@
+import sqlite3
+import pandas as pd
+import pytest
+from src.utils import result_cache as rc
+from src.utils import snowflake_connector as sc
+
+df = pd.DataFrame({'a': [1, 2, 3], 'b': ['x', 'y', 'z']})
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return rc.ResultCache(str(tmp_path / "cache"))
+
+
+class TestResultCache:
+    def test_put_and_get(self, cache):
+        assert cache.get("select * from t", "v1") is None
+        cache.put("select * from t", "v1", df)
+        cached = cache.get("select *\n  from t;", "v1")
+        assert cached['a'].tolist() == [1, 2, 3]
+        assert cached['b'].tolist() == ['x', 'y', 'z']
+
+    def test_new_table_version_misses(self, cache):
+        cache.put("select * from t", "v1", df)
+        assert cache.get("select * from t", "v2") is None
+
+    def test_lru_eviction(self, cache):
+        cache.put("q1", "v", df)
+        size = cache._read_index()[cache.key("q1", "v")]["bytes"]
+        cache.max_bytes = 2 * size
+        cache.put("q2", "v", df)
+        cache.get("q1", "v")
+        cache.put("q3", "v", df)
+        assert cache.get("q2", "v") is None
+        assert cache.get("q1", "v") is not None
+        assert cache.get("q3", "v") is not None
+
+    def test_clear(self, cache):
+        cache.put("q1", "v", df)
+        cache.clear()
+        assert cache.get("q1", "v") is None
+
+
+class CountingConnection:
+    """sqlite connection that counts the statements it runs, with optional table name aliases."""
+    def __init__(self, conn, aliases=None):
+        self.conn = conn
+        self.statements = []
+        self.aliases = aliases or {}
+
+    def cursor(self):
+        cur = self.conn.cursor()
+        outer = self
+
+        class Cursor:
+            description = None
+
+            def execute(self, query):
+                outer.statements.append(query)
+                for name, alias in outer.aliases.items():
+                    query = query.replace(name, alias)
+                cur.execute(query)
+                self.description = cur.description
+
+            def fetchall(self):
+                return cur.fetchall()
+
+            def fetchmany(self, size):
+                return cur.fetchmany(size)
+
+            def close(self):
+                cur.close()
+
+        return Cursor()
+
+    def close(self):
+        self.conn.close()
+
+
+@pytest.fixture
+def counting_connection():
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    df.to_sql("prod_table", conn, index=False)
+    yield CountingConnection(conn)
+    conn.close()
+
+
+def test_connector_uses_cache(cache, counting_connection, monkeypatch):
+    connector = sc.SnowflakeConnector.from_connection(counting_connection, cache=cache)
+    version = {"prod_table": "2024-01-01"}
+    monkeypatch.setattr(connector, "table_version", lambda relation: version[relation])
+
+    first, = connector.query_concurrently("select * from prod_table", relations=["prod_table"])
+    second = connector.query("select * from prod_table", relation="prod_table")
+    assert len(counting_connection.statements) == 1
+    assert second['a'].tolist() == first['a'].tolist()
+
+    version["prod_table"] = "2024-01-02"
+    connector.query("select * from prod_table", relation="prod_table")
+    assert len(counting_connection.statements) == 2
+
+    connector.refresh_cache = True
+    connector.query("select * from prod_table", relation="prod_table")
+    assert len(counting_connection.statements) == 3
+    connector.close_connection()
+
+
+@pytest.fixture
+def catalog_connection():
+    """Connection answering db.information_schema.tables from a local 'tables' table."""
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    df.to_sql("prod_table", conn, index=False)
+    df.to_sql("prod_view", conn, index=False)
+    pd.DataFrame({
+        'table_schema': ['DBT', 'DBT'],
+        'table_name': ['PROD_TABLE', 'PROD_VIEW'],
+        'last_altered': ['2024-01-01', '2024-01-01'],
+        'table_type': ['BASE TABLE', 'VIEW'],
+    }).to_sql("tables", conn, index=False)
+    yield CountingConnection(conn, {"db.information_schema.tables": "tables", "db.dbt.": ""})
+    conn.close()
+
+
+def data_statements(connection):
+    return [query for query in connection.statements if "information_schema" not in query]
+
+
+def test_views_are_not_cached(cache, catalog_connection):
+    connector = sc.SnowflakeConnector.from_connection(catalog_connection, cache=cache)
+    assert connector.table_version("db.dbt.prod_table") == "2024-01-01"
+    assert connector.table_version("db.dbt.prod_view") is None
+
+    for _ in range(2):
+        connector.query("select * from db.dbt.prod_table", relation="db.dbt.prod_table")
+        connector.query("select * from db.dbt.prod_view", relation="db.dbt.prod_view")
+    # the base table is read once, the view every time
+    assert len(data_statements(catalog_connection)) == 3
+    connector.close_connection()
+
+
+def test_failed_version_lookup_runs_uncached(cache, counting_connection):
+    connector = sc.SnowflakeConnector.from_connection(counting_connection, cache=cache)
+    # sqlite has no db.information_schema.tables, so the lookup fails
+    for _ in range(2):
+        result = connector.query("select * from prod_table", relation="db.dbt.prod_table")
+        assert result['a'].tolist() == [1, 2, 3]
+    assert len(data_statements(counting_connection)) == 2
+    connector.close_connection()
+
+
+if __name__ == "__main__":
+    pytest.main()
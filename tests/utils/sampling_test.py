@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.utils import expected_profile as ep
+from src.utils import sampling
+
+
+rng = np.random.default_rng(0)
+population_1 = pd.DataFrame({
+    'A': rng.normal(100, 10, 200_000),
+    'B': rng.choice(['a', 'b', 'c'], 200_000, p=[0.5, 0.3, 0.2]),
+})
+population_2 = pd.DataFrame({
+    'A': rng.normal(95, 10, 200_000),
+    'B': rng.choice(['a', 'b', 'c'], 200_000, p=[0.5, 0.3, 0.2]),
+})
+
+
+class TestSampling:
+    def test_parse_sample(self):
+        assert sampling.parse_sample('1') == (1.0, False)
+        assert sampling.parse_sample('0.5%') == (0.5, False)
+        assert sampling.parse_sample('10000 rows') == (10000.0, True)
+        for invalid in ['abc', '150', '10.5 rows', '0']:
+            with pytest.raises(ValueError):
+                sampling.parse_sample(invalid)
+
+    def test_sample_clause(self):
+        assert sampling.sample_clause('1', seed=42) == 'sample bernoulli (1) seed (42)'
+        assert sampling.sample_clause('0.25') == 'sample bernoulli (0.25)'
+        assert sampling.sample_clause('500 ROWS', seed=42) == 'sample (500 rows)'
+
+    def test_mean_difference_intervals_cover_population(self):
+        sample_1 = population_1.sample(frac=0.01, random_state=1)
+        sample_2 = population_2.sample(frac=0.01, random_state=2)
+        intervals = sampling.mean_difference_intervals(
+            sample_1.describe(), sample_2.describe(), 0.99
+        )
+        truth = (population_1['A'].mean() - population_2['A'].mean()) / population_1['A'].mean() * 100
+        assert intervals.loc['A', 'lower'] < truth < intervals.loc['A', 'upper']
+        assert intervals.loc['A', 'upper'] - intervals.loc['A', 'lower'] < 2
+
+    def test_frequency_ratio_interval(self):
+        counts_1 = pd.Series({'a': 1000, 'b': 600})
+        counts_2 = pd.Series({'a': 1000, 'b': 600, 'c': 5})
+        interval = sampling.frequency_ratio_interval(counts_1, counts_2, 0.95)
+        assert interval['estimate'] == 1.0
+        assert interval['lower'] < 1.0 < interval['upper']
+
+    def test_profiler_scales_sample(self):
+        sample_1 = population_1.sample(frac=0.01, random_state=1)
+        sample_2 = population_2.sample(frac=0.01, random_state=2)
+        profiler = ep.ExpectedProfiler(sample_1, sample_2, 100, 100, confidence=0.95)
+        profiler.compare()
+
+        assert profiler.shapes.loc['rows', 'df_1'] == 200_000
+        assert profiler.percent_differences.loc['count', 'A'] == 0
+        assert profiler.frequency_differences['B']['count_df1'].sum() == 200_000
+        intervals = profiler.confidence_intervals
+        assert set(intervals) == {'mean_percent_differences', 'avg_frequency_ratio'}
+        assert intervals['avg_frequency_ratio'].loc['B', 'estimate'] == pytest.approx(
+            profiler.avg_frequency_ratio['B']
+        )
+
+    def test_profiler_without_confidence(self):
+        profiler = ep.ExpectedProfiler(population_1.head(100).copy(), population_2.head(100).copy())
+        profiler.compare()
+        assert profiler.confidence_intervals is None
+
+
+if __name__ == "__main__":
+    pytest.main()
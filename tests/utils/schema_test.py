@@ -0,0 +1,84 @@
+from unittest.mock import MagicMock
+import pandas as pd
+import pytest
+from src.utils import schema
+
+
+def columns(*rows):
+    return pd.DataFrame(
+        rows, columns=['COLUMN_NAME', 'DATA_TYPE', 'NUMERIC_PRECISION', 'NUMERIC_SCALE']
+    )
+
+
+prod = columns(
+    ('ID', 'NUMBER', 38, 0),
+    ('AMOUNT', 'NUMBER', 38, 2),
+    ('STATUS', 'TEXT', None, None),
+    ('PAYLOAD', 'VARIANT', None, None),
+    ('CREATED_AT', 'TIMESTAMP_NTZ', None, None),
+    ('CODE', 'NUMBER', 38, 0),
+    ('OLD', 'TEXT', None, None),
+)
+dev = columns(
+    ('ID', 'NUMBER', 38, 0),
+    ('AMOUNT', 'NUMBER', 38, 4),
+    ('STATUS', 'TEXT', None, None),
+    ('PAYLOAD', 'VARIANT', None, None),
+    ('CREATED_AT', 'TIMESTAMP_NTZ', None, None),
+    ('CODE', 'TEXT', None, None),
+    ('NEW', 'BOOLEAN', None, None),
+)
+
+
+def preflight(prod=prod, dev=dev, **kwargs):
+    connector = MagicMock()
+    connector.query_concurrently.return_value = (prod, dev)
+    check = schema.SchemaPreflight(connector, "db.dbt.orders", "db.dbt_dev.orders", **kwargs)
+    check.run()
+    return check, connector
+
+
+def test_type_family():
+    assert schema.type_family('NUMBER') == 'numeric'
+    assert schema.type_family('text') == 'text'
+    assert schema.type_family('TIMESTAMP_LTZ') == 'other'
+    assert schema.type_family('VARIANT') == 'other'
+
+
+def test_differences_and_projection():
+    check, connector = preflight()
+    query = connector.query_concurrently.call_args.args[0]
+    assert "db.information_schema.columns" in query
+    assert "table_schema = 'DBT'" in query and "table_name = 'ORDERS'" in query
+
+    differences = check.differences.set_index('column')
+    assert differences.loc['OLD', 'difference'] == 'only in df_1'
+    assert differences.loc['NEW', 'difference'] == 'only in df_2'
+    assert differences.loc['AMOUNT', 'type_df1'] == 'NUMBER(38,2)'
+    assert differences.loc['AMOUNT', 'compared']
+    assert not differences.loc['CODE', 'compared']
+    assert set(differences.index) == {'OLD', 'NEW', 'AMOUNT', 'CODE'}
+
+    assert check.projected == ['ID', 'AMOUNT', 'STATUS']
+    assert check.skipped == ['PAYLOAD', 'CREATED_AT', 'CODE']
+    assert 'select "ID", "AMOUNT", "STATUS"' in check.query("db.dbt.orders", "1 = 1")
+
+
+def test_column_overrides():
+    check, _ = preflight(columns=['id', 'created_at'])
+    assert check.projected == ['ID', 'CREATED_AT']
+    check, _ = preflight(exclude_columns=['status'])
+    assert check.projected == ['ID', 'AMOUNT']
+    with pytest.raises(ValueError):
+        preflight(columns=['old'])
+
+
+def test_missing_table():
+    with pytest.raises(ValueError):
+        preflight(dev=dev.iloc[0:0])
+
+
+def test_sample_clause():
+    check, _ = preflight()
+    query = check.query("db.dbt.orders", "x > 1", "sample bernoulli (1)")
+    assert "from db.dbt.orders sample bernoulli (1)" in query
@@ -0,0 +1,113 @@
+import hashlib
+import sqlite3
+import pandas as pd
+import pytest
+from src.utils import segments as sg
+from src.utils import snowflake_connector as sc
+
+
+class HashAgg:
+    """Order independent stand-in for Snowflake HASH_AGG in sqlite."""
+    def __init__(self):
+        self.total = 0
+
+    def step(self, *values):
+        digest = hashlib.sha256(repr(values).encode()).hexdigest()
+        self.total = (self.total + int(digest[:12], 16)) % 2**62
+
+    def finalize(self):
+        return self.total
+
+
+rows = 3000
+regions = ['north', 'south', 'east', 'west']
+df_prod = pd.DataFrame({
+    'ID': range(rows),
+    'REGION': [regions[i % 4] for i in range(rows)],
+    'AMOUNT': [float(i % 50) for i in range(rows)],
+    'STATUS': ['open' if i % 3 else 'closed' for i in range(rows)],
+})
+df_dev = df_prod.copy()
+# east has a changed status, west loses rows and gets larger amounts
+df_dev.loc[df_dev['ID'] == 2, 'STATUS'] = 'void'
+west = df_dev['REGION'] == 'west'
+df_dev.loc[west, 'AMOUNT'] = df_dev.loc[west, 'AMOUNT'] * 1.5
+df_dev = df_dev[~(west & (df_dev['ID'] % 8 == 3))]
+df_dev = pd.concat([df_dev, pd.DataFrame({
+    'ID': [rows], 'REGION': ['central'], 'AMOUNT': [1.0], 'STATUS': ['open']
+})])
+
+
+@pytest.fixture
+def connector():
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    conn.create_aggregate("hash_agg", -1, HashAgg)
+    df_prod.to_sql("prod_table", conn, index=False)
+    df_dev.to_sql("dev_table", conn, index=False)
+    yield sc.SnowflakeConnector.from_connection(conn)
+    conn.close()
+
+
+def test_build_segment_query():
+    query = sg.build_segment_query("db.s.t", "1 = 1", "REGION", ["REGION", "A"], ["A"])
+    assert 'select "REGION" as segment' in query
+    assert 'hash_agg("REGION", "A")' in query
+    assert 'avg("A")' in query
+    assert 'group by 1' in query
+
+
+def test_segment_literal():
+    assert sg.segment_literal(None) == "is null"
+    assert sg.segment_literal(float('nan')) == "is null"
+    assert sg.segment_literal(3) == "= 3"
+    assert sg.segment_literal(True) == "= true"
+    assert sg.segment_literal("o'neil") == "= 'o''neil'"
+
+
+def test_segments_are_ranked(connector):
+    comparison = sg.SegmentedComparison(connector, "prod_table", "dev_table", "region")
+    comparison.compare()
+    segments = comparison.segments
+
+    assert comparison.segment_by == 'REGION'
+    assert comparison.numeric_cols == ['ID', 'AMOUNT']
+    assert segments.index.tolist()[:3] == ['central', 'west', 'east']
+    assert segments.loc['north', 'checksum_match']
+    assert not segments.loc['east', 'checksum_match']
+    assert segments.loc['central', 'row_percent_difference'] == 100
+    assert segments.loc['central', 'rows_df1'] == 0
+    assert segments.loc['west', 'rows_df2'] < segments.loc['west', 'rows_df1']
+    assert segments.loc['east', 'divergence'] == 0
+    assert comparison.profiles == {}
+
+
+def test_drill_down_profiles_worst_segments(connector):
+    comparison = sg.SegmentedComparison(
+        connector, "prod_table", "dev_table", "REGION", "1 = 1", drill_down=2
+    )
+    comparison.compare()
+    assert list(comparison.profiles) == ['central', 'west']
+    west = comparison.profiles['west']
+    assert west.shapes.loc['rows', 'df_1'] == 750
+    assert west.percent_differences.loc['mean', 'AMOUNT'] < 0
+    # a segment missing on one side is fetched but cannot be compared
+    assert comparison.profiles['central'].percent_differences is None
+
+
+def test_unknown_segment_column(connector):
+    comparison = sg.SegmentedComparison(connector, "prod_table", "dev_table", "missing")
+    with pytest.raises(ValueError):
+        comparison.compare()
+
+
+def test_boolean_and_timestamp_columns_are_not_averaged():
+    class SampleConnector:
+        def query_concurrently(self, *queries):
+            sample = pd.DataFrame({
+                'REGION': ['north'], 'FLAG': [True], 'AMOUNT': [1.0],
+                'UPDATED': pd.to_datetime(['2023-01-01']),
+            }).convert_dtypes(dtype_backend="pyarrow")
+            return sample, sample.copy()
+
+    comparison = sg.SegmentedComparison(SampleConnector(), "prod_table", "dev_table", "REGION")
+    assert comparison._columns() == (['REGION', 'FLAG', 'AMOUNT', 'UPDATED'], ['AMOUNT'])
@@ -0,0 +1,197 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.utils import sketches
+from src.utils import expected_profile as ep
+from src.utils import streaming_profile as sp
+
+
+rng = np.random.default_rng(3)
+# zipf-like column: a few heavy values and a long tail of rare ones
+heavy = rng.choice([f'h{i}' for i in range(10)], 20_000)
+tail = np.array([f't{i}' for i in range(30_000)])
+values = pd.Series(np.concatenate([heavy, tail]))
+
+
+def chunks(series, n):
+    size = -(-len(series) // n)
+    return [series.iloc[i:i + size] for i in range(0, len(series), size)]
+
+
+def test_hyperloglog_estimate():
+    hll = sketches.HyperLogLog()
+    hll.update(sketches.hash_values([f'v{i}' for i in range(100_000)]))
+    assert hll.estimate() == pytest.approx(100_000, rel=0.03)
+
+
+def test_hyperloglog_small_cardinality():
+    hll = sketches.HyperLogLog()
+    hll.update(sketches.hash_values(['a', 'b', 'c']))
+    assert round(hll.estimate()) == 3
+
+
+def test_count_min_never_undercounts():
+    counts = values.value_counts()
+    cms = sketches.CountMinSketch(width=1024)
+    hashes = sketches.hash_values(counts.index)
+    cms.update(hashes, counts.to_numpy())
+    estimates = cms.estimate(hashes)
+    assert (estimates >= counts.to_numpy()).all()
+    assert cms.total == len(values)
+
+
+def test_space_saving_finds_heavy_hitters():
+    summary = sketches.SpaceSaving(capacity=20)
+    for chunk in chunks(values.sample(frac=1, random_state=0), 10):
+        counts = chunk.value_counts()
+        summary.update(counts.index, counts.to_numpy())
+    assert {f'h{i}' for i in range(10)} <= set(summary.counts.index)
+    exact = values.value_counts()
+    for value, bound in summary.counts.items():
+        assert bound >= exact[value]
+
+
+def test_minhash_jaccard():
+    left, right = sketches.MinHash(num_perm=256), sketches.MinHash(num_perm=256)
+    left.update(sketches.hash_values([str(i) for i in range(0, 3000)]))
+    right.update(sketches.hash_values([str(i) for i in range(1000, 4000)]))
+    # 2000 shared of 4000 distinct
+    assert left.jaccard(right) == pytest.approx(0.5, abs=0.1)
+    assert np.isnan(sketches.MinHash().jaccard(sketches.MinHash()))
+
+
+def test_hashes_ignore_dtype():
+    text = ['a', 'b', 'c']
+    assert (
+        sketches.hash_values(pd.Series(text, dtype='category').cat.categories)
+        == sketches.hash_values(pd.array(text, dtype='string[pyarrow]'))
+    ).all()
+
+
+def test_merge_equals_single_pass():
+    whole = sketches.CategoricalSketch(capacity=20)
+    whole.update(values)
+    merged = sketches.CategoricalSketch(capacity=20)
+    for chunk in chunks(values, 4):
+        part = sketches.CategoricalSketch(capacity=20)
+        part.update(chunk)
+        merged.merge(part)
+    assert merged.rows == whole.rows
+    assert (merged.distinct.registers == whole.distinct.registers).all()
+    assert (merged.frequencies.table == whole.frequencies.table).all()
+    assert (merged.values.signature == whole.values.signature).all()
+
+
+def test_profiler_switches_to_sketches():
+    df_1 = pd.DataFrame({
+        'N': rng.normal(size=len(values)),
+        'ID': values.to_numpy(),
+        'LOW': rng.choice(['x', 'y'], len(values)),
+    })
+    df_2 = df_1.iloc[::2].reset_index(drop=True)
+    profiler = ep.ExpectedProfiler(df_1, df_2, max_categories=1000)
+    profiler.compare()
+    assert set(profiler.sketch_summaries) == {'ID'}
+    summary = profiler.sketch_summaries['ID']
+    assert summary['distinct_df1'] == pytest.approx(values.nunique(), rel=0.05)
+    table = profiler.frequency_differences['ID']
+    assert len(table) <= 200
+    assert {f'h{i}' for i in range(10)} <= set(table.index)
+    assert table.loc['h0', 'count_df1'] >= (values == 'h0').sum()
+    # low cardinality columns keep exact counts
+    assert len(profiler.frequency_differences['LOW']) == 2
+
+
+def test_sketched_columns_are_read_in_chunks(monkeypatch):
+    frame = pd.DataFrame({'ID': values, 'LOW': rng.choice(['x', 'y'], len(values))})
+    factorized = []
+    factorize = pd.factorize
+
+    def recording_factorize(column, *args, **kwargs):
+        factorized.append(len(column))
+        return factorize(column, *args, **kwargs)
+
+    monkeypatch.setattr(pd, "factorize", recording_factorize)
+    ratios, tables, sketched = ep.categorical_comparison(
+        frame, frame.iloc[::2], ['ID', 'LOW'], max_categories=1000, chunk_rows=5000
+    )
+    assert set(sketched) == {'ID'}
+    # only the exact column is factorized over both tables
+    assert max(factorized) == len(frame) + len(frame.iloc[::2])
+    assert factorized.count(max(factorized)) == 1
+    assert sketched['ID']['distinct_df1'] == pytest.approx(values.nunique(), rel=0.05)
+    assert {f'h{i}' for i in range(10)} <= set(tables['ID'].index)
+
+
+def test_streaming_accumulator_switches_to_sketch():
+    exact = sp.FrequencyAccumulator(max_categories=None)
+    sketched = sp.FrequencyAccumulator(max_categories=1000)
+    for chunk in chunks(values, 5):
+        exact.update(chunk)
+        sketched.update(chunk)
+    assert sketched.counts is None
+    assert sketched.sketched.rows == len(values)
+    top = exact.value_counts().head(10)
+    assert set(sketched.value_counts().head(10).index) == set(top.index)
+
+    other = sp.FrequencyAccumulator(max_categories=1000)
+    other.update(values.head(100))
+    other.merge(sketched)
+    assert other.sketched.rows == len(values) + 100
+
+
+def test_quantile_sketch_exact_until_compaction():
+    data = rng.normal(size=150)
+    sketch = sketches.QuantileSketch()
+    sketch.update(data)
+    expected = pd.Series(data).describe()[['25%', '50%', '75%']].to_numpy()
+    assert np.allclose(sketch.quantiles([0.25, 0.5, 0.75]), expected)
+
+
+def test_quantile_sketch_rank_error():
+    data = rng.exponential(size=200_000)
+    sketch = sketches.QuantileSketch()
+    for chunk in np.array_split(data, 20):
+        sketch.update(chunk)
+    assert sum(len(level) for level in sketch.levels) < 1000
+    estimates = sketch.quantiles(sketches.QUANTILES)
+    ranks = np.searchsorted(np.sort(data), estimates) / len(data)
+    assert np.abs(ranks - np.array(sketches.QUANTILES)).max() < 0.02
+    assert sketch.quantiles([0, 1]).tolist() == [data.min(), data.max()]
+
+
+def test_quantile_sketch_merge():
+    data = rng.uniform(size=50_000)
+    merged = sketches.QuantileSketch()
+    for chunk in np.array_split(data, 5):
+        part = sketches.QuantileSketch()
+        part.update(chunk)
+        merged.merge(part)
+    assert merged.count == len(data)
+    assert merged.quantiles([0.5])[0] == pytest.approx(0.5, abs=0.02)
+
+
+def test_distribution_metrics():
+    same_1, same_2, shifted = (sketches.QuantileSketch() for _ in range(3))
+    same_1.update(rng.normal(size=20_000))
+    same_2.update(rng.normal(size=20_000))
+    shifted.update(rng.normal(0.5, 1, size=20_000))
+    assert sketches.ks_distance(same_1, same_2) < 0.03
+    # true KS distance of N(0, 1) and N(0.5, 1) is about 0.197
+    assert sketches.ks_distance(same_1, shifted) == pytest.approx(0.197, abs=0.03)
+    assert sketches.population_stability_index(same_1, same_2) < 0.01
+    assert sketches.population_stability_index(same_1, shifted) > 0.2
+    assert np.isnan(sketches.ks_distance(same_1, sketches.QuantileSketch()))
+
+
+def test_profiler_distribution_differences():
+    df_1 = pd.DataFrame({'N': rng.normal(size=5000), 'C': rng.choice(['x', 'y'], 5000)})
+    df_2 = df_1.assign(N=df_1['N'] + 0.5)
+    profiler = ep.ExpectedProfiler(df_1, df_2)
+    profiler.compare()
+    assert profiler.distribution_differences.loc['N', 'ks_distance'] > 0.15
+    assert list(profiler.quantile_differences.index) == [f'{q:.0%}' for q in sketches.QUANTILES]
+
+    same = ep.ExpectedProfiler(df_1, df_1.copy())
+    same.compare()
+    assert (same.distribution_differences == 0).all().all()
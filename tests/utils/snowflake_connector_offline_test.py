@@ -0,0 +1,194 @@
+import sqlite3
+import threading
+import pandas as pd
+import pyarrow as pa
+import pytest
+from snowflake.connector.errors import NotSupportedError
+from src.utils import snowflake_connector as sc
+
+
+class FakeAsyncCursor:
+    """Cursor double mimicking the Snowflake async execution API."""
+    def __init__(self, connection):
+        self.connection = connection
+        self.sfqid = None
+        self.description = [('A',)]
+        self.closed = False
+
+    def execute_async(self, query):
+        self.sfqid = f"qid-{len(self.connection.submitted)}"
+        self.connection.submitted[self.sfqid] = query
+
+    def get_results_from_sfqid(self, qid):
+        query = self.connection.submitted[qid]
+        if "fail" in query:
+            raise RuntimeError(f"query {qid} failed")
+        if "slow" in query:
+            self.connection.release.wait(timeout=5)
+            if qid in self.connection.aborted:
+                raise RuntimeError(f"query {qid} aborted")
+
+    def fetchall(self):
+        return [(1,), (2,)]
+
+    def abort_query(self, qid):
+        self.connection.aborted.append(qid)
+        self.connection.release.set()
+        return True
+
+    def close(self):
+        self.closed = True
+
+
+class FakeAsyncConnection:
+    def __init__(self):
+        self.submitted = {}
+        self.aborted = []
+        self.release = threading.Event()
+
+    def cursor(self):
+        return FakeAsyncCursor(self)
+
+    def close(self):
+        pass
+
+
+def test_concurrent_queries_async():
+    """Both queries are submitted before any result is fetched"""
+    connection = FakeAsyncConnection()
+    connector = sc.SnowflakeConnector.from_connection(connection)
+    df_1, df_2 = connector.query_concurrently("select 1", "select 2")
+    assert list(connection.submitted.values()) == ["select 1", "select 2"]
+    assert df_1.equals(pd.DataFrame({'A': [1, 2]}))
+    assert df_2.equals(df_1)
+    connector.close_connection()
+
+
+def test_concurrent_queries_cancel_on_failure():
+    """A failing side aborts the query still running on the other side"""
+    connection = FakeAsyncConnection()
+    connector = sc.SnowflakeConnector.from_connection(connection)
+    with pytest.raises(RuntimeError, match="failed"):
+        connector.query_concurrently("select fail", "select slow")
+    assert connection.aborted == ["qid-1"]
+    connector.close_connection()
+
+
+def test_concurrent_queries_dbapi():
+    """Drivers without execute_async run each query in a worker thread"""
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    connector = sc.SnowflakeConnector.from_connection(conn)
+    df_1, df_2 = connector.query_concurrently("select 1 as a", "select 2 as a")
+    assert df_1['a'].tolist() == [1]
+    assert df_2['a'].tolist() == [2]
+    connector.close_connection()
+
+
+class FakeArrowCursor:
+    """Cursor double serving Arrow batches like the Snowflake driver."""
+    def __init__(self, batches, supported=True):
+        self.batches = batches
+        self.supported = supported
+        self.description = [('A',), ('B',)]
+
+    def execute(self, query):
+        pass
+
+    def fetch_arrow_batches(self):
+        if not self.supported:
+            raise NotSupportedError("result is not in arrow format")
+        return iter(self.batches)
+
+    def fetchall(self):
+        return [(1, 'x')]
+
+    def close(self):
+        pass
+
+
+class FakeArrowConnection:
+    def __init__(self, batches, supported=True):
+        self.batches = batches
+        self.supported = supported
+
+    def cursor(self):
+        return FakeArrowCursor(self.batches, self.supported)
+
+
+arrow_batches = [
+    pa.table({'A': pa.array([1, 2], pa.decimal128(10, 2)), 'B': ['x', 'y']}),
+    pa.record_batch({'A': pa.array([3], pa.decimal128(10, 2)), 'B': ['z']}),
+]
+
+
+def test_arrow_fetch_engine():
+    """Arrow batches become one Arrow-backed dataframe"""
+    connector = sc.SnowflakeConnector.from_connection(FakeArrowConnection(arrow_batches))
+    result = connector.query('select a, b from t')
+    assert result['A'].tolist() == [1.0, 2.0, 3.0]
+    assert result['A'].dtype == pd.ArrowDtype(pa.float64())
+    assert result['B'].dtype == pd.ArrowDtype(pa.string())
+
+
+def test_arrow_fetch_engine_fallback():
+    """Results not available as Arrow are fetched as tuples"""
+    connector = sc.SnowflakeConnector.from_connection(
+        FakeArrowConnection(arrow_batches, supported=False)
+    )
+    result = connector.query('show tables')
+    assert result.equals(pd.DataFrame({'A': [1], 'B': ['x']}))
+
+
+def test_tuples_fetch_engine():
+    connector = sc.SnowflakeConnector.from_connection(
+        FakeArrowConnection(arrow_batches), fetch_engine="tuples"
+    )
+    result = connector.query('select a, b from t')
+    assert result.equals(pd.DataFrame({'A': [1], 'B': ['x']}))
+
+
+def test_batched_fetch_arrow():
+    """query_batches yields one dataframe per Arrow batch"""
+    connector = sc.SnowflakeConnector.from_connection(FakeArrowConnection(arrow_batches))
+    result = list(connector.query_batches('select a, b from t'))
+    assert [len(batch) for batch in result] == [2, 1]
+    assert result[1]['B'].tolist() == ['z']
+
+
+def test_batched_fetch_dbapi():
+    """Drivers without Arrow support are read with fetchmany"""
+    conn = sqlite3.connect(":memory:")
+    conn.execute("create table t (a integer)")
+    conn.executemany("insert into t values (?)", [(i,) for i in range(5)])
+    connector = sc.SnowflakeConnector.from_connection(conn)
+    result = list(connector.query_batches('select a from t', batch_size=2))
+    assert [len(batch) for batch in result] == [2, 2, 1]
+    assert pd.concat(result)['a'].tolist() == list(range(5))
+
+
+def test_connection_pool_sso(mocker):
+    """SSO caches its token, and synchronous queries run on pooled connections"""
+    barrier = threading.Barrier(2, timeout=5)
+
+    def connect(**kwargs):
+        conn = sqlite3.connect(":memory:", check_same_thread=False)
+        # both queries must run at the same time to pass the barrier
+        conn.create_function("meet", 0, lambda: barrier.wait() * 0 + 1)
+        return conn
+
+    mock_connect = mocker.patch("snowflake.connector.connect", side_effect=connect)
+    connector = sc.SnowflakeConnector(
+        user="user", account="account", warehouse="wh", pool_size=2
+    )
+    assert mock_connect.call_args.kwargs["client_store_temporary_credential"] is True
+
+    df_1, df_2 = connector.query_concurrently("select meet() as a", "select meet() as a")
+    assert df_1['a'].tolist() == df_2['a'].tolist() == [1]
+    assert mock_connect.call_count == 2
+    assert len(connector.connect_seconds) == 2
+    assert connector.connection_report().startswith("Opened 2 connection(s)")
+    connector.close_connection()
+
+
+if __name__ == "__main__":
+    pytest.main()
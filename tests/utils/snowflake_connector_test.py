@@ -48,4 +48,3 @@ def test_close_connection(snowflake_connector, mocker):
     
     # assert that the close method of the connection object is called
     mock_close.assert_called_once()
-
@@ -0,0 +1,131 @@
+import os
+import sqlite3
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+from src.utils import snowflake_connector as sc
+from src.utils import spill
+from src.utils import streaming_profile as sp
+
+
+rng = np.random.default_rng(11)
+df_1 = pd.DataFrame({
+    'A': rng.normal(10, 2, 3000),
+    'B': rng.choice(['a', 'b', 'c', None], 3000),
+    'C': rng.integers(0, 100, 3000),
+    'D': pd.date_range('2023-01-01', periods=3000, freq='h'),
+})
+df_2 = pd.DataFrame({
+    'A': rng.normal(11, 2, 2500),
+    'B': rng.choice(['a', 'b', 'c'], 2500),
+    'C': rng.integers(0, 120, 2500),
+    'D': pd.date_range('2023-01-01', periods=2500, freq='h'),
+})
+
+
+def batches(df, size=500):
+    for start in range(0, len(df), size):
+        yield df.iloc[start:start + size]
+
+
+rows = 4000
+df_prod = pd.DataFrame({
+    'ID': range(rows),
+    'AMOUNT': [float(i % 97) for i in range(rows)],
+    'STATUS': ['open' if i % 3 else 'closed' for i in range(rows)],
+})
+df_dev = df_prod.copy()
+df_dev.loc[df_dev['ID'] == 1234, 'AMOUNT'] = -1.0
+df_dev.loc[df_dev['ID'] == 3000, ['AMOUNT', 'STATUS']] = [-2.0, 'void']
+df_dev = df_dev[df_dev['ID'] != 42]
+df_dev = pd.concat([df_dev, pd.DataFrame({'ID': [rows + 10], 'AMOUNT': [1.0], 'STATUS': ['open']})])
+
+
+@pytest.fixture
+def connector():
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    df_prod.to_sql("prod_table", conn, index=False)
+    df_dev.to_sql("dev_table", conn, index=False)
+    yield sc.SnowflakeConnector.from_connection(conn)
+    conn.close()
+
+
+def test_parse_memory_budget():
+    assert spill.parse_memory_budget('512MB') == 512 * 2**20
+    assert spill.parse_memory_budget('2g') == 2 * 2**30
+    assert spill.parse_memory_budget('1.5 GiB') == int(1.5 * 2**30)
+    assert spill.parse_memory_budget('4096') == 4096
+    for budget in ('', 'lots', '0GB', '-1MB'):
+        with pytest.raises(ValueError):
+            spill.parse_memory_budget(budget)
+
+
+def test_spill_file_widens_batch_types(tmp_path):
+    spill_file = spill.SpillFile(str(tmp_path / 'side.parquet'), memory_budget=2**20)
+    spill_file.write(pd.DataFrame({
+        'N': pd.Series([1, 2], dtype='int8'),
+        'T': pd.Series([None, None]).astype('category'),
+    }))
+    spill_file.write(pd.DataFrame({
+        'N': [3.0, None],
+        'T': pd.Series(['x', 'y'], dtype='string[pyarrow]'),
+    }))
+    spill_file.close()
+    assert spill_file.schema.types == [pa.int64(), pa.string()]
+    result = pd.concat(spill_file.batches(3))
+    assert result['N'].tolist()[:3] == [1, 2, 3]
+    assert result['T'].tolist()[2:] == ['x', 'y']
+
+
+def test_profiler_matches_streaming(tmp_path):
+    # a budget of a few hundred rows, so the spill is read back in many chunks
+    profiler = spill.OutOfCoreProfiler(batches(df_1), batches(df_2), 64 * 2**10, str(tmp_path))
+    profiler.compare()
+    streaming = sp.StreamingProfiler(batches(df_1), batches(df_2))
+    streaming.compare()
+
+    assert profiler.spilled[1][0] == 3000 and profiler.spilled[2][0] == 2500
+    assert (profiler.shapes == streaming.shapes).all().all()
+    statistics = ['count', 'mean', 'std', 'min', 'max']
+    assert np.allclose(
+        profiler.percent_differences.loc[statistics],
+        streaming.percent_differences.loc[statistics],
+        equal_nan=True,
+    )
+    assert profiler.avg_frequency_ratio['B'] == pytest.approx(streaming.avg_frequency_ratio['B'])
+    # spill files are removed
+    assert os.listdir(tmp_path) == []
+
+
+class TestOutOfCoreKeyDiff:
+    def check_differences(self, diff):
+        assert diff.deleted['ID'].tolist() == [42]
+        assert diff.inserted['ID'].tolist() == [rows + 10]
+        updated = dict(zip(diff.updated['ID'], diff.updated['changed_columns']))
+        assert updated == {1234: ['AMOUNT'], 3000: ['AMOUNT', 'STATUS']}
+        assert diff.rows_fetched == len(df_prod) + len(df_dev)
+
+    def test_hash_buckets(self, connector, tmp_path):
+        diff = spill.OutOfCoreKeyDiff(
+            connector, "prod_table", "dev_table", "id", memory_budget=64 * 2**10, spill_dir=str(tmp_path)
+        )
+        diff.compare()
+        assert diff.buckets > 1
+        self.check_differences(diff)
+        assert os.listdir(tmp_path) == []
+
+    def test_single_bucket(self, connector):
+        diff = spill.OutOfCoreKeyDiff(connector, "prod_table", "dev_table", "ID")
+        diff.compare()
+        assert diff.buckets == 1
+        self.check_differences(diff)
+
+    def test_missing_key(self, connector):
+        diff = spill.OutOfCoreKeyDiff(connector, "prod_table", "dev_table", "NOT_A_COLUMN")
+        with pytest.raises(KeyError):
+            diff.compare()
+
+
+if __name__ == "__main__":
+    pytest.main()
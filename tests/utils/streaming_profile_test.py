@@ -0,0 +1,152 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.utils import expected_profile as ep
+from src.utils import streaming_profile as sp
+
+
+rng = np.random.default_rng(7)
+df_1 = pd.DataFrame({
+    'A': rng.normal(10, 2, 1000),
+    'B': rng.choice(['a', 'b', 'c', None], 1000),
+    'C': rng.integers(0, 100, 1000),
+    'D': pd.date_range('2023-01-01', periods=1000, freq='h'),
+})
+df_2 = pd.DataFrame({
+    'A': rng.normal(11, 2, 800),
+    'B': rng.choice(['a', 'b', 'c'], 800),
+    'C': rng.integers(0, 120, 800),
+    'D': pd.date_range('2023-01-01', periods=800, freq='h'),
+})
+
+
+def batches(df, size=128):
+    for start in range(0, len(df), size):
+        yield df.iloc[start:start + size]
+
+
+class TestNumericAccumulator:
+    def test_update_matches_numpy(self):
+        accumulator = sp.NumericAccumulator()
+        for batch in batches(df_1['A']):
+            accumulator.update(batch)
+        assert accumulator.count == 1000
+        assert accumulator.sum == pytest.approx(df_1['A'].sum())
+        assert accumulator.mean == pytest.approx(df_1['A'].mean())
+        assert accumulator.std() == pytest.approx(df_1['A'].std())
+        assert accumulator.min == df_1['A'].min()
+        assert accumulator.max == df_1['A'].max()
+
+    def test_merge(self):
+        left, right, whole = sp.NumericAccumulator(), sp.NumericAccumulator(), sp.NumericAccumulator()
+        left.update(df_1['A'][:300])
+        right.update(df_1['A'][300:])
+        whole.update(df_1['A'])
+        left.merge(right)
+        assert left.count == whole.count
+        assert left.mean == pytest.approx(whole.mean)
+        assert left.std() == pytest.approx(whole.std())
+
+    def test_skips_nulls(self):
+        accumulator = sp.NumericAccumulator()
+        accumulator.update(pd.Series([1.0, None, 3.0]))
+        assert accumulator.count == 2
+        assert accumulator.mean == 2.0
+
+
+class TestFrequencyAccumulator:
+    def test_update_and_merge(self):
+        left, right = sp.FrequencyAccumulator(), sp.FrequencyAccumulator()
+        left.update(df_1['B'][:500])
+        right.update(df_1['B'][500:])
+        counts = left.merge(right).value_counts()
+        expected = df_1['B'].value_counts()
+        assert counts.sort_index().tolist() == expected.sort_index().tolist()
+        assert counts.name == 'count'
+
+
+class TestTableAccumulator:
+    frame = pd.DataFrame({
+        # null in the first batch, numbers or text later
+        'LATE_NUMBER': [None] * 4 + [1.5, 2.5, 3.5, 4.5],
+        'LATE_TEXT': [None] * 4 + ['x', 'y', 'x', 'z'],
+        # converts in the first batch only
+        'CODE': ['1', '2', '3', '4', '5', 'N/A', '7', '1'],
+    })
+
+    def test_columns_reclassified_on_later_batches(self):
+        table = sp.TableAccumulator()
+        for batch in batches(self.frame, size=4):
+            table.update(batch)
+        assert list(table.numeric) == ['LATE_NUMBER']
+        assert list(table.categorical) == ['LATE_TEXT', 'CODE']
+        assert table.unresolved == set()
+        assert table.numeric['LATE_NUMBER'].count == 4
+        for col in ['LATE_TEXT', 'CODE']:
+            counts = table.categorical[col].value_counts()
+            expected = self.frame[col].value_counts()
+            assert counts.sort_index().tolist() == expected.sort_index().tolist()
+
+    def test_merge_reconciles_classification(self):
+        first, second = sp.TableAccumulator(), sp.TableAccumulator()
+        first.update(self.frame.iloc[:4])
+        second.update(self.frame.iloc[4:])
+        assert list(first.numeric) == ['LATE_NUMBER', 'LATE_TEXT', 'CODE']
+        for table in (sp.TableAccumulator().merge(first).merge(second), second.merge(first)):
+            assert list(table.numeric) == ['LATE_NUMBER']
+            assert list(table.categorical) == ['LATE_TEXT', 'CODE']
+            assert table.rows == len(self.frame)
+            assert table.categorical['CODE'].value_counts()['1'] == 2
+
+
+class TestStreamingProfiler:
+    def test_compare_matches_expected_profiler(self):
+        profiler = sp.StreamingProfiler(batches(df_1), batches(df_2), queue_size=2)
+        profiler.compare()
+
+        local = ep.ExpectedProfiler(df_1.drop(columns='D'), df_2.drop(columns='D'))
+        local.compare()
+
+        assert (profiler.shapes.loc['rows'] == local.shapes.loc['rows']).all()
+        rows = ['count', 'mean', 'std', 'min', 'max']
+        assert np.allclose(
+            profiler.percent_differences.loc[rows, ['A', 'C']],
+            local.percent_differences.loc[rows, ['A', 'C']],
+            equal_nan=True,
+        )
+        assert profiler.avg_frequency_ratio['B'] == pytest.approx(local.avg_frequency_ratio['B'])
+        assert 'D' not in profiler.percent_differences.columns
+
+    def test_compare_different_columns(self):
+        profiler = sp.StreamingProfiler(batches(df_1), batches(df_2.drop(columns='C')))
+        profiler.compare()
+        assert profiler.shapes.loc['columns', 'absolute_difference'] == 1
+        assert profiler.percent_differences is None
+
+    def test_compare_zero_rows(self):
+        profiler = sp.StreamingProfiler(batches(df_1), iter([]))
+        with pytest.raises(AssertionError):
+            profiler.compare()
+
+    def test_producer_error_is_raised(self):
+        def failing():
+            yield df_2.iloc[:10]
+            raise RuntimeError("fetch failed")
+
+        profiler = sp.StreamingProfiler(batches(df_1, size=10), failing(), queue_size=1)
+        with pytest.raises(RuntimeError, match="fetch failed"):
+            profiler.compare()
+
+
+if __name__ == "__main__":
+    pytest.main()
+
+
+def test_streaming_quartiles_match_describe():
+    profiler = sp.StreamingProfiler(batches(df_1), batches(df_2))
+    profiler.compare()
+    quartiles = ['25%', '50%', '75%']
+    expected = df_1[['A', 'C']].describe().loc[quartiles]
+    # estimated from quantile sketches, within about 2% in rank
+    assert np.allclose(profiler.df_1_describe.loc[quartiles, ['A', 'C']], expected, atol=0.25)
+    assert set(profiler.distribution_differences.index) == {'A', 'C'}
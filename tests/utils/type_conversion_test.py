@@ -0,0 +1,73 @@
+import datetime
+from decimal import Decimal
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+from src.utils import type_conversion as tc
+
+# (name, type_code, display_size, internal_size, precision, scale, null_ok)
+description = [
+    ('ID', 0, None, None, 38, 0, False),
+    ('PRICE', 0, None, None, 10, 2, True),
+    ('RATE', 1, None, None, None, None, True),
+    ('STATUS', 2, None, 16, None, None, True),
+    ('CODE', 2, None, 16, None, None, True),
+    ('CREATED_AT', 8, None, None, 0, 9, True),
+    ('ACTIVE', 13, None, None, None, None, True),
+]
+
+rows = 100
+df = pd.DataFrame({
+    'ID': [Decimal(i) for i in range(rows)],
+    'PRICE': [Decimal(f"{i}.25") for i in range(rows)],
+    'RATE': [i / 3 for i in range(rows)],
+    'STATUS': ['open' if i % 2 else 'closed' for i in range(rows)],
+    'CODE': [f"code_{i}" for i in range(rows)],
+    'CREATED_AT': [datetime.datetime(2024, 1, 1) + datetime.timedelta(days=i) for i in range(rows)],
+    'ACTIVE': [bool(i % 3) for i in range(rows)],
+})
+
+
+class TestTypeConversion:
+    def test_column_types(self):
+        types = tc.column_types(description)
+        assert types['ID'] == ('FIXED', 0)
+        assert types['STATUS'] == ('TEXT', None)
+        # drivers without Snowflake type codes are left alone
+        assert tc.column_types([('A', None, None, None, None, None, True)]) == {}
+        assert tc.column_types([('A',)]) == {}
+
+    def test_convert_dataframe(self):
+        converted = tc.convert_dataframe(df, description)
+        assert converted['ID'].dtype == np.int8
+        assert converted['PRICE'].dtype == np.float64
+        assert converted['RATE'].dtype == np.float64
+        assert converted['STATUS'].dtype == 'category'
+        assert converted['CODE'].dtype == 'string[pyarrow]'
+        assert pd.api.types.is_datetime64_any_dtype(converted['CREATED_AT'])
+        assert converted['ACTIVE'].dtype == 'boolean'
+        assert converted['PRICE'].sum() == pytest.approx(sum(i + 0.25 for i in range(rows)))
+
+    def test_integer_with_nulls(self):
+        column = pd.Series([Decimal(1), None, Decimal(3)], dtype=object)
+        converted = tc.convert_column(column, 'FIXED', 0)
+        assert converted.dtype == np.float64
+        assert converted.isna().sum() == 1
+
+    def test_arrow_backed_columns(self):
+        arrow_df = pa.table({
+            'ID': pa.array(range(rows), pa.int64()),
+            'STATUS': pa.array(df['STATUS'].tolist()),
+        }).to_pandas(types_mapper=pd.ArrowDtype)
+        converted = tc.convert_dataframe(arrow_df, description)
+        assert converted['ID'].dtype == np.int8
+        assert converted['STATUS'].dtype == 'category'
+
+    def test_untyped_description(self):
+        untyped = [(name, None) for name in df.columns]
+        assert tc.convert_dataframe(df, untyped) is df
+
+
+if __name__ == "__main__":
+    pytest.main()